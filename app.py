@@ -10,11 +10,20 @@ from langchain.chains import LLMChain
 from langchain_core.output_parsers import JsonOutputParser
 import pandas as pd
 from claims.scraper import PubMedScraper
-from claims.doc_loader import load_documents
-from claims.utils import ranked_df
-from claims.retrieval import InMemoryVectorStore, CustomRetriever
+from claims.utils import get_journal_rankings
+from claims.ratelimit import get_metrics
+from claims.assets import (get_local_pubmed_index, get_paper_index, get_claim_cache, get_mesh_extractor,
+                           get_verdict_store, JOURNAL_RANKINGS_PATH)
+from claims.verdict_store import VerdictWriter
+from claims.prefilter import fetch_video_metadata, prefilter_video, ACCEPT, REJECT
+from claims.youtube_transcript_downloader import download_subtitles, parse_cues
+from claims.transcript_index import TranscriptIndex, deep_link, format_timestamp
 from claims.rag import RAGQueryProcessor
-from langchain_openai import OpenAIEmbeddings
+from claims.pipeline import ClaimPipeline, ClaimStreamParser
+from claims.deadline import describe_degraded
+from claims.embeddings import get_embedding_model
+from claims.static_assets import asset_url, thumbnail, lottie_json
+from claims.session import get_video_run, ClaimOutcome, CACHED, LLM, PUBMED, DUPLICATE
 from claims.prompts import gpt_prompt_txt
 from claims import logging
 from claims.prompts import *
@@ -23,7 +32,6 @@ from claims.Tokenizer import *
 from claims.PromptEngineering import *
 from youtube_transcript_api._errors import *
 from streamlit_lottie import st_lottie
-import requests
 import traceback
 
 # Load environment variables
@@ -141,12 +149,12 @@ with st.sidebar:
     selection = st.radio("Go to", ["Home", "About Us"])
 
 def home_page():
-    st.markdown("""<div class="custom-title">WELCOME TO CREDIVERIFY</div>
+    st.markdown(f"""<div class="custom-title">WELCOME TO CREDIVERIFY</div>
                 <style>
-        .stApp {
-            background-image: url(https://images.pexels.com/photos/7470820/pexels-photo-7470820.jpeg);
+        .stApp {{
+            background-image: url({asset_url("home_background.jpeg")});
             background-size: cover;
-        }
+        }}
         </style>
         """, unsafe_allow_html=True)
     st.write("")
@@ -165,7 +173,6 @@ def home_page():
         with st.container():
             st.markdown('<div class="button-container">', unsafe_allow_html=True)
             youtube_link = st.text_input("🎥 Enter YouTube Video Link:")
-            os.environ['YOUTUBE_LINK'] = youtube_link
             search_button = st.button("🔍")
             st.markdown('</div>', unsafe_allow_html=True)
         
@@ -174,11 +181,121 @@ def home_page():
             if not video_id:
                 st.error("⚠️ Please provide a valid YouTube link for verification!")
             else:
-                col3.image(f"http://img.youtube.com/vi/{video_id}/hqdefault.jpg", use_column_width=True, caption="Verify this thumbnail")
+                col3.image(thumbnail(video_id), use_column_width=True, caption="Verify this thumbnail")
     
         if st.button("Get Detailed Claims and Validate"):
+            # Kept per session: every browser session validates its own video
+            st.session_state.youtube_link = youtube_link
             st.session_state.page = "claims"
 
+def render_stream(placeholder, chunks):
+    # Render text chunks into the placeholder as they arrive and return the full text
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text + "▌")
+    placeholder.markdown(text)
+    return text
+
+def render_degraded(outcome):
+    if outcome.degraded:
+        # Out of time for a full search
+        st.caption(f"⏱️ Degraded result: {describe_degraded(outcome.degraded)}.")
+
+def render_outcome(i, outcome):
+    # Render a claim verdict kept in the session
+    if outcome.kind == DUPLICATE:
+        st.info(f"Same as claim {outcome.duplicate_of+1}, see its validation above.")
+        return
+    if outcome.kind == CACHED:
+        st.markdown(f"#### ♻️ **Previously Verified Result for Claim {i+1}:**", unsafe_allow_html=True)
+        st.caption(f"Verified before as: {outcome.cached_claim}")
+        st.write(outcome.verdict)
+        return
+    if outcome.kind == LLM:
+        st.markdown(f"#### ✅ **AI Validation Result for Claim {i+1}:**", unsafe_allow_html=True)
+        if isinstance(outcome.verdict, dict):
+            st.write(outcome.verdict)
+    else:
+        st.markdown(f"#### 🔬 **PubMed Validation Result for Claim {i+1}:**", unsafe_allow_html=True)
+        st.markdown(outcome.verdict)
+    render_degraded(outcome)
+
+def answer_claim(i, claim, result, video_id, verdicts, claim_cache):
+    """
+    Answers a claim from its prepared evidence (a pipeline ClaimResult) and renders the verdict as it is generated.
+    Returns the verdict as a ClaimOutcome, or None if there is no answer.
+    """
+    if result.duplicate_of is not None:
+        outcome = ClaimOutcome(DUPLICATE, duplicate_of=result.duplicate_of)
+        render_outcome(i, outcome)
+        return outcome
+
+    if result.cached:
+        outcome = ClaimOutcome(CACHED, result.cached['verdict'], cached_claim=result.cached['claim'])
+        render_outcome(i, outcome)
+        if verdicts is not None:
+            verdicts.add(video_id, i, claim, result.cached['verdict'],
+                         [(pmid, None) for pmid in result.cached['evidence']], source=CACHED)
+        return outcome
+
+    if not result.documents:
+        with st.spinner(f"Validating claim {i+1}..."):
+            result_qa = generate_chain_results1({"claim": claim})
+        if isinstance(result_qa, dict):
+            logging.info(f"Final response for claim {i+1}: {result_qa}")
+        outcome = ClaimOutcome(LLM, result_qa, degraded=result.degraded)
+        render_outcome(i, outcome)
+        evidence = []
+    else:
+        rag_processor = RAGQueryProcessor(custom_retriever=result.retriever, gpt_prompt_txt=gpt_prompt_txt)
+        st.markdown(f"#### 🔬 **PubMed Validation Result for Claim {i+1}:**", unsafe_allow_html=True)
+        try:
+            result_qa = render_stream(st.empty(), rag_processor.stream_query(claim))
+        except Exception:
+            # A truncated answer is no verdict: the claim stays pending instead of being stored or cached
+            st.error(f"Validation of claim {i+1} was interrupted, it will be retried on the next run.")
+            return None
+        logging.info(f"Final response for claim {i+1}: {result_qa}")
+        outcome = ClaimOutcome(PUBMED, result_qa, degraded=result.degraded)
+        render_degraded(outcome)
+        ranked = sorted(result.documents, key=lambda doc: doc.metadata.get('final_score', 0), reverse=True)
+        evidence = [(doc.metadata['PMID'], doc.metadata.get('final_score')) for doc in ranked[:result.retriever.topk]]
+
+    if not result_qa:
+        return None
+    if verdicts is not None:
+        verdicts.add(video_id, i, claim, result_qa, evidence, outcome.kind, result.degraded)
+    # Don't reuse a degraded verdict for later videos
+    if claim_cache is not None and not result.degraded:
+        claim_cache.store(claim, result.embedding, result_qa, [pmid for pmid, _ in evidence], outcome.kind)
+    return outcome
+
+def render_claims(run, validate=None):
+    """
+    Renders the claims of a VideoRun. Claims with a verdict in the session are rendered from memory, the others
+    with validate(index, claim).
+    """
+    if run.claim_spans is None:
+        # Anchor every claim to the captions it came from (timestamps are lost in the flattened transcript)
+        run.claim_spans = TranscriptIndex.from_subtitles(run.subtitle_text).locate_all(run.claims)
+
+    st.markdown(f"### 📝 Found {len(run.claims)} claims in the video.", unsafe_allow_html=True)
+
+    for i, claim in enumerate(run.claims):
+        st.markdown(f"#### 🔹 **Claim {i+1}:**", unsafe_allow_html=True)
+        st.markdown(f"<div style='font-size: 1.2rem; color: #e0e0e0;'>{claim}</div>", unsafe_allow_html=True)
+        span = run.claim_spans[i]
+        if span is not None:
+            with st.expander(f"▶️ Said at {format_timestamp(span.start)}"):
+                st.markdown(f"[Watch from {format_timestamp(span.start)}]({deep_link(run.video_id, span.start)})")
+                st.caption(span.text)
+
+        if i in run.outcomes:
+            render_outcome(i, run.outcomes[i])
+        elif validate is not None:
+            validate(i, claim)
+
 def Claims(ytlnk):
     try:
         # Clear previous content
@@ -189,12 +306,12 @@ def Claims(ytlnk):
 
         col1.title("🔍 CLAIM VALIDATION", anchor="claim-validation")
         
-        st.markdown("""<div style="font-size: 1.5rem; color: #ffab00; margin-bottom: 20px;">Claim Validation for Your Video</div>
+        st.markdown(f"""<div style="font-size: 1.5rem; color: #ffab00; margin-bottom: 20px;">Claim Validation for Your Video</div>
                     <style>
-            .stApp {
-                background-image: url(https://images.pexels.com/photos/924824/pexels-photo-924824.jpeg);
+            .stApp {{
+                background-image: url({asset_url("page_background.jpeg")});
                 background-size: cover;
-            }
+            }}
             </style>
             """, unsafe_allow_html=True)
         
@@ -206,68 +323,146 @@ def Claims(ytlnk):
                 st.error("⚠️ Invalid YouTube link!")
                 return
 
-            with st.spinner("Extracting transcript..."):
-                transcript_text = extract_transript_details(video_id)
-            
-            if not transcript_text:
-                st.error("⚠️ Failed to extract transcript. Please check if the video has captions.")
+            # Everything finished for this video is kept in the session, so a rerun (any widget interaction)
+            # renders it from memory and only resumes the claims that have no verdict yet
+            run = get_video_run(st.session_state, video_id)
+            if run.error:
+                st.error(run.error)
                 return
 
-            with st.spinner("Generating summary..."):
-                summary = generate_gemini_content(transcript_text, YoutubeSummary_task)
+            not_allowed = "⚠️ Only health-related videos in English with captions are allowed!"
+            if run.summary is None:
+                # Cheap pre-filter on the video metadata and the first captions: obvious rejects stop here,
+                # before punctuation restoration and the LLM calls
+                with st.spinner("Checking the video..."):
+                    metadata = fetch_video_metadata(video_id)
+                    prefilter = prefilter_video(metadata)
+                if prefilter.verdict == REJECT:
+                    run.error = not_allowed
+                    st.error(not_allowed)
+                    return
+
+                with st.spinner("Extracting transcript..."):
+                    subtitle_text = download_subtitles(video_id, metadata=metadata)
+                    if subtitle_text:
+                        prefilter = prefilter_video(metadata, parse_cues(subtitle_text))
+                        if prefilter.verdict == REJECT:
+                            run.error = not_allowed
+                            st.error(not_allowed)
+                            return
+                        transcript_text = extract_transript_details(video_id, subtitle_text=subtitle_text)
+                    else:
+                        transcript_text = None
+
+                if not transcript_text:
+                    st.error("⚠️ Failed to extract transcript. Please check if the video has captions.")
+                    return
+
+                with st.expander("📄 Video summary", expanded=True):
+                    summary_placeholder = st.empty()
+                    summary_placeholder.markdown("Generating summary...")
+                summary = render_stream(summary_placeholder, generate_gemini_content(transcript_text, YoutubeSummary_task, stream=True))
                 logging.info(f"Generated summary: {summary[:100]}...")  # Log first 100 chars
-            
-            if not summary:
-                st.error("⚠️ Failed to generate summary. Please try again.")
-                return
 
-            with st.spinner("Generating claims..."):
-                claims = generate_gemini_claims(summary, ClaimGenerator_task)
-                logging.info(f"Generated claims: {claims[:100]}...")  # Log first 100 chars
-            
-            if not claims:
-                st.error("⚠️ Failed to generate claims. Please try again.")
-                return
+                if not summary:
+                    st.error("⚠️ Failed to generate summary. Please try again.")
+                    return
+                run.metadata, run.subtitle_text, run.summary = metadata, subtitle_text, summary
+                run.prefilter = prefilter.verdict
+                # The LLM health check is only needed when the pre-filter could not decide
+                if prefilter.verdict == ACCEPT:
+                    run.health_ok = True
+            else:
+                with st.expander("📄 Video summary", expanded=True):
+                    st.markdown(run.summary)
 
-            if not health_video_check(Youtube_healh_check, claims):
-                st.error("⚠️ Only health-related videos in English with captions are allowed!")
+            if run.complete:
+                render_claims(run)
                 return
 
-            lines = claims.strip().split("\n")
-            claims_list = [line.lstrip('* ').strip() for line in lines if line.startswith('* ')]
-            
-            st.markdown(f"### 📝 Found {len(claims_list)} claims in the video.", unsafe_allow_html=True)
-            
-            for i, claim in enumerate(claims_list, 0):
-                st.markdown(f"#### 🔹 **Claim {i+1}:**", unsafe_allow_html=True)
-                st.markdown(f"<div style='font-size: 1.2rem; color: #e0e0e0;'>{claim}</div>", unsafe_allow_html=True)
-                
-                with st.spinner(f"Validating claim {i+1}..."):
-                    # Claim validation process
-                    response = generate_gemini_keywords(claim, Max_three_words_extraction)
-                    openai_embed_model = OpenAIEmbeddings(model='text-embedding-3-small')
-                    topics = extract_keywords(response)
-                    scraper = PubMedScraper(email, api_key)
-                    date_range = '("2000/01/01"[Date - Create] : "2024/07/31"[Date - Create])'
-                    df = scraper.run(topics, date_range)
-                    
-                    if df.empty:
-                        result_qa = generate_chain_results1({"claim": claim})
-                        st.markdown(f"#### ✅ **AI Validation Result for Claim {i+1}:**", unsafe_allow_html=True)
-                        if isinstance(result_qa, dict):
-                            claims_formatted = {"claim": claims_list[i]}
-                            result_qa = generate_chain_results1(claims_formatted)
-                            logging.info(f"Final response for claim {i+1}: {result_qa}")
-                            st.write(result_qa)
-                    else:
-                        df_ranked = ranked_df(df, pd.read_csv('journal_rankings.csv'))
-                        documents = load_documents(df_ranked)
-                        in_memory_store = InMemoryVectorStore(documents, openai_embed_model)
-                        custom_retriever = CustomRetriever(vectorstore=in_memory_store)
-                        rag_processor = RAGQueryProcessor(custom_retriever=custom_retriever, gpt_prompt_txt=gpt_prompt_txt)
-                        result_qa = rag_processor.process_query_retrieval_qa(claim)
-                        st.markdown(f"#### 🔬 **PubMed Validation Result for Claim {i+1}:**", unsafe_allow_html=True)
-                        st.write(result_qa)
+            # Claims are parsed from the stream as they are generated and each one starts its evidence search right
+            # away, while the remaining claims are generated and the health check runs alongside
+            claim_cache = get_claim_cache()
+            # Every verdict is kept for history and analytics (if VERDICT_DB_PATH is set)
+            verdict_store = get_verdict_store()
+            verdicts = None
+            if verdict_store is not None:
+                if not run.recorded:
+                    verdict_store.record_video(video_id, run.metadata)
+                    run.recorded = True
+                verdicts = VerdictWriter(verdict_store)
+            pipeline = ClaimPipeline(get_embedding_model(),
+                                     lambda: PubMedScraper(email, api_key, local_index=get_local_pubmed_index()),
+                                     get_journal_rankings(JOURNAL_RANKINGS_PATH), Max_three_words_extraction,
+                                     claim_cache=claim_cache, paper_index=get_paper_index(),
+                                     keyword_extractor=get_mesh_extractor())
+            try:
+                health_check = None
+                if run.health_ok is None:
+                    health_check = pipeline.speculate(health_video_check, Youtube_healh_check, run.summary)
+
+                if run.claims is None:
+                    parser = ClaimStreamParser()
+                    claims_list = []
+
+                    def claim_chunks():
+                        for chunk in generate_gemini_claims(run.summary, ClaimGenerator_task, stream=True):
+                            for claim in parser.feed(chunk):
+                                claims_list.append(claim)
+                                pipeline.submit(claim)
+                            yield chunk
+                        for claim in parser.close():
+                            claims_list.append(claim)
+                            pipeline.submit(claim)
+
+                    claims_placeholder = st.empty()
+                    with st.spinner("Generating claims..."):
+                        claims = render_stream(claims_placeholder, claim_chunks())
+                    claims_placeholder.empty()
+                    logging.info(f"Generated claims: {claims[:100]}...")  # Log first 100 chars
+
+                    if not claims:
+                        st.error("⚠️ Failed to generate claims. Please try again.")
+                        return
+                    run.claims = claims_list
+                    # Claim index of every pipeline submission
+                    submitted = list(range(len(claims_list)))
+                else:
+                    submitted = run.pending()
+                    for index in submitted:
+                        pipeline.submit(run.claims[index])
+                futures = dict(zip(submitted, pipeline.results()))
+
+                if health_check is not None:
+                    run.health_ok = bool(health_check.result())
+                    if not run.health_ok:
+                        pipeline.cancel()
+                        run.error = not_allowed
+                        st.error(not_allowed)
+                        return
+
+                def validate(i, claim):
+                    with st.spinner(f"Validating claim {i+1}..."):
+                        try:
+                            result = futures[i].result()
+                        except Exception as e:
+                            logging.error(f"Error validating claim {i+1}: {e}")
+                            st.warning(f"⚠️ Claim {i+1} could not be validated.")
+                            return
+                    if result.duplicate_of is not None:
+                        result.duplicate_of = submitted[result.duplicate_of]
+                    outcome = answer_claim(i, claim, result, video_id, verdicts, claim_cache)
+                    # Claims without an answer stay pending and are retried on the next run
+                    if outcome is not None:
+                        run.outcomes[i] = outcome
+
+                render_claims(run, validate)
+            finally:
+                pipeline.close()
+                if verdicts is not None:
+                    verdicts.flush()
+
+            logging.info(f"Rate limiter metrics: {get_metrics()}")
 
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
@@ -280,21 +475,15 @@ def waitlist_page():
     emoji_welcome = "🎉"
     emoji_waitlist = "📝"
 
-    # Load Lottie animation
-    def load_lottieurl(url):
-        r = requests.get(url)
-        if r.status_code != 200:
-            return None
-        return r.json()
-
-    lottie_social = load_lottieurl("https://lottie.host/dd61585c-8bad-4ded-9184-fd344d8a8ed0/Maz6fBVacS.json")
+    # Local copy of the Lottie animation; None (no animation) until it has been fetched in the background
+    lottie_social = lottie_json("social_lottie.json")
     placeholder = st.empty()
-    st.markdown("""
+    st.markdown(f"""
                 <style>
-        .stApp {
-            background-image: url(https://images.pexels.com/photos/924824/pexels-photo-924824.jpeg);
+        .stApp {{
+            background-image: url({asset_url("page_background.jpeg")});
             background-size: cover;
-        }
+        }}
         </style>
         """, unsafe_allow_html=True)
     with placeholder.container():
@@ -335,7 +524,8 @@ def waitlist_page():
             st.markdown(contact_form, unsafe_allow_html=True)
 
         with right_column:
-            st_lottie(lottie_social, height=400, key="social")
+            if lottie_social is not None:
+                st_lottie(lottie_social, height=400, key="social")
 
 
 # Page routing logic
@@ -346,7 +536,7 @@ try:
         st.session_state.page = 'about us'
     if selection == 'Home':
         if st.session_state.page == 'claims':
-            Claims(os.environ.get("YOUTUBE_LINK"))
+            Claims(st.session_state.get("youtube_link"))
         else:
             home_page()
     if selection == "About Us":
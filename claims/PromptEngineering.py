@@ -12,6 +12,9 @@ import google.generativeai as genai
 
 from youtube_transcript_api import YouTubeTranscriptApi
 from langchain_openai import ChatOpenAI
+from claims.ratelimit import call_with_retry
+from claims.deadline import REQUEST_TIMEOUTS
+from claims.fakes import fake_chat_model, fake_backends_enabled
 # from google.generativeai.errors import GenerativeAIError
 
 model_config1 = {
@@ -60,7 +63,7 @@ gpt_prompt1 = PromptTemplate(
     input_variables=["claim"],
     partial_variables={"format_instructions": parser1.get_format_instructions()},
 )
-chatgpt1=ChatOpenAI(model_name="gpt-4o-mini", temperature=0.1, max_tokens= 500)
+chatgpt1=fake_chat_model() if fake_backends_enabled() else ChatOpenAI(model_name="gpt-4o-mini", temperature=0.1, max_tokens= 500, timeout=REQUEST_TIMEOUTS["openai"])
 chain = (gpt_prompt1
            |
          chatgpt1
@@ -70,7 +73,7 @@ chain = (gpt_prompt1
 
 
 def generate_chain_results1(claim_formatted):
-    gpt_responses = chain.invoke(claim_formatted)
+    gpt_responses = call_with_retry("openai", chain.invoke, claim_formatted)
     response_dict = gpt_responses.dict() if hasattr(gpt_responses, 'dict') else gpt_responses
     row = {
         "Scientific Validation Summary": response_dict.get("scientific_validation_summary", ""),
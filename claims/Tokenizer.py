@@ -5,6 +5,7 @@ from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
+from claims.youtube_url import extract_video_id
 
 def extract_keywords(text):
     """
@@ -29,22 +30,6 @@ def extract_keywords(text):
         return []
 
 
-import re
-
 def extract_youtube_id(url):
-    # List of regular expressions to match various YouTube URL formats
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',  # Standard and short URL
-        r'(?:embed\/|v\/|youtu.be\/)([0-9A-Za-z_-]{11})',  # Embedded and youtu.be URL
-        r'(?:watch\?)?(?:feature=player_embedded&)?(?:v=)?(?:video_ids=)?([0-9A-Za-z_-]{11})',  # Various watch URLs
-        r'(?:shorts\/)([0-9A-Za-z_-]{11})',  # YouTube Shorts
-    ]
-    
-    # Try each pattern
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    
-    return None
-
+    # Strict parsing of all YouTube URL shapes, see claims/youtube_url.py
+    return extract_video_id(url)
@@ -1,38 +1,4 @@
 import logging
-from datetime import datetime
-import os
-import pandas as pd
+from claims.structured_logging import LOG_DIR, setup_logging, get_log_dataframe, get_log_files, read_log_chunks
 
-LOG_DIR="logs"
-
-CURRENT_TIME_STAMP=  f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
-
-def get_log_file_name(current_time_stamp):
-    return f"log_{current_time_stamp}.log"
-
-LOG_FILE_NAME=get_log_file_name(current_time_stamp=CURRENT_TIME_STAMP)
-
-
-os.makedirs(LOG_DIR,exist_ok=True)
-
-LOG_FILE_PATH = os.path.join(LOG_DIR,LOG_FILE_NAME)
-
-logging.basicConfig(filename=LOG_FILE_PATH,
-filemode="w",
-format='[%(asctime)s] ;%(levelname)s ;%(lineno)d ;%(filename)s ;%(funcName)s() ;%(message)s',
-level=logging.INFO
-)
-
-def get_log_dataframe(file_path):
-    data=[]
-    with open(file_path) as log_file:
-        for line in log_file.readlines():
-            data.append(line.split("^;"))
-
-    log_df = pd.DataFrame(data)
-    columns=["Time stamp","Log Level","line number","file name","function name","message"]
-    log_df.columns=columns
-    
-    log_df["log_message"] = log_df['Time stamp'].astype(str) +":$"+ log_df["message"]
-
-    return log_df[["log_message"]]
\ No newline at end of file
+LOG_FILE_PATH = setup_logging(log_dir=LOG_DIR, level=logging.INFO)
@@ -0,0 +1,102 @@
+import os
+from functools import lru_cache
+from claims import logging
+from claims.utils import get_journal_rankings
+from claims.embeddings import embedding_model_name
+from claims.fakes import FakePunctuationModel, fake_backends_enabled
+
+"""
+Process-wide, load-once access to the heavy read-only assets and the optional on-disk indexes.
+
+Everything here is cached per process. The pre-fork launcher (prefork.py) calls warm_up() before forking the app
+workers, so the ranking table, the journal match index, the punctuation model weights and the NLTK data are loaded
+once and shared copy-on-write by all workers instead of being loaded again in every process.
+"""
+
+JOURNAL_RANKINGS_PATH = 'journal_rankings.csv'
+EMBEDDING_MODEL = embedding_model_name()
+VERDICT_MODELS = ['gemini-pro', 'gpt-4o-mini', EMBEDDING_MODEL]
+
+
+@lru_cache(maxsize=None)
+def get_punctuation_model():
+    if fake_backends_enabled():
+        return FakePunctuationModel()
+    from deepmultilingualpunctuation import PunctuationModel
+    return PunctuationModel()
+
+
+@lru_cache(maxsize=None)
+def get_local_pubmed_index():
+    """
+    Optional offline evidence backend, built with `python -m claims.pubmed_index` (PUBMED_INDEX_DIR).
+    """
+    from claims.pubmed_index import PubMedIndex
+    index_dir = os.getenv('PUBMED_INDEX_DIR')
+    return PubMedIndex(index_dir) if index_dir else None
+
+
+@lru_cache(maxsize=None)
+def get_mesh_extractor():
+    """
+    Optional local keyword extractor, built with `python -m claims.mesh_keywords` (MESH_VOCABULARY_PATH).
+    """
+    from claims.mesh_keywords import MeshKeywordExtractor
+    vocabulary_path = os.getenv('MESH_VOCABULARY_PATH')
+    return MeshKeywordExtractor.load(vocabulary_path) if vocabulary_path else None
+
+
+@lru_cache(maxsize=None)
+def get_paper_index():
+    """
+    Optional persistent index of every embedded paper, reused across videos (PAPER_INDEX_DIR).
+    """
+    from claims.vector_index import VectorIndex
+    index_dir = os.getenv('PAPER_INDEX_DIR')
+    return VectorIndex(index_dir, model=EMBEDDING_MODEL) if index_dir else None
+
+
+@lru_cache(maxsize=None)
+def get_claim_cache():
+    """
+    Optional cross-video cache of claim verdicts, invalidated when the prompts or models change (CLAIM_CACHE_DIR).
+    """
+    from claims.claim_cache import ClaimCache, cache_version
+    cache_dir = os.getenv('CLAIM_CACHE_DIR')
+    return ClaimCache(cache_dir, cache_version(VERDICT_MODELS)) if cache_dir else None
+
+
+@lru_cache(maxsize=None)
+def get_verdict_store():
+    """
+    Optional persistent store of every verdict, for history and analytics (VERDICT_DB_PATH).
+    """
+    from claims.verdict_store import VerdictStore
+    db_path = os.getenv('VERDICT_DB_PATH')
+    return VerdictStore(db_path) if db_path else None
+
+
+def warm_up(load_punctuation_model=True):
+    """
+    Loads every shared asset into this process.
+    """
+    rankings = get_journal_rankings(JOURNAL_RANKINGS_PATH)
+    logging.info(f"Loaded {len(rankings.choices)} journal rankings")
+
+    # Downloads/loads the NLTK data, and imports the pipeline modules so their code and module-level objects
+    # are shared as well
+    import claims.Tokenizer
+    import claims.claim_generator
+    import claims.rag
+    import claims.retrieval
+    import claims.scraper
+
+    if load_punctuation_model:
+        get_punctuation_model()
+    # The embedding backend is not warmed up: ONNX Runtime thread pools do not survive a fork, so every worker
+    # creates its own on first use
+    get_local_pubmed_index()
+    get_mesh_extractor()
+    get_paper_index()
+    get_claim_cache()
+    get_verdict_store()
@@ -0,0 +1,76 @@
+import math
+import re
+from collections import Counter
+
+"""
+Okapi BM25 lexical scoring shared by the local PubMed index and the retriever.
+Kept dependency free (no NLTK data download needed) so it can run anywhere the package is imported.
+"""
+
+K1 = 1.5
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no nor not now of off on once only or other
+our ours ourselves out over own same she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours yourself yourselves may might also using used use study studies
+""".split())
+
+
+def tokenize(text):
+    """
+    Lowercases the text and splits it into word tokens, dropping stopwords and single characters.
+    """
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def idf(n_docs, doc_freq):
+    """
+    BM25 inverse document frequency, floored at zero so very common terms never count against a document.
+    """
+    return max(0.0, math.log((n_docs - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0))
+
+
+def term_score(tf, doc_len, avg_doc_len, term_idf, k1=K1, b=B):
+    """
+    BM25 contribution of one term to one document.
+    """
+    norm = k1 * (1 - b + b * doc_len / avg_doc_len) if avg_doc_len else k1
+    return term_idf * tf * (k1 + 1) / (tf + norm)
+
+
+class BM25:
+    """
+    BM25 over a small in-memory corpus, e.g. the candidate papers of a single claim.
+    """
+    def __init__(self, texts, k1=K1, b=B):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(text)) for text in texts]
+        self.doc_lens = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_doc_len = sum(self.doc_lens) / len(self.doc_lens) if self.doc_lens else 0.0
+        doc_freqs = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        self.idf = {term: idf(len(texts), df) for term, df in doc_freqs.items()}
+
+    def scores(self, query):
+        """
+        BM25 score of every document for the query, in corpus order.
+        """
+        query_terms = set(tokenize(query))
+        scores = []
+        for tf, doc_len in zip(self.term_freqs, self.doc_lens):
+            score = 0.0
+            for term in query_terms:
+                if term in tf:
+                    score += term_score(tf[term], doc_len, self.avg_doc_len, self.idf[term], self.k1, self.b)
+            scores.append(score)
+        return scores
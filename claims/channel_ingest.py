@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from claims import logging
+from claims.filelock import FileLock
+from claims.prefilter import fetch_video_metadata, prefilter_video, REJECT
+from claims.youtube_url import is_video_id, WATCH_URL
+
+"""
+Playlist and channel ingestion with incremental change detection.
+
+A playlist or channel is enumerated with yt-dlp flat extraction (one listing request, no per-video pages). Each
+source keeps a watermark file with the fingerprint of the last listing and, per processed video, a fingerprint of
+its caption tracks. A re-scan of an unchanged source stops after the listing request; otherwise only new videos,
+videos whose captions were not available yet and (with recheck_captions) videos whose caption tracks changed are
+sent on to verification.
+
+Usage:
+    python -m claims.channel_ingest <watermark_dir> <playlist or channel url>... [--recheck-captions]
+prints the videos to verify as JSON lines.
+"""
+
+LISTING_TIMEOUT = 300
+
+NEW = "new"
+CAPTIONS_CHANGED = "captions_changed"
+CAPTIONS_ADDED = "captions_added"
+
+# Per-video status in the watermark
+QUEUED = "queued"
+REJECTED = "rejected"
+NO_CAPTIONS = "no_captions"
+
+
+def list_videos(source_url):
+    """
+    Returns the video IDs of a playlist or channel in listing order, using yt-dlp flat extraction.
+    """
+    command = ['yt-dlp', '--flat-playlist', '-J', source_url]
+    result = subprocess.run(command, capture_output=True, text=True, check=True, encoding="utf-8",
+                            timeout=LISTING_TIMEOUT)
+    return list(dict.fromkeys(_iter_entry_ids(json.loads(result.stdout))))
+
+
+def _iter_entry_ids(info):
+    # Channels list their tabs (Videos, Shorts, Live) as nested playlists
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        if entry.get("_type") == "playlist" or entry.get("entries"):
+            yield from _iter_entry_ids(entry)
+        elif is_video_id(entry.get("id")):
+            yield entry["id"]
+
+
+def listing_fingerprint(video_ids):
+    return hashlib.sha1("\n".join(video_ids).encode("utf-8")).hexdigest()
+
+
+def caption_fingerprint(metadata, language='en'):
+    """
+    Fingerprint of the caption tracks of a video: the manual subtitle languages and whether auto captions exist.
+    (The track URLs themselves are signed and change on every request.)
+    """
+    tracks = {
+        "manual": sorted((metadata.get("subtitles") or {}).keys()),
+        "auto": language in (metadata.get("automatic_captions") or {}),
+    }
+    return hashlib.sha1(json.dumps(tracks, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def has_captions(metadata, language='en'):
+    return language in (metadata.get("subtitles") or {}) or language in (metadata.get("automatic_captions") or {})
+
+
+def watermark_name(source_url):
+    return hashlib.sha1(source_url.encode("utf-8")).hexdigest()[:16]
+
+
+class Watermark:
+    """
+    The ingestion state of one playlist or channel, stored as JSON in watermark_dir.
+    """
+    def __init__(self, watermark_dir, source_url):
+        self.path = os.path.join(watermark_dir, f"{watermark_name(source_url)}.json")
+        self.source_url = source_url
+        self.listing = None
+        self.videos = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as watermark_file:
+                state = json.load(watermark_file)
+            self.listing = state.get("listing")
+            self.videos = state.get("videos", {})
+
+    def save(self):
+        state = {"source": self.source_url, "listing": self.listing, "updated": time.time(), "videos": self.videos}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as watermark_file:
+            json.dump(state, watermark_file)
+        os.replace(tmp_path, self.path)
+
+    def pending_captions(self):
+        return [video_id for video_id, video in self.videos.items() if video.get("status") == NO_CAPTIONS]
+
+
+def scan_source(source_url, watermark_dir, verify=None, recheck_captions=False, language='en'):
+    """
+    Lists a playlist or channel and returns the videos that need verification, as dicts with video_id, url and
+    reason (new, captions_added or captions_changed).
+
+    verify: optional callable(video_id, metadata) called for every such video; the video is only recorded as
+            processed if it returns a truthy value. Without it, the returned videos are recorded as queued.
+    recheck_captions: also fetch the metadata of already processed videos to detect changed caption tracks
+    """
+    with FileLock(os.path.join(watermark_dir, f"{watermark_name(source_url)}.lock")):
+        watermark = Watermark(watermark_dir, source_url)
+        video_ids = list_videos(source_url)
+        fingerprint = listing_fingerprint(video_ids)
+
+        if fingerprint == watermark.listing and not recheck_captions and not watermark.pending_captions():
+            logging.info(f"No changes in {source_url} ({len(video_ids)} videos)")
+            return []
+
+        candidates = {}
+        for video_id in video_ids:
+            known = watermark.videos.get(video_id)
+            if known is None:
+                candidates[video_id] = NEW
+            elif known.get("status") == NO_CAPTIONS:
+                candidates[video_id] = CAPTIONS_ADDED
+            elif recheck_captions and known.get("status") != REJECTED:
+                candidates[video_id] = CAPTIONS_CHANGED
+
+        queue = []
+        # The listing only counts as processed once every candidate went through; otherwise the next scan retries
+        complete = True
+        for video_id, reason in candidates.items():
+            metadata = fetch_video_metadata(video_id)
+            if metadata is None:
+                complete = False
+                continue
+            captions = caption_fingerprint(metadata, language)
+            known = watermark.videos.get(video_id, {})
+            if reason == CAPTIONS_CHANGED and known.get("captions") == captions:
+                continue
+
+            entry = {"captions": captions, "checked": time.time()}
+            if not has_captions(metadata, language):
+                entry["status"] = NO_CAPTIONS
+            elif prefilter_video(metadata).verdict == REJECT:
+                entry["status"] = REJECTED
+            else:
+                video = {"video_id": video_id, "url": WATCH_URL.format(video_id), "reason": reason}
+                if verify is not None:
+                    try:
+                        verified = verify(video_id, metadata)
+                    except Exception as e:
+                        logging.info(f"Error verifying {video_id}: {e}")
+                        verified = False
+                    if not verified:
+                        complete = False
+                        continue
+                entry["status"] = QUEUED
+                queue.append(video)
+            watermark.videos[video_id] = entry
+
+        if complete:
+            watermark.listing = fingerprint
+        watermark.save()
+        logging.info(f"Scanned {source_url}: {len(video_ids)} videos, {len(candidates)} checked, {len(queue)} to verify")
+        return queue
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List new or changed videos of playlists and channels.")
+    parser.add_argument("watermark_dir")
+    parser.add_argument("sources", nargs="+", help="playlist or channel URLs")
+    parser.add_argument("--recheck-captions", action="store_true",
+                        help="also detect changed caption tracks of already processed videos (one request per video)")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        try:
+            for video in scan_source(source, args.watermark_dir, recheck_captions=args.recheck_captions):
+                print(json.dumps(dict(video, source=source)))
+        except subprocess.CalledProcessError as e:
+            print(f"Error listing {source}: {e}", file=sys.stderr)
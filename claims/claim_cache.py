@@ -0,0 +1,81 @@
+import hashlib
+import os
+import re
+import time
+from claims import logging
+from claims import prompts
+from claims.vector_index import VectorIndex
+
+"""
+Semantic claim deduplication and a cross-video claim -> verdict cache.
+
+Many videos make near-identical claims ("creatine improves strength", "creatine supplementation increases muscle
+strength"), and within one video the claim generator often repeats itself. Claims are embedded once, duplicates
+within a video are collapsed before validation, and every verdict is stored in a VectorIndex so a later claim
+above the similarity threshold reuses the verdict and evidence instead of running PubMed + RAG again.
+
+Entries are versioned by a hash of claims/prompts.py and the model names; each version lives in its own
+sub-directory, so changing a prompt or a model starts a fresh cache.
+"""
+
+# Cosine similarity above which two claims count as the same claim, both for collapsing the duplicates of one video
+# and for reusing a cached verdict
+SIMILARITY_THRESHOLD = 0.92
+
+
+def cache_version(model_names):
+    """
+    Short hash of the prompt definitions and the models used to produce verdicts.
+    """
+    digest = hashlib.sha256()
+    with open(prompts.__file__, "rb") as prompts_file:
+        digest.update(prompts_file.read())
+    for name in model_names:
+        digest.update(name.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def claim_key(claim):
+    normalized = re.sub(r"\W+", " ", claim.lower()).strip()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class ClaimCache:
+    """
+    Verdicts of previously validated claims, searchable by claim embedding.
+    """
+    def __init__(self, cache_dir, version, threshold=SIMILARITY_THRESHOLD):
+        self.version = version
+        self.threshold = threshold
+        self.index = VectorIndex(os.path.join(cache_dir, version))
+
+    def lookup(self, embedding):
+        """
+        The cached entry of the most similar prior claim, or None if none reaches the threshold.
+        Entries are dicts with claim, verdict, evidence (PMIDs), source and created, plus the similarity.
+        """
+        try:
+            hits = self.index.search(embedding, k=1)
+            if hits and hits[0][1] >= self.threshold and hits[0][2]:
+                key, similarity, entry = hits[0]
+                logging.info(f"Claim cache hit ({similarity:.3f}) for: {entry['claim']}")
+                return dict(entry, similarity=similarity)
+        except Exception as e:
+            logging.info(f"Error reading claim cache: {e}")
+        return None
+
+    def store(self, claim, embedding, verdict, evidence=None, source="pubmed"):
+        """
+        Caches a verdict. source is "pubmed" for RAG verdicts and "llm" for the no-evidence fallback.
+        """
+        try:
+            entry = {
+                "claim": claim,
+                "verdict": verdict,
+                "evidence": list(evidence or []),
+                "source": source,
+                "created": time.time(),
+            }
+            self.index.add([claim_key(claim)], [embedding], [entry])
+        except Exception as e:
+            logging.info(f"Error writing claim cache: {e}")
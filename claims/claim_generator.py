@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 load_dotenv() ##Load all the new environment variables
 import google.generativeai as genai
 from claims.youtube_transcript_downloader import get_transcript
+from claims.ratelimit import call_with_retry
+from claims.fakes import FakeGenerativeModel, fake_backends_enabled
+from claims.deadline import request_timeout
 
 from youtube_transcript_api import YouTubeTranscriptApi
 import openai
@@ -13,10 +16,39 @@ model_config = {
   "top_k": 1,
 }
 
+def get_gemini_model():
+    if fake_backends_enabled():
+        return FakeGenerativeModel()
+    return genai.GenerativeModel("gemini-pro", generation_config=model_config)
+
+def gemini_options(deadline=None):
+    """
+    Request options of a Gemini call: the request timeout, cut short by the deadline if given.
+    """
+    return {"timeout": request_timeout("gemini", deadline)}
+
+def iter_response_text(response):
+    """
+    Yields the text of each chunk of a streamed Gemini response, skipping empty or blocked chunks.
+    """
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
+
+def stream_gemini(prompt_text):
+    response = call_with_retry("gemini", get_gemini_model().generate_content, prompt_text, stream=True,
+                               request_options=gemini_options())
+    return iter_response_text(response)
+
 def health_video_check(prompt, summary_text):
     
-    model = genai.GenerativeModel("gemini-pro", generation_config=model_config)
-    response = model.generate_content(prompt + summary_text)
+    model = get_gemini_model()
+    response = call_with_retry("gemini", model.generate_content, prompt + summary_text,
+                               request_options=gemini_options())
     
     answer = response.text.strip().lower().split()
     answer=set(answer)
@@ -24,10 +56,10 @@ def health_video_check(prompt, summary_text):
     # Return True if the response contains "true", otherwise False
     return "true" in answer
 
-def extract_transript_details(video_id):
+def extract_transript_details(video_id, subtitle_text=None, metadata=None):
     try:
         #transcript_text=YouTubeTranscriptApi.get_transcript(video_id)
-        transcript_text = get_transcript(video_id)
+        transcript_text = get_transcript(video_id, subtitle_text=subtitle_text, metadata=metadata)
         # print("Yes")
         #transcript=""
         #for i in transcript_text:
@@ -38,25 +70,42 @@ def extract_transript_details(video_id):
         raise e
     return transcript_text
 
-def generate_gemini_content(transcript_text, prompt):
-    model = genai.GenerativeModel("gemini-pro", generation_config=model_config)
-    response = model.generate_content(prompt + transcript_text)
+def generate_gemini_content(transcript_text, prompt, stream=False):
+    """
+    Returns the generated text, or a generator of text chunks if stream is True.
+    """
+    if stream:
+        return stream_gemini(prompt + transcript_text)
+    model = get_gemini_model()
+    response = call_with_retry("gemini", model.generate_content, prompt + transcript_text,
+                               request_options=gemini_options())
     return response.text
 
-def generate_gemini_claims(summary, prompt):
-    model = genai.GenerativeModel('gemini-pro', generation_config=model_config)
+def generate_gemini_claims(summary, prompt, stream=False):
+    """
+    Returns the generated claims, or a generator of text chunks if stream is True.
+    """
+    if stream:
+        return stream_gemini(summary + prompt)
+    model = get_gemini_model()
     model.temperature = 0
-    response = model.generate_content(summary + prompt)
+    response = call_with_retry("gemini", model.generate_content, summary + prompt,
+                               request_options=gemini_options())
     return response.text
 
 
-def generate_gemini_keywords(claims, keyword_prompt):
+def generate_gemini_keywords(claims, keyword_prompt, deadline=None):
+    """
+    deadline: optional Deadline bounding the request and its retries
+    """
     try:
         # Initialize the generative model
-        model = genai.GenerativeModel('gemini-pro', generation_config=model_config)
+        model = get_gemini_model()
         
         # Generate the content based on the claims and keyword prompt
-        response = model.generate_content(keyword_prompt + claims)
+        response = call_with_retry("gemini", model.generate_content, keyword_prompt + claims,
+                                   timeout=deadline.timeout(60.0) if deadline is not None else 60.0,
+                                   request_options=gemini_options(deadline))
         
         # Check if the response has a valid 'text' part
         if hasattr(response, 'text'):
@@ -77,6 +126,7 @@ def generate_gemini_keywords(claims, keyword_prompt):
         return None
     
 def generate_gemini_results(claims, prompt):
-    model = genai.GenerativeModel('gemini-pro', generation_config=model_config)
-    response = model.generate_content(claims + prompt)
+    model = get_gemini_model()
+    response = call_with_retry("gemini", model.generate_content, claims + prompt,
+                               request_options=gemini_options())
     return response.text
@@ -0,0 +1,100 @@
+import os
+import re
+from claims.bm25 import BM25
+
+"""
+Token-budgeted context packing for the RAG prompt.
+
+Instead of stuffing the full title + abstract + conclusions of every retrieved paper into the prompt, each paper is
+split into sentences, placeholder/error text from the scraper ("Failed to fetch PMC content...") is dropped, and the
+sentences that best match the claim are packed until the token budget is used up. Sentences are regrouped per paper
+in their original order, with the PMID cited inline so the model can refer to the evidence.
+"""
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CLAIMS_CONTEXT_TOKENS", 1500))
+
+PLACEHOLDER_PATTERN = re.compile(
+    r"Failed to fetch PMC (content|article)|Conclusions section not found|No PMC article available", re.I)
+SECTION_PATTERN = re.compile(r"^(Title|Abstract|Conclusions):\s*", re.M)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+
+# Conclusions summarize the paper, so their sentences get a small boost
+SECTION_WEIGHTS = {"Abstract": 1.0, "Conclusions": 1.2}
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except Exception:
+    def count_tokens(text):
+        # Rough estimate for English text when tiktoken is not available
+        return max(1, len(text) // 4)
+
+
+def split_sections(page_content):
+    """
+    Splits the "Title: ...\\n\\nAbstract: ...\\n\\nConclusions: ..." page content of a document into a dict.
+    """
+    sections = {}
+    matches = list(SECTION_PATTERN.finditer(page_content))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(page_content)
+        sections[match.group(1)] = page_content[match.end():end].strip()
+    if not matches:
+        sections["Abstract"] = page_content.strip()
+    return sections
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(text) if sentence.strip()]
+
+
+def pack_context(documents, claim, max_tokens=CONTEXT_TOKEN_BUDGET):
+    """
+    Builds the prompt context for a claim from the retrieved documents within max_tokens.
+
+    documents: LangChain documents (best first) with the scraper's page content and a PMID in metadata
+    Returns the context string.
+    """
+    papers = []
+    sentences = []  # (paper index, position, section, text)
+    for paper, doc in enumerate(documents):
+        sections = split_sections(doc.page_content)
+        papers.append((doc.metadata.get("PMID", ""), sections.get("Title", "")))
+        for section in ("Abstract", "Conclusions"):
+            text = sections.get(section, "")
+            if not text or PLACEHOLDER_PATTERN.search(text):
+                continue
+            for sentence in split_sentences(text):
+                if not PLACEHOLDER_PATTERN.search(sentence):
+                    sentences.append((paper, len(sentences), section, sentence))
+    if not sentences:
+        return ""
+
+    relevance = BM25([text for _, _, _, text in sentences]).scores(claim)
+    scored = []
+    for (paper, position, section, text), score in zip(sentences, relevance):
+        # Earlier (better ranked) papers win ties
+        scored.append((score * SECTION_WEIGHTS[section] - 1e-3 * paper, paper, position, text))
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    selected = {}
+    used = 0
+    for _, paper, position, text in scored:
+        cost = count_tokens(text)
+        if paper not in selected:
+            pmid, title = papers[paper]
+            cost += count_tokens(f"{title} [PMID: {pmid}]")
+        if used + cost > max_tokens:
+            continue
+        selected.setdefault(paper, []).append((position, text))
+        used += cost
+
+    blocks = []
+    for paper in sorted(selected):
+        pmid, title = papers[paper]
+        body = " ".join(text for _, text in sorted(selected[paper]))
+        blocks.append(f"{title} [PMID: {pmid}]\n{body}")
+    return "\n\n".join(blocks)
@@ -0,0 +1,97 @@
+import math
+import os
+import time
+
+"""
+Latency budgets for claim validation.
+
+Every external request gets a timeout (REQUEST_TIMEOUTS), and every claim gets a time budget (CLAIM_BUDGET). The
+evidence stages run against a Deadline that ends ANSWER_RESERVE seconds before the claim budget, so there is always
+time left to answer. When the budget runs short the stages proceed with what they have instead of waiting:
+
+- pmc_skipped: some papers are used with their abstract only, without the PMC conclusions
+- fewer_papers: the search stopped before finding the wanted number of papers
+- search_timeout: the paper search failed or ran out of time
+- llm_fallback: no papers in time, the claim was answered by the LLM alone (generate_chain_results1)
+
+These labels are attached to the claim result, so the UI can mark it as degraded and the claim cache can skip it.
+"""
+
+CLAIM_BUDGET = float(os.getenv("CLAIMS_CLAIM_BUDGET", 60))
+ANSWER_RESERVE = float(os.getenv("CLAIMS_ANSWER_RESERVE", 20))
+# Below this much time left the PMC full text lookups are skipped
+PMC_RESERVE = 3.0
+
+REQUEST_TIMEOUTS = {
+    "ncbi": float(os.getenv("CLAIMS_NCBI_TIMEOUT", 15)),
+    "gemini": float(os.getenv("CLAIMS_GEMINI_TIMEOUT", 60)),
+    "openai": float(os.getenv("CLAIMS_OPENAI_TIMEOUT", 30)),
+}
+
+PMC_SKIPPED = "pmc_skipped"
+FEWER_PAPERS = "fewer_papers"
+SEARCH_TIMEOUT = "search_timeout"
+SEARCH_FAILED = "search_failed"
+LLM_FALLBACK = "llm_fallback"
+
+DEGRADED_DESCRIPTIONS = {
+    PMC_SKIPPED: "some papers were used without their full-text conclusions",
+    FEWER_PAPERS: "fewer papers than usual were searched",
+    SEARCH_TIMEOUT: "the paper search timed out",
+    SEARCH_FAILED: "the paper search failed",
+    LLM_FALLBACK: "no papers were found in time, answered without PubMed evidence",
+}
+
+
+class Deadline:
+    """
+    A point in time by which some work must be done. Deadline() (no budget) never expires.
+    The stages working against a deadline record what they left out in its degraded labels.
+    """
+    def __init__(self, budget=None):
+        self.expires = None if budget is None else time.monotonic() + budget
+        self.degraded = []
+
+    def remaining(self):
+        if self.expires is None:
+            return math.inf
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def child(self, reserve):
+        """
+        A deadline reserve seconds earlier than this one, e.g. for the stages before the answer.
+        """
+        child = Deadline()
+        if self.expires is not None:
+            child.expires = self.expires - reserve
+        # Labels recorded against the child belong to the same piece of work
+        child.degraded = self.degraded
+        return child
+
+    def degrade(self, label):
+        if label not in self.degraded:
+            self.degraded.append(label)
+
+    def timeout(self, cap=None):
+        """
+        Seconds left, capped at cap (None if neither limits it).
+        """
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        return None if remaining == math.inf else remaining
+
+
+def request_timeout(provider, deadline=None):
+    """
+    The timeout of one request to provider: the provider's request timeout, cut short by the deadline.
+    """
+    cap = REQUEST_TIMEOUTS.get(provider)
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+def describe_degraded(labels):
+    return "; ".join(DEGRADED_DESCRIPTIONS.get(label, label) for label in labels)
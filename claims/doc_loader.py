@@ -1,25 +1,28 @@
 from langchain_core.documents import Document
 from claims import logging
+from claims.records import ArticleRecord
 
-def load_documents(df):
+def load_documents(records):
     """
-    Converts a Dataframe of research papers into a list of LangChain document objects.
+    Converts research papers into a list of LangChain document objects.
 
     Parameters:
-    df: pandas.DataFrame of title, abstract, Conclusions, PMID, URL and normalized rank.
+    records: list of ArticleRecords, or a pandas.DataFrame of title, abstract, Conclusions, PMID, URL and normalized rank.
     Returns: A list of LangChain document objects with content being title, abstract and conclusions.
              Metadata: PMID, URL and normalized rank of journal
     """
     try:
+        if hasattr(records, 'to_dict') and hasattr(records, 'columns'):
+            records = [ArticleRecord.from_dict(row) for row in records.to_dict('records')]
+
         documents= []
-        for index, row in df.iterrows():
-            content = f"Title: {row['Title']}\n\nAbstract: {row['Abstract']}\n\nConclusions: {row['Conclusions']}"
+        for record in records:
             doc = Document(
-            page_content=content,
+            page_content=record.page_content,
             metadata={
-                "PMID": row['PMID'],
-                "URL": row['URL'],
-                "normalized_rank": row['normalized_rank']  # Include the rank in metadata
+                "PMID": record.pmid,
+                "URL": record.url,
+                "normalized_rank": record.normalized_rank  # Include the rank in metadata
             }
         )
             documents.append(doc)
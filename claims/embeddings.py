@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from claims import logging
+from claims.deadline import REQUEST_TIMEOUTS
+from claims.fakes import fake_embeddings, fake_backends_enabled
+
+"""
+Embedding backends for the claims, the papers and the paper index.
+
+A backend is any LangChain Embeddings (embed_documents / embed_query), which is what InMemoryVectorStore, the
+pipeline and the paper index work with. CLAIMS_EMBEDDING_BACKEND selects it:
+
+- openai (default): text-embedding-3-small over the API. One client per process (get_embedding_model) instead of a
+  new one for every video, so its HTTP connection pool is reused.
+- local: a small sentence-transformer (e.g. all-MiniLM-L6-v2) run on the CPU with ONNX Runtime, no network round
+  trip per store build. CLAIMS_LOCAL_EMBEDDING_MODEL points to a directory with the tokenizer.json and model.onnx
+  (or onnx/model.onnx) of the model, as published on the Hugging Face hub. Needs the onnxruntime and tokenizers
+  packages.
+
+The vectors of different backends are not comparable, so the paper index and the claim cache are versioned by
+embedding_model_name().
+"""
+
+OPENAI_EMBEDDING_MODEL = 'text-embedding-3-small'
+EMBEDDING_BACKEND = os.getenv("CLAIMS_EMBEDDING_BACKEND", "openai")
+LOCAL_EMBEDDING_MODEL = os.getenv("CLAIMS_LOCAL_EMBEDDING_MODEL", "models/all-MiniLM-L6-v2")
+LOCAL_BATCH_SIZE = 32
+LOCAL_MAX_LENGTH = 256
+LOCAL_WORKERS = int(os.getenv("CLAIMS_EMBEDDING_WORKERS", 2))
+
+
+def find_onnx_model(model_dir):
+    for path in (os.path.join(model_dir, "model.onnx"), os.path.join(model_dir, "onnx", "model.onnx")):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No model.onnx in {model_dir}")
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformer embeddings on the CPU with ONNX Runtime: mean pooled, L2 normalized token embeddings.
+
+    Texts are sorted by length and split into batches that are padded only to their own longest text (dynamic
+    padding), and the batches are encoded in parallel on a small thread pool (ONNX Runtime releases the GIL).
+    """
+    def __init__(self, model_dir, batch_size=LOCAL_BATCH_SIZE, max_length=LOCAL_MAX_LENGTH, workers=LOCAL_WORKERS,
+                 intra_op_threads=None):
+        """
+        model_dir: directory with tokenizer.json and model.onnx
+        max_length: longer texts are truncated to this many tokens
+        workers: batches encoded in parallel; the CPU cores are split between them unless intra_op_threads is given
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.no_padding()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.session = onnxruntime.InferenceSession(find_onnx_model(model_dir), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        output_names = [output.name for output in self.session.get_outputs()]
+        # Some exports already contain the pooling
+        self.output_name = "sentence_embedding" if "sentence_embedding" in output_names else output_names[0]
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embeddings")
+        logging.info(f"Loaded local embedding model {model_dir}")
+
+    def encode_batch(self, texts):
+        """
+        Embeds one batch of texts. Returns a (len(texts), dim) float32 array.
+        """
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        output = self.session.run([self.output_name], inputs)[0]
+
+        if output.ndim == 3:
+            weights = attention_mask[..., None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        return output / np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        vectors = [None] * len(texts)
+        encoded = self.executor.map(lambda batch: self.encode_batch([texts[i] for i in batch]), batches)
+        for batch, batch_vectors in zip(batches, encoded):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self.encode_batch([text])[0].tolist()
+
+
+def embedding_model_name(backend=EMBEDDING_BACKEND):
+    """
+    Name of the embedding model of a backend, used to version the stored vectors.
+    """
+    if backend == "local":
+        return f"local:{os.path.basename(os.path.normpath(LOCAL_EMBEDDING_MODEL))}"
+    return OPENAI_EMBEDDING_MODEL
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model(backend=EMBEDDING_BACKEND):
+    """
+    The process-wide embedding backend, created on first use.
+    """
+    if fake_backends_enabled():
+        return fake_embeddings()
+    if backend == "local":
+        return OnnxEmbeddings(LOCAL_EMBEDDING_MODEL)
+    if backend != "openai":
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    return OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, timeout=REQUEST_TIMEOUTS['openai'])
@@ -0,0 +1,144 @@
+import os
+import time
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+"""
+Fake LLM backends for tests, demos and load testing without API keys.
+
+Set CLAIMS_FAKE_BACKENDS=1 and the Gemini and OpenAI chat models and the embeddings used by the pipeline are
+replaced by these fakes, and so are the YouTube side (yt-dlp metadata and captions) and the punctuation model. The
+PubMed searches still go to the E-utilities; point CLAIMS_EUTILS_URL at a stub (e.g. the one in
+experiments/benchmark_scraper_service.py) to run fully offline.
+They answer from canned responses, support streaming (in chunks, with an optional per-chunk delay so streaming
+and time-to-first-byte behave like the real services) and never touch the network.
+
+FAKE_LATENCY adds a delay before every Gemini answer; it may also be a callable returning the delay, e.g. drawn from
+a heavy-tailed distribution to test deadlines. Like the real client, a request whose delay exceeds its
+request_options timeout fails with a TimeoutError after waiting for the timeout.
+"""
+
+FAKE_CHUNK_DELAY = float(os.getenv("CLAIMS_FAKE_CHUNK_DELAY", 0.0))
+FAKE_LATENCY = float(os.getenv("CLAIMS_FAKE_LATENCY", 0.0))
+
+FAKE_SUMMARY = ("The video discusses creatine supplementation for strength training. The speaker explains that "
+                "creatine monohydrate increases muscle strength and that drinking coffee before workouts improves "
+                "endurance performance.")
+
+FAKE_CLAIMS = ("* Creatine monohydrate supplementation increases muscle strength.\n"
+               "* Caffeine intake before exercise improves endurance performance.\n")
+
+FAKE_KEYWORDS = "- creatine\n- muscle\n- strength"
+
+FAKE_CUES = ["today we look at what the research says about creatine and caffeine",
+             "creatine monohydrate is one of the most studied supplements for muscle strength",
+             "trials show that supplementation increases strength and lean muscle mass",
+             "caffeine before exercise improves endurance performance in many athletes",
+             "the usual dose is three to five grams of creatine per day with enough water",
+             "people with kidney disease should talk to their doctor before taking supplements"]
+
+FAKE_VALIDATION = ('{"scientific_validation_summary": "Meta-analyses of randomized controlled trials support the claim.", '
+                   '"classification": "Scientific", '
+                   '"research_summary": "Supplementation consistently improves strength outcomes versus placebo.", '
+                   '"contradictory_claims": "None found."}')
+
+
+def fake_gemini_response(prompt):
+    """
+    Picks a canned answer for a prompt of the pipeline.
+    """
+    lowered = prompt.lower()
+    if "answer only with true or false" in lowered:
+        return "True"
+    if "keywords" in lowered:
+        return FAKE_KEYWORDS
+    if "claims generator" in lowered:
+        return FAKE_CLAIMS
+    if "summarizer" in lowered:
+        return FAKE_SUMMARY
+    return FAKE_VALIDATION
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Stands in for google.generativeai.GenerativeModel.
+    """
+    def __init__(self, responder=fake_gemini_response, chunk_size=24, delay=FAKE_CHUNK_DELAY, latency=None):
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.latency = FAKE_LATENCY if latency is None else latency
+
+    def _wait(self, request_options):
+        latency = self.latency() if callable(self.latency) else self.latency
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake Gemini request timed out after {timeout:.1f}s")
+        if latency:
+            time.sleep(latency)
+
+    def _chunks(self, text):
+        for start in range(0, len(text), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            yield FakeResponse(text[start:start + self.chunk_size])
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self._wait(request_options)
+        text = self.responder(prompt)
+        if stream:
+            return self._chunks(text)
+        if self.delay:
+            time.sleep(self.delay * max(1, len(text) // self.chunk_size))
+        return FakeResponse(text)
+
+
+def fake_video_metadata(video_url):
+    """
+    Stands in for the yt-dlp metadata of prefilter.fetch_video_metadata: an English health video with captions.
+    """
+    return {"id": video_url, "title": "Creatine and caffeine: what the research says",
+            "description": "Supplements, muscle strength and endurance performance explained.",
+            "channel_id": "UCfakechannel", "channel": "Fake Health Channel", "categories": ["Education"],
+            "tags": ["creatine", "caffeine", "supplements", "fitness"], "language": "en",
+            "subtitles": {"en": [{"ext": "vtt"}]}, "automatic_captions": {}}
+
+
+def fake_subtitles():
+    """
+    Stands in for the downloaded WebVTT captions.
+    """
+    cues = [f"00:00:{4 * i:02d}.000 --> 00:00:{4 * i + 4:02d}.000\n{cue}\n" for i, cue in enumerate(FAKE_CUES)]
+    return "WEBVTT\nKind: captions\nLanguage: en\n\n" + "\n".join(cues)
+
+
+class FakePunctuationModel:
+    """
+    Stands in for deepmultilingualpunctuation.PunctuationModel.
+    """
+    def restore_punctuation(self, text):
+        return text.rstrip(".") + "."
+
+
+def fake_chat_model(responses=None, delay=FAKE_CHUNK_DELAY):
+    """
+    Stands in for ChatOpenAI. FakeListChatModel streams its answers one character at a time.
+    """
+    return FakeListChatModel(responses=responses or [FAKE_VALIDATION], sleep=delay or None)
+
+
+def fake_embeddings(size=384):
+    """
+    Stands in for the embedding backends: a deterministic pseudo-random vector per text.
+    """
+    return DeterministicFakeEmbedding(size=size)
+
+
+def fake_backends_enabled():
+    return os.getenv("CLAIMS_FAKE_BACKENDS", "").lower() in ("1", "true", "yes")
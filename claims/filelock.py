@@ -0,0 +1,34 @@
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process deployments only
+    fcntl = None
+
+"""
+Advisory file locks so that several app worker processes can share the on-disk caches (paper index, claim cache).
+flock locks belong to the open file, so a process must not take the same lock twice through nested FileLocks.
+"""
+
+
+class FileLock:
+    """
+    Context manager holding an exclusive (or shared) flock on a lock file.
+    """
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        self.lock_file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.lock_file = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
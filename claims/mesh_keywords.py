@@ -0,0 +1,201 @@
+import gzip
+import re
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from functools import lru_cache
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer
+from nltk.tokenize import word_tokenize
+from claims import logging
+from claims.bm25 import STOPWORDS
+
+"""
+Local keyword extraction for the PubMed queries: claim text -> MeSH descriptors, without an LLM round trip.
+
+The vocabulary is built offline from the MeSH descriptor dump (desc<year>.xml from
+https://nlmpubs.nlm.nih.gov/projects/mesh/MESH_FILES/xmlmesh/): every descriptor name and entry term of the
+health related trees is tokenized, stemmed and stored with its descriptor in a gzipped TSV file.
+
+    python -m claims.mesh_keywords desc2024.xml mesh_vocabulary.tsv.gz
+
+At run time the entry terms are held in a hash-based trie (a dict of stemmed token tuples plus the set of their
+prefixes), so a claim is matched greedily, longest term first, with a few dict lookups per token. The descriptors
+found are PubMed-ready MeSH terms. The match is confident when the descriptors cover most of the content words of the
+claim; otherwise the caller should fall back to the LLM keyword extraction (generate_gemini_keywords).
+"""
+
+# A: anatomy, B: organisms, C: diseases, D: chemicals and drugs, E: techniques, F: psychiatry and psychology,
+# G: phenomena and processes, N: health care
+MESH_TREES = set("ABCDEFGN")
+# Descriptors too general to narrow a search
+GENERIC_DESCRIPTORS = frozenset({
+    "Humans", "Animals", "Disease", "Therapeutics", "Health", "Research", "Risk", "Patients", "Body Weight",
+    "Time", "Eating", "Food", "Methods", "Population", "Life", "Cells",
+})
+# Claim wording that carries no search topic
+CLAIM_WORDS = frozenset("""
+increase increases increased increasing improve improves improved improving reduce reduces reduced reducing
+lower lowers lowered boost boosts help helps helped prevent prevents cause causes caused make makes made lead leads
+good bad better best worse effect effects effective benefit benefits beneficial people person body daily every
+""".split())
+MAX_TERMS = 3
+MIN_COVERAGE = 0.6
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=None)
+def stopword_set():
+    try:
+        return frozenset(stopwords.words("english")) | STOPWORDS
+    except LookupError:
+        # NLTK stopwords data not installed
+        return STOPWORDS
+
+
+@lru_cache(maxsize=100000)
+def stem(token):
+    return _stemmer.stem(token)
+
+
+def tokenize(text):
+    """
+    Lowercased word tokens of a text, without punctuation.
+    """
+    try:
+        tokens = word_tokenize(text.lower())
+    except LookupError:
+        # NLTK punkt data not installed
+        tokens = re.findall(r"[\w-]+", text.lower())
+    return [token for token in tokens if any(character.isalnum() for character in token)]
+
+
+def normalize_term(text):
+    """
+    The stemmed token tuple of an entry term or of a piece of claim text.
+    """
+    return tuple(stem(token) for token in tokenize(text))
+
+
+def is_stopword(token):
+    return token in stopword_set() or token in CLAIM_WORDS
+
+
+@dataclass(slots=True)
+class KeywordMatch:
+    terms: list          # MeSH descriptor names, most specific first
+    coverage: float      # share of the content words of the claim covered by the terms
+    confident: bool
+
+
+def read_mesh_descriptors(path, trees=MESH_TREES):
+    """
+    Streams (descriptor name, entry terms, tree depth) of the descriptors in the given MeSH trees.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as mesh_file:
+        for _, element in ET.iterparse(mesh_file):
+            if element.tag != "DescriptorRecord":
+                continue
+            tree_numbers = [node.text for node in element.findall("TreeNumberList/TreeNumber") if node.text]
+            if any(number[0] in trees for number in tree_numbers):
+                name = element.findtext("DescriptorName/String")
+                terms = {term.text for term in element.iterfind("ConceptList/Concept/TermList/Term/String")
+                         if term.text}
+                depth = max(number.count(".") + 1 for number in tree_numbers)
+                yield name, sorted(terms | {name}), depth
+            element.clear()
+
+
+def build_vocabulary(mesh_path, output_path):
+    """
+    Writes the stemmed entry terms of the MeSH dump to a gzipped TSV (term, descriptor, depth). Returns the number of
+    terms written.
+    """
+    count = 0
+    with gzip.open(output_path, "wt", encoding="utf-8") as output_file:
+        for name, terms, depth in read_mesh_descriptors(mesh_path):
+            for term in terms:
+                # Inverted forms ("Acids, Fatty") duplicate the natural order entries
+                if ", " in term:
+                    continue
+                key = normalize_term(term)
+                if not key or all(is_stopword(token) for token in tokenize(term)):
+                    continue
+                output_file.write(f"{' '.join(key)}\t{name}\t{depth}\n")
+                count += 1
+    return count
+
+
+class MeshKeywordExtractor:
+    """
+    Matches claim text against the MeSH entry terms of a vocabulary file built with build_vocabulary.
+    """
+    def __init__(self, terms, max_terms=MAX_TERMS, min_coverage=MIN_COVERAGE):
+        """
+        terms: dict of stemmed token tuple -> (descriptor, depth)
+        """
+        self.terms = terms
+        self.prefixes = {key[:length] for key in terms for length in range(1, len(key))}
+        self.max_terms = max_terms
+        self.min_coverage = min_coverage
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        terms = {}
+        with gzip.open(path, "rt", encoding="utf-8") as vocabulary_file:
+            for line in vocabulary_file:
+                key, name, depth = line.rstrip("\n").split("\t")
+                key = tuple(key.split(" "))
+                # On collisions keep the more specific descriptor
+                if key not in terms or int(depth) > terms[key][1]:
+                    terms[key] = (name, int(depth))
+        logging.info(f"Loaded {len(terms)} MeSH entry terms from {path}")
+        return cls(terms, **kwargs)
+
+    def _longest_match(self, stems, start):
+        best = None
+        for end in range(start + 1, len(stems) + 1):
+            key = tuple(stems[start:end])
+            if key in self.terms:
+                best = end, self.terms[key]
+            if key not in self.prefixes:
+                break
+        return best
+
+    def extract(self, text):
+        """
+        Returns the KeywordMatch of a claim.
+        """
+        tokens = tokenize(text)
+        stems = [stem(token) for token in tokens]
+        content = [not is_stopword(token) for token in tokens]
+
+        found = {}
+        covered = 0
+        position = 0
+        while position < len(tokens):
+            match = self._longest_match(stems, position) if content[position] else None
+            if match is None:
+                position += 1
+                continue
+            end, (name, depth) = match
+            if name not in GENERIC_DESCRIPTORS:
+                covered += sum(content[position:end])
+                score = (end - position, depth)
+                found[name] = max(found.get(name, score), score)
+            position = end
+
+        n_content = sum(content)
+        coverage = covered / n_content if n_content else 0.0
+        terms = sorted(found, key=found.get, reverse=True)[:self.max_terms]
+        return KeywordMatch(terms, coverage, bool(terms) and coverage >= self.min_coverage)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m claims.mesh_keywords <desc20XX.xml[.gz]> <mesh_vocabulary.tsv.gz>")
+        sys.exit(1)
+    written = build_vocabulary(sys.argv[1], sys.argv[2])
+    print(f"Wrote {written} MeSH entry terms to {sys.argv[2]}")
@@ -0,0 +1,249 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+from claims import logging
+from claims.claim_cache import SIMILARITY_THRESHOLD
+from claims.claim_generator import generate_gemini_keywords
+from claims.deadline import Deadline, CLAIM_BUDGET, ANSWER_RESERVE, SEARCH_TIMEOUT, SEARCH_FAILED, LLM_FALLBACK
+from claims.doc_loader import load_documents
+from claims.ratelimit import call_with_retry
+from claims.retrieval import InMemoryVectorStore, CustomRetriever, search_paper_index
+from claims.Tokenizer import extract_keywords
+from claims.utils import rank_records
+
+"""
+Overlapped claim validation pipeline.
+
+The stages of the claim view used to run as barriers: every claim had to be generated and the health check had to
+finish before the PubMed search of the first claim could start. Here claims are parsed from the streamed claim
+generation as soon as their line is complete, and every claim immediately enters its own chain
+
+    embed -> dedupe / claim cache -> paper index or keywords -> scrape -> rank -> embed papers
+
+on a thread pool, while the remaining claims are still being generated. The health check runs speculatively
+next to it; if it fails, the pending work is cancelled and running chains stop at their next stage boundary.
+The answer stage (RAG over the prepared retriever) is left to the caller, which streams it into the UI in claim
+order.
+
+Every chain runs against a claim budget (see deadline.py) that starts when a worker picks the claim up. The evidence
+stages must finish ANSWER_RESERVE seconds before it ends; when they run out of time the claim proceeds with the
+papers found so far, or with none (the LLM-only fallback), and the result lists the degradations.
+"""
+
+PIPELINE_WORKERS = int(os.getenv("CLAIMS_PIPELINE_WORKERS", 4))
+
+
+class PipelineCancelled(Exception):
+    """
+    Raised inside a claim chain when the pipeline was cancelled (e.g. the video failed the health check).
+    """
+
+
+class ClaimStreamParser:
+    """
+    Incrementally parses "* claim" lines from streamed claim generation output.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+
+    def _parse(self, line):
+        line = line.strip()
+        return line.lstrip('* ').strip() if line.startswith('* ') else None
+
+    def feed(self, chunk):
+        """
+        Adds a chunk of streamed text; returns the claims whose lines are now complete.
+        """
+        self.text += chunk
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split("\n")
+        return [claim for claim in map(self._parse, lines) if claim]
+
+    def close(self):
+        """
+        Returns the claim on the last line, if the output did not end with a newline.
+        """
+        claim = self._parse(self.buffer)
+        self.buffer = ""
+        return [claim] if claim else []
+
+
+@dataclass(slots=True)
+class ClaimResult:
+    index: int
+    claim: str
+    embedding: list = None
+    duplicate_of: int = None
+    cached: dict = None
+    documents: list = None
+    retriever: CustomRetriever = None
+    deadline: Deadline = None
+    degraded: list = None
+
+
+class ClaimPipeline:
+    """
+    Runs the evidence chain of every claim on a thread pool as soon as the claim is parsed.
+    """
+    def __init__(self, embedding_model, scraper_factory, rankings, keyword_prompt, claim_cache=None,
+                 paper_index=None, dedupe_threshold=SIMILARITY_THRESHOLD, max_workers=PIPELINE_WORKERS,
+                 claim_budget=CLAIM_BUDGET, answer_reserve=ANSWER_RESERVE, keyword_extractor=None):
+        """
+        embedding_model: LangChain embeddings used for the claims and the papers
+        scraper_factory: callable returning a PubMedScraper
+        rankings: utils.JournalRankings table
+        keyword_prompt: prompt for the Gemini keyword extraction
+        claim_budget: seconds per claim (None for no budget), of which answer_reserve are kept for the answer
+        keyword_extractor: optional local MeshKeywordExtractor; Gemini is only asked when it is not confident
+        """
+        self.embedding_model = embedding_model
+        self.scraper_factory = scraper_factory
+        self.rankings = rankings
+        self.keyword_prompt = keyword_prompt
+        self.claim_cache = claim_cache
+        self.paper_index = paper_index
+        self.dedupe_threshold = dedupe_threshold
+        self.claim_budget = claim_budget
+        self.answer_reserve = answer_reserve
+        self.keyword_extractor = keyword_extractor
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="claim-pipeline")
+        self.cancelled = threading.Event()
+        self.futures = []
+        self.speculative = []
+
+        # Dedupe assignments are made in claim order, even though the embeddings arrive out of order
+        self.dedupe_lock = threading.Lock()
+        self.registered = []
+        self.representatives = []
+
+    def submit(self, claim):
+        """
+        Starts the evidence chain of the next claim. Returns its future (resolving to a ClaimResult).
+        """
+        index = len(self.futures)
+        self.registered.append(threading.Event())
+        future = self.executor.submit(self._prepare, index, claim)
+        self.futures.append(future)
+        return future
+
+    def speculate(self, fn, *args):
+        """
+        Runs fn(*args) (e.g. the health check) next to the claim chains. Returns its future.
+        """
+        future = self.executor.submit(fn, *args)
+        self.speculative.append(future)
+        return future
+
+    def cancel(self):
+        self.cancelled.set()
+        for future in self.futures + self.speculative:
+            future.cancel()
+        for event in self.registered:
+            event.set()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def results(self):
+        """
+        Yields the ClaimResult futures in claim order.
+        """
+        yield from self.futures
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise PipelineCancelled()
+
+    def _dedupe(self, index, embedding):
+        # Wait until every earlier claim is registered, so the first claim of a group is its representative
+        if index:
+            self.registered[index - 1].wait()
+        try:
+            with self.dedupe_lock:
+                vector = np.asarray(embedding, dtype=np.float32)
+                vector = vector / max(float(np.linalg.norm(vector)), 1e-12)
+                for rep_index, rep_vector in self.representatives:
+                    if float(vector @ rep_vector) >= self.dedupe_threshold:
+                        return rep_index
+                self.representatives.append((index, vector))
+                return index
+        finally:
+            self.registered[index].set()
+
+    def _keywords(self, index, claim, deadline):
+        """
+        The search topics of a claim and whether they are MeSH terms: the descriptors from the local extractor, or
+        the Gemini keywords (free text) if it is not confident.
+        """
+        if self.keyword_extractor is not None:
+            match = self.keyword_extractor.extract(claim)
+            if match.confident:
+                logging.info(f"MeSH terms for claim {index + 1}: {match.terms}")
+                return match.terms, True
+        return extract_keywords(generate_gemini_keywords(claim, self.keyword_prompt, deadline=deadline)), False
+
+    def _prepare(self, index, claim):
+        deadline = Deadline(self.claim_budget)
+        evidence = deadline.child(self.answer_reserve)
+        result = ClaimResult(index, claim, deadline=deadline, degraded=deadline.degraded)
+        try:
+            self._check()
+            result.embedding = call_with_retry("openai", self.embedding_model.embed_query, claim,
+                                               timeout=evidence.timeout(60.0))
+        finally:
+            if result.embedding is None:
+                self.registered[index].set()
+        representative = self._dedupe(index, result.embedding)
+        if representative != index:
+            result.duplicate_of = representative
+            return result
+
+        if self.claim_cache is not None:
+            result.cached = self.claim_cache.lookup(result.embedding)
+            if result.cached:
+                return result
+
+        self._check()
+        documents, embeddings = [], None
+        if self.paper_index is not None:
+            documents, embeddings = search_paper_index(self.paper_index, self.embedding_model, claim,
+                                                       query_embedding=result.embedding)
+
+        if not documents:
+            self._check()
+            topics, mesh_terms = self._keywords(index, claim, evidence)
+            self._check()
+            records = []
+            if evidence.expired():
+                evidence.degrade(SEARCH_TIMEOUT)
+            else:
+                try:
+                    records = self.scraper_factory().run_records(topics, deadline=evidence, mesh_terms=mesh_terms)
+                except TimeoutError as e:
+                    logging.info(f"Error searching papers for claim {index + 1}: {e!r}")
+                    evidence.degrade(SEARCH_TIMEOUT)
+                except Exception as e:
+                    # Any other search failure still gets the LLM-only answer
+                    logging.info(f"Error searching papers for claim {index + 1}: {e!r}")
+                    evidence.degrade(SEARCH_FAILED)
+            if records:
+                documents = load_documents(rank_records(records, self.rankings))
+            elif result.degraded:
+                evidence.degrade(LLM_FALLBACK)
+
+        if documents:
+            self._check()
+            store = InMemoryVectorStore(documents, self.embedding_model, embeddings=embeddings,
+                                        paper_index=self.paper_index, query_embeddings={claim: result.embedding})
+            result.retriever = CustomRetriever(vectorstore=store)
+            # Small candidate sets are ranked lexically only, without embedding the papers
+            if store.embeddings is None and result.retriever.use_dense():
+                store.create_embeddings()
+        result.documents = documents
+        degraded = f" (degraded: {', '.join(result.degraded)})" if result.degraded else ""
+        logging.info(f"Prepared claim {index + 1} with {len(documents)} papers{degraded}")
+        return result
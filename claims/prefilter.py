@@ -0,0 +1,163 @@
+import json
+import subprocess
+import time
+from collections import Counter
+from dataclasses import dataclass
+from claims import logging
+from claims.bm25 import TOKEN_PATTERN, STOPWORDS
+from claims.fakes import fake_video_metadata, fake_backends_enabled
+
+"""
+Cheap pre-filter that rejects non-health and non-English videos before the expensive stages.
+
+The LLM health check needs the full transcript, punctuation restoration, summary and claims, so a cooking video or
+a Spanish vlog used to burn the whole front of the pipeline before being rejected. This stage looks at the yt-dlp
+metadata (title, description, tags, category, caption languages) and at the first caption cues, and scores them
+with a small local keyword classifier:
+
+- accept: clearly about health, the LLM health check is skipped
+- reject: no English captions, a non-English video or clearly not about health, the pipeline stops right away
+- ambiguous: the LLM health check still decides, as before
+"""
+
+ACCEPT = "accept"
+REJECT = "reject"
+AMBIGUOUS = "ambiguous"
+
+PREFILTER_CUES = 60
+METADATA_TIMEOUT = 30
+
+# Share of health terms among the content tokens, and number of distinct health terms
+ACCEPT_DENSITY = 0.04
+ACCEPT_MIN_TERMS = 5
+REJECT_DENSITY = 0.005
+REJECT_MAX_TERMS = 1
+
+# Rejecting on missing health vocabulary needs enough text (a bare title is not enough)
+MIN_REJECT_TOKENS = 80
+
+# English prose is roughly 40-50% function words; other languages in latin script score far lower
+MIN_ENGLISH_RATIO = 0.15
+MIN_LANGUAGE_TOKENS = 40
+
+HEALTH_TERMS = frozenset("""
+health healthy healthier disease diseases illness chronic symptom symptoms diagnosis treatment treatments therapy
+medicine medical medication medications drug drugs doctor doctors physician clinical clinic patient patients
+trial trials placebo research scientists evidence dose doses dosage mg supplement supplements supplementation
+vitamin vitamins mineral minerals magnesium zinc iron calcium omega fish-oil creatine protein proteins amino
+diet diets dietary nutrition nutrient nutrients nutritional food foods eating meal meals fasting intermittent keto
+ketogenic carb carbs carbohydrate carbohydrates sugar sugars fiber fat fats calorie calories metabolism metabolic
+obesity weight insulin glucose diabetes cholesterol ldl hdl triglycerides blood pressure hypertension heart
+cardiovascular artery arteries stroke cancer tumor tumors inflammation inflammatory immune immunity infection virus
+bacteria gut microbiome liver kidney kidneys brain cognitive dementia alzheimers memory sleep insomnia
+circadian melatonin stress cortisol anxiety depression mental hormone hormones testosterone estrogen thyroid
+exercise exercises workout training muscle muscles strength cardio aerobic fitness mobility longevity aging lifespan
+mortality risk skin bone bones joint joints pain injury recovery pregnancy fertility cells cell mitochondria
+""".split())
+
+NON_HEALTH_CATEGORIES = frozenset([
+    "Music", "Gaming", "Comedy", "Film & Animation", "Autos & Vehicles", "Travel & Events", "Pets & Animals",
+])
+
+
+@dataclass(slots=True)
+class PrefilterDecision:
+    verdict: str
+    reason: str
+    density: float = 0.0
+    terms: int = 0
+
+
+def fetch_video_metadata(video_url):
+    """
+    Returns the yt-dlp JSON metadata of the video (no download), or None if it could not be fetched.
+    """
+    if fake_backends_enabled():
+        return fake_video_metadata(video_url)
+    try:
+        command = ['yt-dlp', '-J', '--skip-download', '--no-playlist', video_url]
+        result = subprocess.run(command, capture_output=True, text=True, check=True, encoding="utf-8",
+                                timeout=METADATA_TIMEOUT)
+        return json.loads(result.stdout)
+    except Exception as e:
+        logging.info(f"Error fetching video metadata: {e}")
+        return None
+
+
+def caption_language(metadata, language='en'):
+    """
+    Checks the caption tracks of the video.
+    Returns (has_captions, original_language); original_language is None when yt-dlp does not report it.
+    """
+    manual = metadata.get("subtitles") or {}
+    auto = metadata.get("automatic_captions") or {}
+    has_captions = language in manual or language in auto
+
+    # Auto captions are offered in every language as machine translations; the original track is "<lang>-orig"
+    original = metadata.get("language")
+    if not original:
+        original = next((key[:-len("-orig")] for key in auto if key.endswith("-orig")), None)
+    return has_captions, original
+
+
+def english_ratio(text):
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < MIN_LANGUAGE_TOKENS:
+        return None
+    return sum(token in STOPWORDS for token in tokens) / len(tokens)
+
+
+def health_score(text):
+    """
+    Returns (density, distinct terms, content tokens) of the health vocabulary in the text.
+    """
+    tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+    if not tokens:
+        return 0.0, 0, 0
+    counts = Counter(token for token in tokens if token in HEALTH_TERMS)
+    return sum(counts.values()) / len(tokens), len(counts), len(tokens)
+
+
+def prefilter_video(metadata=None, cues=None, language='en'):
+    """
+    Classifies the video as accept, reject or ambiguous from its metadata and the first caption cues.
+
+    metadata: output of fetch_video_metadata (may be None)
+    cues: caption lines (e.g. from youtube_transcript_downloader.parse_cues), only the first PREFILTER_CUES are used
+    """
+    start = time.perf_counter()
+    decision = _classify(metadata or {}, (cues or [])[:PREFILTER_CUES], language)
+    logging.info(f"Pre-filter: {decision.verdict} ({decision.reason}, density {decision.density:.3f}, "
+                 f"{decision.terms} terms) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return decision
+
+
+def _classify(metadata, cues, language):
+    if "subtitles" in metadata or "automatic_captions" in metadata:
+        has_captions, original = caption_language(metadata, language)
+        if not has_captions:
+            return PrefilterDecision(REJECT, f"no {language} captions")
+        if original and not original.lower().startswith(language):
+            return PrefilterDecision(REJECT, f"video language is {original}")
+
+    cue_text = " ".join(cues)
+    ratio = english_ratio(cue_text)
+    if ratio is not None and language == 'en' and ratio < MIN_ENGLISH_RATIO:
+        return PrefilterDecision(REJECT, f"captions do not look like English ({ratio:.2f})")
+
+    text = " ".join([metadata.get("title") or "", metadata.get("description") or "",
+                     " ".join(metadata.get("tags") or []), cue_text])
+    density, terms, n_tokens = health_score(text)
+    categories = set(metadata.get("categories") or [])
+
+    if not n_tokens:
+        return PrefilterDecision(AMBIGUOUS, "nothing to classify")
+    if density >= ACCEPT_DENSITY and terms >= ACCEPT_MIN_TERMS:
+        return PrefilterDecision(ACCEPT, "health vocabulary", density, terms)
+    if categories & NON_HEALTH_CATEGORIES and terms <= REJECT_MAX_TERMS:
+        return PrefilterDecision(REJECT, f"category {', '.join(sorted(categories))}", density, terms)
+    if n_tokens < MIN_REJECT_TOKENS:
+        return PrefilterDecision(AMBIGUOUS, "too little text", density, terms)
+    if density <= REJECT_DENSITY and terms <= REJECT_MAX_TERMS:
+        return PrefilterDecision(REJECT, "no health vocabulary", density, terms)
+    return PrefilterDecision(AMBIGUOUS, "unclear topic", density, terms)
@@ -0,0 +1,86 @@
+import argparse
+import gc
+import os
+import signal
+import sys
+from claims import logging, setup_logging
+from claims.assets import warm_up
+
+"""
+Multi-process deployment mode.
+
+Streamlit runs every session of an instance in one Python process. To scale out on one machine, this launcher loads
+the shared read-only assets once (see assets.warm_up), then forks N Streamlit workers on consecutive ports. The
+workers share those pages copy-on-write, so each extra worker only costs its own per-session memory. Put any load
+balancer with sticky sessions (Streamlit sessions are websockets) in front of the ports.
+
+Workers share the on-disk caches (paper index, claim cache) through file locks, split the API rate limits evenly
+(CLAIMS_WORKERS) and log to their own file (logs/claims.worker<N>.log).
+
+Usage (Linux/macOS):
+    python -m claims.prefork --workers 4 --base-port 8501 app.py
+"""
+
+
+def run_worker(script, port, worker_id, streamlit_args):
+    # The log listener thread of the parent does not survive the fork
+    setup_logging(file_name=f"claims.worker{worker_id}.log")
+    logging.info(f"Worker {worker_id} (pid {os.getpid()}) serving {script} on port {port}")
+
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", script, "--server.port", str(port), "--server.headless", "true"] + list(streamlit_args)
+    stcli.main()
+
+
+def launch(script="app.py", workers=2, base_port=8501, streamlit_args=(), load_punctuation_model=True):
+    """
+    Warms up the shared assets, forks the workers and waits for them. Returns when all workers have exited.
+    """
+    os.environ["CLAIMS_WORKERS"] = str(workers)
+    warm_up(load_punctuation_model=load_punctuation_model)
+
+    # Move everything loaded so far out of the GC's reach, so collections in the workers don't write to
+    # (and thereby copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    for worker_id in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(script, base_port + worker_id, worker_id, streamlit_args)
+            finally:
+                os._exit(0)
+        children[pid] = worker_id
+    logging.info(f"Started {workers} workers: {children}")
+
+    def stop(signum, frame):
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        worker_id = children.pop(pid, None)
+        logging.info(f"Worker {worker_id} (pid {pid}) exited with status {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run several Streamlit workers sharing warm read-only assets.")
+    parser.add_argument("script", nargs="?", default="app.py")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--base-port", type=int, default=8501)
+    parser.add_argument("--no-punctuation-model", action="store_true",
+                        help="skip preloading the punctuation model (e.g. when testing without it)")
+    args, streamlit_args = parser.parse_known_args()
+    launch(args.script, args.workers, args.base_port, streamlit_args,
+           load_punctuation_model=not args.no_punctuation_model)
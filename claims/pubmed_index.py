@@ -0,0 +1,204 @@
+import gzip
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+from claims import logging
+from claims.bm25 import tokenize
+from claims.sqlite_util import ThreadConnections
+
+"""
+A local evidence backend built from the PubMed baseline/update files (https://ftp.ncbi.nlm.nih.gov/pubmed/baseline/).
+
+The gzipped XML files are parsed as a stream (one PubmedArticle at a time) into an SQLite database (pubmed.db):
+
+    articles(id, pmid, title, abstract, record)    one JSON record per article (PMID, title, abstract, journal, URL)
+    articles_fts                                   FTS5 index over title and abstract, kept in sync by triggers
+
+Keyword queries (e.g. from generate_gemini_keywords) can then be answered locally in milliseconds. A query only
+reads the pages of the postings and records it needs, so opening the index costs nothing however large it is, and
+the app workers share the OS page cache instead of each holding a copy of the index.
+Update files are applied in order: a newer version of a PMID replaces the old one and DeleteCitation removes it.
+
+Build an index with:
+    python -m claims.pubmed_index <index_dir> pubmed24n0001.xml.gz pubmed24n0002.xml.gz ...
+"""
+
+INDEX_FILE = "pubmed.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    pmid TEXT NOT NULL UNIQUE,
+    title TEXT,
+    abstract TEXT,
+    record TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, abstract, content='articles', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS articles_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, abstract) VALUES (new.id, new.title, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_delete AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts (articles_fts, rowid, title, abstract) VALUES ('delete', old.id, old.title, old.abstract);
+END;
+"""
+
+
+def _text(element):
+    return "".join(element.itertext()).strip() if element is not None else ""
+
+
+def parse_article(element):
+    """
+    Converts a <PubmedArticle> element into the same record layout the live scraper produces.
+    """
+    citation = element.find("MedlineCitation")
+    if citation is None:
+        return None
+    pmid = _text(citation.find("PMID"))
+    article = citation.find("Article")
+    if not pmid or article is None:
+        return None
+
+    abstract = " ".join(_text(part) for part in article.findall("Abstract/AbstractText"))
+    return {
+        "PMID": pmid,
+        "Title": _text(article.find("ArticleTitle")),
+        "Abstract": abstract,
+        "Journal": _text(article.find("Journal/Title")),
+        "ISSN": _text(article.find("Journal/ISSN")),
+        "ISSNLinking": _text(citation.find("MedlineJournalInfo/ISSNLinking")),
+        "NlmUniqueID": _text(citation.find("MedlineJournalInfo/NlmUniqueID")),
+        "URL": f"https://www.ncbi.nlm.nih.gov/pubmed/{pmid}",
+    }
+
+
+def iter_pubmed_xml(path):
+    """
+    Streams ("article", record) and ("delete", pmid) events from a PubMed XML file, gzipped or not.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as xml_file:
+        context = ET.iterparse(xml_file, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event != "end":
+                continue
+            if element.tag == "PubmedArticle":
+                record = parse_article(element)
+                if record is not None:
+                    yield "article", record
+                root.clear()
+            elif element.tag == "DeleteCitation":
+                for pmid in element.findall("PMID"):
+                    yield "delete", _text(pmid)
+                root.clear()
+
+
+class PubMedIndex:
+    """
+    SQLite store of PubMed records with an FTS5 full-text index over title and abstract. Thread and process safe
+    (see sqlite_util.ThreadConnections).
+    """
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, INDEX_FILE)
+        self.connections = ThreadConnections(self.path)
+        os.makedirs(index_dir, exist_ok=True)
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def connection(self):
+        return self.connections.get()
+
+    def __len__(self):
+        return self.connection().execute("SELECT count(*) FROM articles").fetchone()[0]
+
+    def __contains__(self, pmid):
+        row = self.connection().execute("SELECT 1 FROM articles WHERE pmid = ?", (str(pmid),)).fetchone()
+        return row is not None
+
+    def _delete(self, connection, pmid):
+        connection.execute("DELETE FROM articles WHERE pmid = ?", (str(pmid),))
+
+    def _add(self, connection, record):
+        # A newer version of a PMID replaces the old one (and its full-text entry, through the delete trigger)
+        self._delete(connection, record["PMID"])
+        connection.execute("INSERT INTO articles (pmid, title, abstract, record) VALUES (?, ?, ?, ?)",
+                           (record["PMID"], record["Title"], record["Abstract"], json.dumps(record, ensure_ascii=False)))
+
+    def delete(self, pmid):
+        with self.connection() as connection:
+            self._delete(connection, pmid)
+
+    def add_records(self, records):
+        """
+        Adds records (dicts with PMID, Title, Abstract, Journal, URL) to the store and the full-text index.
+        """
+        with self.connection() as connection:
+            for record in records:
+                self._add(connection, record)
+
+    def ingest(self, xml_path):
+        """
+        Streams one baseline or update file into the index, in a single transaction. Returns the number of articles
+        added.
+        """
+        added = 0
+        with self.connection() as connection:
+            for event, payload in iter_pubmed_xml(xml_path):
+                if event == "article":
+                    self._add(connection, payload)
+                    added += 1
+                else:
+                    self._delete(connection, payload)
+        logging.info(f"Ingested {added} articles from {xml_path}")
+        return added
+
+    def get(self, pmid):
+        """
+        Reads a single record by PMID, or None if it is not in the index.
+        """
+        row = self.connection().execute("SELECT record FROM articles WHERE pmid = ?", (str(pmid),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, topics, k=10, require_all=False):
+        """
+        BM25 search over title and abstract.
+
+        topics: list of keywords/phrases (e.g. from extract_keywords)
+        require_all: only return documents containing every query term
+        Returns a list of (PMID, score), best first.
+        """
+        query_terms = sorted({term for topic in topics for term in tokenize(topic)})
+        if not query_terms:
+            return []
+        # Quoted, so FTS5 treats every term as a string (a hyphenated term becomes a phrase)
+        match = (" AND " if require_all else " OR ").join(f'"{term}"' for term in query_terms)
+        rows = self.connection().execute(
+            "SELECT a.pmid, -f.rank FROM articles_fts f JOIN articles a ON a.id = f.rowid "
+            "WHERE articles_fts MATCH ? ORDER BY f.rank LIMIT ?", (match, k)).fetchall()
+        return [(pmid, score) for pmid, score in rows]
+
+
+def build_index(index_dir, xml_paths):
+    """
+    Ingests the given baseline/update files in order.
+    """
+    index = PubMedIndex(index_dir)
+    for xml_path in xml_paths:
+        index.ingest(xml_path)
+    with index.connection() as connection:
+        # Merges the FTS5 segments written during the ingest, for faster queries
+        connection.execute("INSERT INTO articles_fts (articles_fts) VALUES ('optimize')")
+    return index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m claims.pubmed_index <index_dir> <pubmed xml(.gz) files...>")
+        sys.exit(1)
+    built = build_index(sys.argv[1], sys.argv[2:])
+    print(f"Index at {sys.argv[1]} holds {len(built)} articles")
@@ -4,9 +4,13 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA 
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnablePassthrough, RunnableLambda
 from langchain_core.pydantic_v1 import BaseModel, Field
 from claims import logging
+from claims.ratelimit import call_with_retry
+from claims.deadline import REQUEST_TIMEOUTS
+from claims.fakes import fake_chat_model, fake_backends_enabled
+from claims.context_packer import pack_context, CONTEXT_TOKEN_BUDGET
 
 class QueryResponse(BaseModel):
     """
@@ -22,9 +26,10 @@ class RAGQueryProcessor:
     """
     A class to process queries using RAG and GPT-4o-mini.
     """
-    def __init__(self, custom_retriever, gpt_prompt_txt):
+    def __init__(self, custom_retriever, gpt_prompt_txt, context_tokens=CONTEXT_TOKEN_BUDGET):
         self.custom_retriever = custom_retriever
         self.gpt_prompt_txt = gpt_prompt_txt
+        self.context_tokens = context_tokens
         self.setup_components()
 
     #Initialize the components in the QueryProcessor class object
@@ -41,7 +46,7 @@ class RAGQueryProcessor:
                 partial_variables={"format_instructions": self.parser.get_format_instructions()}
             )
 
-            self.chatgpt= ChatOpenAI(model_name= 'gpt-4o-mini', temperature=0)
+            self.chatgpt= fake_chat_model() if fake_backends_enabled() else ChatOpenAI(model_name= 'gpt-4o-mini', temperature=0, timeout=REQUEST_TIMEOUTS['openai'])
 
             self.setup_rag_chain() #initializing the retrievalQA rag chain
 
@@ -52,6 +57,13 @@ class RAGQueryProcessor:
     def format_docs(self, documents):
         return "\n\n".join(doc.page_content for doc in documents)
 
+    def retrieve_context(self, claim):
+        """
+        Retrieves the documents for the claim and packs their most relevant sentences into the token budget.
+        """
+        documents = self.custom_retriever.invoke(claim)
+        return pack_context(documents, claim, max_tokens=self.context_tokens)
+
     def setup_rag_chain(self):
         # Set up the RetrievalQA chain
         self.retrieval_qa_chain = RetrievalQA.from_chain_type(
@@ -64,7 +76,7 @@ class RAGQueryProcessor:
         # Set up the runnable RAG chain
         self.retrieval_qa_rag_chain = (
             {
-                "context": (self.custom_retriever | self.format_docs),
+                "context": RunnableLambda(self.retrieve_context),
                 "claim": RunnablePassthrough()
             }
             | self.gpt_prompt
@@ -76,10 +88,32 @@ class RAGQueryProcessor:
         Process a query using the retrievalQA chain and GPT-4o-mini to generate a response.
         """
         try:        
-            response= self.retrieval_qa_rag_chain.invoke(claim)
+            response= call_with_retry("openai", self.retrieval_qa_rag_chain.invoke, claim)
             return response.content
         except Exception as e:
             logging.info(f"Error processing query and returning generated text: {e}")
             return None
 
+    def stream_query(self, claim, timeout=60.0):
+        """
+        Streams the generated response for a claim as text chunks.
+        Retrieval and prompt formatting happen before the first chunk; the completion arrives token by token.
+        timeout: deadline in seconds for getting the first chunk, retries included
+
+        Opening the stream is retried under the OpenAI rate limit until the first chunk arrives. An error after
+        that is raised, so the caller can tell a truncated answer from a complete one and must not keep it.
+        """
+        def open_stream():
+            chunks = iter(self.retrieval_qa_rag_chain.stream(claim))
+            return next(chunks, None), chunks
 
+        try:
+            first, chunks = call_with_retry("openai", open_stream, timeout=timeout)
+            if first is not None and first.content:
+                yield first.content
+            for chunk in chunks:
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            logging.info(f"Error streaming response: {e}")
+            raise
@@ -0,0 +1,250 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from claims import logging
+
+"""
+Client side rate limiting and retries for the external APIs (NCBI E-utilities, Gemini, OpenAI).
+
+Every provider has one process-wide token bucket, shared by all Streamlit sessions and threads of the process.
+The bucket rate adapts AIMD style: it grows additively after successful calls and is cut multiplicatively
+whenever the provider signals overload (429, 503 or Gemini's ResourceExhausted). Failed calls, including other
+transient errors such as timeouts or a 500, are retried with full-jitter exponential backoff until the retries or the
+deadline run out.
+
+When several app processes run side by side (see CLAIMS_WORKERS), each one gets an equal share of the provider rate.
+
+Usage:
+    call_with_retry("gemini", model.generate_content, prompt)
+    await acall_with_retry("ncbi", fetch_coroutine_function, url)
+    get_metrics()  # per provider: calls, throttles, retries, queue wait time
+"""
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# The statuses that mean the provider wants fewer requests, and so lower the bucket rate
+THROTTLE_STATUSES = {429, 503}
+
+# requests per second for the whole deployment, and the burst size
+PROVIDER_LIMITS = {
+    "ncbi": {"rate": 10.0 if os.getenv("PUBMED_API_KEY") else 3.0, "capacity": 3},
+    "gemini": {"rate": 1.0, "capacity": 2},
+    "openai": {"rate": 20.0, "capacity": 10},
+}
+DEFAULT_LIMIT = {"rate": 5.0, "capacity": 5}
+
+
+class RateLimitTimeout(Exception):
+    """
+    Raised when a call could not get a token before its deadline.
+    """
+
+
+class ThrottledError(Exception):
+    """
+    Raised by callers for retryable HTTP responses (e.g. aiohttp returns the status instead of raising).
+    """
+    def __init__(self, status, message=""):
+        super().__init__(f"HTTP {status} {message}".strip())
+        self.status = status
+
+
+def get_status(error):
+    """
+    The HTTP status of an exception raised by urllib/Entrez, aiohttp, openai or google-api-core, if any.
+    """
+    for attribute in ("status", "status_code", "code"):
+        status = getattr(error, attribute, None)
+        if callable(status):
+            try:
+                status = status()
+            except TypeError:
+                status = None
+        status = getattr(status, "value", status)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable(error):
+    if isinstance(error, (ThrottledError, TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return get_status(error) in RETRY_STATUSES
+
+
+def is_throttle(error):
+    # google-api-core raises ResourceExhausted (code 429) when the Gemini quota is used up
+    return get_status(error) in THROTTLE_STATUSES or type(error).__name__ == "ResourceExhausted"
+
+
+class AdaptiveTokenBucket:
+    """
+    Thread safe token bucket whose refill rate follows additive increase / multiplicative decrease.
+    """
+    def __init__(self, name, rate, capacity, min_rate=None, increase=None, decrease=0.5):
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 20
+        self.increase = increase or rate / 20
+        self.decrease = decrease
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _reserve(self):
+        """
+        Takes a token, going into debt if none is left. Returns how long the caller has to wait for it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            self.calls += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            return wait
+
+    def _refund(self):
+        with self.lock:
+            self.tokens += 1
+
+    def acquire(self, deadline=None):
+        wait = self._reserve()
+        if deadline is not None and time.monotonic() + wait > deadline:
+            self._refund()
+            raise RateLimitTimeout(f"{self.name}: no rate limit token before the deadline")
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, deadline=None):
+        wait = self._reserve()
+        if deadline is not None and time.monotonic() + wait > deadline:
+            self._refund()
+            raise RateLimitTimeout(f"{self.name}: no rate limit token before the deadline")
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self.lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "rate": self.rate,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "wait_total": self.wait_total,
+                "wait_max": self.wait_max,
+                "wait_mean": self.wait_total / self.calls if self.calls else 0.0,
+            }
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider):
+    """
+    The process-wide bucket of a provider.
+    """
+    with _buckets_lock:
+        if provider not in _buckets:
+            limit = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+            workers = max(1, int(os.getenv("CLAIMS_WORKERS", 1)))
+            _buckets[provider] = AdaptiveTokenBucket(provider, limit["rate"] / workers, limit["capacity"])
+        return _buckets[provider]
+
+
+def get_metrics():
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {provider: bucket.metrics() for provider, bucket in buckets.items()}
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=20.0):
+    """
+    Full jitter exponential backoff.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def _next_delay(bucket, error, attempt, retries, deadline, base_delay):
+    """
+    Records a failed attempt. Returns how long to sleep before retrying, or None if the error should be raised.
+    """
+    if not is_retryable(error) or attempt >= retries:
+        return None
+    if is_throttle(error):
+        bucket.on_throttle()
+    delay = backoff_delay(attempt, base_delay)
+    if deadline is not None and time.monotonic() + delay > deadline:
+        return None
+    with bucket.lock:
+        bucket.retries += 1
+    logging.info(f"{bucket.name}: retrying after {type(error).__name__}: {error} (attempt {attempt + 1})")
+    return delay
+
+
+def call_with_retry(provider, fn, *args, retries=4, timeout=60.0, base_delay=0.5, **kwargs):
+    """
+    Calls fn(*args, **kwargs) under the provider's rate limit, retrying throttled and transient failures.
+    timeout: overall deadline in seconds for all attempts, None for no deadline
+    """
+    bucket = get_bucket(provider)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    attempt = 0
+    while True:
+        bucket.acquire(deadline)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(bucket, e, attempt, retries, deadline, base_delay)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        bucket.on_success()
+        return result
+
+
+async def acall_with_retry(provider, coro_fn, *args, retries=4, timeout=60.0, base_delay=0.5, **kwargs):
+    """
+    Async version of call_with_retry; coro_fn(*args, **kwargs) must return a new coroutine on every call.
+    """
+    bucket = get_bucket(provider)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    attempt = 0
+    while True:
+        await bucket.acquire_async(deadline)
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except Exception as e:
+            delay = _next_delay(bucket, e, attempt, retries, deadline, base_delay)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        bucket.on_success()
+        return result
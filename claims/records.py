@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+
+"""
+A compact record for one PubMed article.
+
+Records flow from PubMedScraper through journal ranking (utils.rank_records) into LangChain documents
+(doc_loader.load_documents) without building intermediate DataFrames. to_dict/from_dict keep the column names of the
+original DataFrame layout (PMID, Title, Abstract, ...) for callers that still want a DataFrame.
+"""
+
+COLUMNS = {
+    "pmid": "PMID",
+    "title": "Title",
+    "abstract": "Abstract",
+    "journal": "Journal",
+    "issn": "ISSN",
+    "issn_linking": "ISSNLinking",
+    "nlm_id": "NlmUniqueID",
+    "url": "URL",
+    "pmcid": "PMCID",
+    "conclusions": "Conclusions",
+    "normalized_rank": "normalized_rank",
+}
+
+
+@dataclass(slots=True)
+class ArticleRecord:
+    pmid: str
+    title: str = ""
+    abstract: str = ""
+    journal: str = ""
+    issn: str = ""
+    issn_linking: str = ""
+    nlm_id: str = ""
+    url: str = ""
+    pmcid: str = None
+    conclusions: str = ""
+    normalized_rank: float = 0.0
+
+    @classmethod
+    def from_dict(cls, row):
+        """
+        Builds a record from a dict/row using either the attribute names or the DataFrame column names.
+        """
+        values = {}
+        for attribute, column in COLUMNS.items():
+            if column in row:
+                values[attribute] = row[column]
+            elif attribute in row:
+                values[attribute] = row[attribute]
+        values["pmid"] = str(values.get("pmid", ""))
+        if not values.get("url"):
+            values["url"] = f"https://www.ncbi.nlm.nih.gov/pubmed/{values['pmid']}"
+        return cls(**values)
+
+    def to_dict(self):
+        return {column: getattr(self, attribute) for attribute, column in COLUMNS.items()}
+
+    @property
+    def page_content(self):
+        return f"Title: {self.title}\n\nAbstract: {self.abstract}\n\nConclusions: {self.conclusions}"
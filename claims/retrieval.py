@@ -1,38 +1,107 @@
-from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
 from langchain_core.vectorstores import VectorStoreRetriever
 from pydantic import Field
 from typing import List
+import re
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from claims import logging
+from claims.bm25 import BM25
+from claims.ratelimit import call_with_retry
+from claims.embeddings import get_embedding_model
 
 """
 We download documents and create vector on-the-fly which will used for response generation.
-Since the documents vary from video to video, no incentive to store them in a vector DB. 
-So using an in memory vector store for response generation.
+The documents vary from video to video, so the vector store used for response generation is in memory.
+However the same papers keep coming back across videos, so the embeddings can optionally be accumulated in a
+persistent VectorIndex (see vector_index.py). search_paper_index checks that local corpus first, and PubMed only
+needs to be scraped when it does not cover the claim.
 
 We use the vector store to rank documents based on cosine similarity, followed by a ranking based on journal quality. 
 This is as measured by the normalized rank.
+
+Retrieval is hybrid: a BM25 lexical ranking and the dense cosine ranking are fused with reciprocal rank fusion (RRF),
+and the fused relevance is combined with the journal rank and an evidence-type prior (meta-analyses and RCTs first).
+For small candidate sets the BM25 ranking alone is good enough, so the embedding call is skipped.
 """
 
+RRF_K = 60
+
+# Evidence hierarchy detected from title and abstract, strongest first
+EVIDENCE_PATTERNS = [
+    ("meta-analysis", 1.0, re.compile(r"meta[- ]?analys[ie]s|systematic review", re.I)),
+    ("rct", 0.8, re.compile(r"randomi[sz]ed|controlled trial|\bRCTs?\b|placebo[- ]controlled", re.I)),
+    ("cohort", 0.5, re.compile(r"cohort|prospective|longitudinal", re.I)),
+    ("case report", 0.0, re.compile(r"case report|case series", re.I)),
+]
+
+
+def evidence_type(text):
+    """
+    Classifies the study design of a paper from its text. Returns (evidence type, prior score in [0, 1]).
+    """
+    for name, prior, pattern in EVIDENCE_PATTERNS:
+        if pattern.search(text):
+            return name, prior
+    return "other", 0.2
+
+
+def min_max(scores):
+    """
+    Min-max normalization that stays finite: constant (or empty) inputs map to ones instead of dividing by zero.
+    """
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float64))
+    spread = np.ptp(scores) if scores.size else 0.0
+    if spread < 1e-12:
+        return np.ones_like(scores)
+    return (scores - scores.min()) / spread
+
+
+def reciprocal_rank_fusion(score_lists, k=RRF_K):
+    """
+    Fuses several score arrays over the same documents: each document gets sum(1 / (k + rank)) over the rankings.
+    Tied scores share the best rank of the tie, so a constant score list adds the same amount to every document.
+    """
+    fused = np.zeros(len(score_lists[0]), dtype=np.float64)
+    for scores in score_lists:
+        negated = -np.nan_to_num(np.asarray(scores, dtype=np.float64))
+        # 1 + the number of strictly better scores ("min" ranking)
+        ranks = np.searchsorted(np.sort(negated), negated, side="left") + 1
+        fused += 1.0 / (k + ranks)
+    return fused
+
 class InMemoryVectorStore:
     """
     The standard vector store that uses a cosine similarity measure for ranking documents based on similarity with query
     """
-    def __init__(self, documents, embedding_function):
+    def __init__(self, documents, embedding_function=None, embeddings=None, paper_index=None, query_embeddings=None):
+        """
+        embedding_function: any LangChain Embeddings backend (see embeddings.py), the process-wide one if not given
+        embeddings: precomputed document embeddings (e.g. from the paper index), computed lazily if not given
+        paper_index: optional persistent VectorIndex that newly computed embeddings are added to
+        query_embeddings: already computed query embeddings by query text (e.g. the claim), not embedded again
+        """
         self.documents = documents
-        self.embedding_function = embedding_function
-        self.embeddings = None
+        self.embedding_function = embedding_function if embedding_function is not None else get_embedding_model()
+        self.embeddings = embeddings
+        self.paper_index = paper_index
+        self.query_embeddings = dict(query_embeddings or {})
 
     def create_embeddings(self):
         try:
             texts = [doc.page_content for doc in self.documents]
-            self.embeddings = self.embedding_function.embed_documents(texts)
+            self.embeddings = call_with_retry("openai", self.embedding_function.embed_documents, texts)
+            if self.paper_index is not None:
+                add_to_paper_index(self.paper_index, self.documents, self.embeddings)
         except Exception as e:
             logging.info(f"Error creating embeddings: {e}")
             return None
 
+    def embed_query(self, query):
+        if query not in self.query_embeddings:
+            self.query_embeddings[query] = call_with_retry("openai", self.embedding_function.embed_query, query)
+        return self.query_embeddings[query]
+
     def similarity_search_with_score(self, query, k=5):
         """
         Get the top k documents with the highest cosine similarity to the query,
@@ -40,7 +109,7 @@ class InMemoryVectorStore:
         :param query: The input query string
         """
         try:
-            query_embedding = self.embedding_function.embed_query(query)
+            query_embedding = self.embed_query(query)
             
             if self.embeddings is None:
                 self.create_embeddings()
@@ -54,49 +123,120 @@ class InMemoryVectorStore:
             logging.info(f"Error during similarity search: {e}")
             return []
 
+    def similarity_scores(self, query):
+        """
+        Cosine similarity of every document to the query, in document order.
+        """
+        query_embedding = self.embed_query(query)
+        if self.embeddings is None:
+            self.create_embeddings()
+        return cosine_similarity([query_embedding], self.embeddings)[0]
+
     def _select_relevance_score_fn(self):
         return lambda score: score  # return score as is
 
+def add_to_paper_index(paper_index, documents, embeddings):
+    """
+    Stores embedded documents in the persistent paper index, keyed by PMID.
+    """
+    keys = [str(doc.metadata['PMID']) for doc in documents]
+    payloads = [{"page_content": doc.page_content, "metadata": dict(doc.metadata)} for doc in documents]
+    paper_index.add(keys, embeddings, payloads)
+
+
+def search_paper_index(paper_index, embedding_function, query, k=5, min_score=0.5, min_docs=3, query_embedding=None):
+    """
+    Looks for papers covering the query in the persistent paper index.
+    query_embedding: the embedding of the query, if already computed
+
+    Returns the documents and their stored embeddings, or ([], None) if fewer than min_docs papers
+    reach min_score cosine similarity, in which case PubMed should be scraped instead.
+    """
+    try:
+        if query_embedding is None:
+            query_embedding = call_with_retry("openai", embedding_function.embed_query, query)
+        hits = [(key, payload) for key, score, payload in paper_index.search(query_embedding, k=k)
+                if score >= min_score and payload]
+        if len(hits) < min_docs:
+            return [], None
+
+        documents = [Document(page_content=payload["page_content"], metadata=dict(payload["metadata"]))
+                     for _, payload in hits]
+        embeddings = [paper_index.get_vector(key) for key, _ in hits]
+        logging.info(f"Paper index covers the query with {len(documents)} papers")
+        return documents, embeddings
+    except Exception as e:
+        logging.info(f"Error searching paper index: {e}")
+        return [], None
+
+
 class CustomRetriever(VectorStoreRetriever):
     """
-    Custom retriever that uses normalized rank of journal to re-rank the retrieved similar documents.
+    Custom retriever that fuses lexical and dense relevance, then uses the normalized rank of the journal and the
+    evidence type to re-rank the candidate documents.
     """
     vectorstore: InMemoryVectorStore
     topk: int = 5
     similarity_weight: float = 0.8
+    evidence_weight: float = 0.1
+    dense_min_candidates: int = 8
     search_type: str = "similarity"
     search_kwargs: dict = Field(default_factory=dict)
 
+    def use_dense(self):
+        """
+        Dense scores are only worth an embedding call for larger candidate sets, or when the embeddings are
+        already there / are wanted for the paper index anyway.
+        """
+        store = self.vectorstore
+        return (len(store.documents) > self.dense_min_candidates or store.embeddings is not None
+                or store.paper_index is not None)
+
+    def score_documents(self, query, docs):
+        """
+        Vectorized hybrid scoring of all candidates. Returns the final scores and the per-signal arrays.
+        """
+        texts = [doc.page_content for doc in docs]
+        lexical = np.asarray(BM25(texts).scores(query))
+        rankings = [lexical]
+        dense = None
+        if self.use_dense():
+            dense = np.asarray(self.vectorstore.similarity_scores(query), dtype=np.float64)
+            rankings.append(dense)
+
+        relevance = min_max(reciprocal_rank_fusion(rankings))
+        journal = np.nan_to_num(np.array([doc.metadata.get('normalized_rank', 0.0) for doc in docs], dtype=np.float64))
+        evidence = [evidence_type(text) for text in texts]
+        prior = np.array([score for _, score in evidence])
+
+        journal_weight = max(0.0, 1 - self.similarity_weight - self.evidence_weight)
+        final = self.similarity_weight * relevance + self.evidence_weight * prior + journal_weight * journal
+        return final, {"relevance": relevance, "lexical": lexical, "dense": dense,
+                       "evidence": [name for name, _ in evidence]}
+
     def _get_relevant_documents(self, query: str) -> List[Document]:
         """
-        Get the top k documents reranked based on the journal ranking
+        Get the top k documents reranked based on hybrid relevance, journal ranking and evidence type
         
         :param query: The input query string
         """
         try:
-            # Get similarity conversion function
-            cosine_sim = self.vectorstore._select_relevance_score_fn()
-
-            # Get top k documents with lowest cosine distance
-            docs_and_scores = self.vectorstore.similarity_search_with_score(query, k=self.topk)
-            docs, scores = zip(*docs_and_scores)
-            scores = [cosine_sim(score) for score in scores]
-            min_score = min(scores)
-            max_score = max(scores)
-            normalized_scores = [(score-min_score)/(max_score-min_score) for score in scores]
-            
-            # Calculate final score considering both similarity and rank
-            for doc, score, normalized_score in zip(docs, scores, normalized_scores):
-                # Normalize the cosine similarity scores
-                doc.metadata['normalized_score'] = normalized_score
-                rank = doc.metadata['normalized_rank']
-                final_score = self.similarity_weight * normalized_score + (1 - self.similarity_weight) * rank
-                doc.metadata['final_score'] = final_score
+            docs = list(self.vectorstore.documents)
+            if not docs:
+                return []
 
-            # Sort documents by final score
-            sorted_docs = sorted(docs, key=lambda x: x.metadata['final_score'], reverse=True)
+            final, signals = self.score_documents(query, docs)
+            for i, doc in enumerate(docs):
+                doc.metadata['normalized_score'] = float(signals['relevance'][i])
+                doc.metadata['lexical_score'] = float(signals['lexical'][i])
+                if signals['dense'] is not None:
+                    doc.metadata['dense_score'] = float(signals['dense'][i])
+                doc.metadata['evidence_type'] = signals['evidence'][i]
+                doc.metadata['final_score'] = float(final[i])
 
-            return sorted_docs[:self.topk]
+            # Sort documents by final score
+            order = np.argsort(-final, kind="stable")[:self.topk]
+            return [docs[i] for i in order]
         except Exception as e:
             logging.info(f"Error during reranking based on journal rank: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,75 @@
+import csv
+import re
+import sys
+
+"""
+Builds the journal ranking table (journal_rankings.csv) from the full SCImago export.
+
+The export (https://www.scimagojr.com/journalrank.php, "Download data") is a semicolon separated file with, among
+others, Rank, Title, Issn (a comma separated list), SJR and SJR Best Quartile. The table written here keeps the
+Rank,Journal columns of the original file and adds Issn, SJR and Quartile, so utils.JournalRankings can join
+articles on the ISSNs from their PubMed record instead of fuzzy matching journal titles.
+
+Usage:
+    python -m claims.scimago scimagojr_2023.csv journal_rankings.csv
+"""
+
+ISSN_PATTERN = re.compile(r"\d{7}[\dX]")
+TABLE_COLUMNS = ["Rank", "Journal", "Issn", "SJR", "Quartile"]
+
+
+def normalize_issn(value):
+    """
+    Returns the 8 character form of an ISSN ("1542-4863" -> "15424863"), or None if it is not a valid ISSN.
+    """
+    if not value:
+        return None
+    issn = re.sub(r"[^0-9Xx]", "", str(value)).upper()
+    return issn if ISSN_PATTERN.fullmatch(issn) else None
+
+
+def split_issns(value):
+    """
+    Normalized ISSNs of a list field ("15424863, 00079235" or "1542-4863 0007-9235").
+    """
+    issns = (normalize_issn(part) for part in re.split(r"[,;\s]+", value or ""))
+    return [issn for issn in issns if issn]
+
+
+def read_scimago_export(path):
+    """
+    Streams the journals of a SCImago export as dicts with rank, journal, issns, sjr and quartile.
+    """
+    with open(path, newline="", encoding="utf-8") as export_file:
+        for row in csv.DictReader(export_file, delimiter=";"):
+            sjr = (row.get("SJR") or "").replace(",", ".")
+            yield {
+                "rank": int(row["Rank"]),
+                "journal": row["Title"],
+                "issns": split_issns(row.get("Issn")),
+                "sjr": float(sjr) if sjr else None,
+                "quartile": row.get("SJR Best Quartile", ""),
+            }
+
+
+def build_rankings_table(export_path, output_path):
+    """
+    Writes the ranking table used by the app from a SCImago export. Returns the number of journals written.
+    """
+    count = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as table_file:
+        writer = csv.writer(table_file)
+        writer.writerow(TABLE_COLUMNS)
+        for journal in read_scimago_export(export_path):
+            writer.writerow([journal["rank"], journal["journal"], " ".join(journal["issns"]),
+                             "" if journal["sjr"] is None else journal["sjr"], journal["quartile"]])
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m claims.scimago <scimago export.csv> <output journal_rankings.csv>")
+        sys.exit(1)
+    written = build_rankings_table(sys.argv[1], sys.argv[2])
+    print(f"Wrote {written} journals to {sys.argv[2]}")
@@ -1,12 +1,22 @@
 # scraper.py
+import os
 from Bio import Entrez
 import xml.etree.ElementTree as ET
 import aiohttp
 from aiohttp import ClientSession
 import asyncio
+import io
+from contextlib import asynccontextmanager
+from datetime import date
+from itertools import combinations
 import pandas as pd
 import time
 from claims import logging
+from claims.records import ArticleRecord
+from claims.ratelimit import acall_with_retry, ThrottledError, RateLimitTimeout, RETRY_STATUSES
+from claims.scraper_service import get_scraper_service
+from claims.deadline import (Deadline, request_timeout, PMC_RESERVE, PMC_SKIPPED, FEWER_PAPERS, SEARCH_TIMEOUT,
+                             SEARCH_FAILED)
 
 """
 A scrapped to extract pubmed articles. 
@@ -17,122 +27,391 @@ We take list of claim keywords as input and do the following.
 2. Fetch articles using Entrez.esearch. Unless free, we can only extract the abstract of the papers.
 3. Fetch PMCID, if exists. These are the full articles available for free on pubmed. 
 4. Extract conclusions if PMCID exists.
-5. Store the abstract, title, journal, conclusion (if exists) into a pandas dataframe.
+5. Store the abstract, title, journal, conclusion (if exists) as ArticleRecords (or a pandas dataframe via run).
+
+The search is adaptive. Results are requested sorted by relevance and only as many pages as needed are fetched.
+If the strict query (all keywords ANDed) returns too few usable papers, the query is relaxed step by step:
+    AND of all keywords -> OR of keyword pairs -> OR of MeSH terms
+iter_batches yields the usable papers page by page, so the search stops as soon as enough have been found.
+
+All E-utilities requests go through one aiohttp session. The synchronous entry points (run_records, run)
+submit the work to the process-wide ScraperService (see scraper_service.py), so its event loop and keep-alive
+connections are reused across claims instead of being set up again for every claim.
+
+Every request is bounded by the NCBI request timeout. Given a Deadline (see deadline.py) the search also returns
+what it has when time runs out: it stops paging (fewer_papers), keeps the abstract of papers whose PMC lookup is
+late (pmc_skipped), and records these labels on the deadline.
+
+Optionally, a local PubMedIndex (see pubmed_index.py) answers the keyword search offline. NCBI is then only
+contacted for PMC full text, and the live search is used only when the local index has too few matches.
 """
 
+DEFAULT_START_DATE = "2000/01/01"
+# Overridable for a mirror, a proxy or a local stub in load tests
+EUTILS_URL = os.getenv("CLAIMS_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/")
+# Extra wait on the service loop beyond the deadline, before the search is cancelled from outside
+DEADLINE_GRACE = 2.0
+
+
+class EutilsError(Exception):
+    """
+    Raised for an E-utilities response that is neither a success nor retryable (e.g. HTTP 400 for a bad query).
+    """
+    def __init__(self, utility, status):
+        super().__init__(f"{utility} failed: HTTP {status}")
+        self.utility = utility
+        self.status = status
+
+
+def default_date_range(start=DEFAULT_START_DATE, end=None):
+    """
+    PubMed creation date filter from start until end (today if not given).
+    """
+    end = end or date.today().strftime("%Y/%m/%d")
+    return f'("{start}"[Date - Create] : "{end}"[Date - Create])'
+
+
 class PubMedScraper:
-    def __init__(self, email, api_key):
+    def __init__(self, email, api_key, retmax=7, min_results=3, page_size=10, max_pages=3, concurrency=3,
+                 local_index=None, base_url=EUTILS_URL):
+        """
+        retmax: number of usable papers wanted per claim
+        min_results: below this many usable papers the query is relaxed
+        page_size, max_pages: esearch paging per query
+        concurrency: parallel PMC lookups
+        local_index: optional PubMedIndex used instead of the live esearch/efetch
+        base_url: E-utilities endpoint (overridden e.g. by benchmarks against a local stub)
+        """
         self.email = email
         self.api_key = api_key
+        self.local_index = local_index
+        self.base_url = base_url
+        self.retmax = retmax
+        self.min_results = min_results
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.concurrency = concurrency
         Entrez.email = email
+        if api_key:
+            Entrez.api_key = api_key
+
+    def build_query(self, topics, date_range=None, mode="and", mesh_terms=False):
+        """
+        Builds a PubMed query for the topics, or returns None if there are no topics (a query on the date range
+        alone would match every paper).
 
-    def build_query(self, topics, date_range):
+        mode: "and" - every topic in Title/Abstract
+              "pairs" - any pair of topics in Title/Abstract
+              "mesh" - any topic as a MeSH term
+        mesh_terms: the topics are MeSH descriptor names (e.g. from MeshKeywordExtractor) and are searched as
+                    MeSH terms in every mode, which also finds the papers indexed under their synonyms
+        """
+        date_range = date_range or default_date_range()
+        topics = [topic for topic in (topics or []) if topic]
+        if not topics:
+            return None
+
+        def term(topic):
+            if mesh_terms or mode == "mesh":
+                return '"{}"[MeSH Terms]'.format(topic)
+            return '{}[Title/Abstract]'.format(topic)
+
+        if mode == "mesh":
+            topic_query = ' OR '.join(term(topic) for topic in topics)
+        elif mode == "pairs" and len(topics) > 2:
+            pair_queries = ['({} AND {})'.format(term(a), term(b)) for a, b in combinations(topics, 2)]
+            topic_query = ' OR '.join(pair_queries)
+        else:
+            topic_query = ' AND '.join(term(topic) for topic in topics)
+        return '(' + topic_query + ') AND ' + date_range
+
+    def build_queries(self, topics, date_range=None, mesh_terms=False):
+        """
+        The progressively relaxed queries for the topics, strictest first, without duplicates (none without topics).
+        """
         queries = []
-        if topics:
-            topic_queries = ['{}[Title/Abstract]'.format(topic) for topic in topics]
-            queries.append('(' + ' AND '.join(topic_queries) + ')')
-        full_query = ' AND '.join(queries) + ' AND ' + date_range
-        return full_query
+        for mode in ("and", "pairs", "mesh"):
+            query = self.build_query(topics, date_range, mode=mode, mesh_terms=mesh_terms)
+            if query is not None and query not in queries:
+                queries.append(query)
+        return queries
+
+    def is_usable(self, record):
+        """
+        A paper is only useful as evidence if it has an abstract.
+        """
+        return record is not None and bool(record.abstract)
+
+    def eutils_params(self, **params):
+        params = {key: str(value) for key, value in params.items()}
+        params["tool"] = "claims"
+        if self.email:
+            params["email"] = self.email
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return params
+
+    async def get_text(self, url, session, params=None, binary=False, deadline=None):
+        """
+        GET under the shared NCBI rate limit, retrying 429/5xx responses.
+        Returns (status, text), or (status, bytes) if binary.
+        deadline: optional Deadline bounding every attempt and the retries
+        """
+        async def fetch():
+            if deadline is not None and deadline.expired():
+                raise asyncio.TimeoutError("deadline expired")
+            timeout = aiohttp.ClientTimeout(total=request_timeout("ncbi", deadline))
+            async with session.get(url, params=params, timeout=timeout) as response:
+                if response.status in RETRY_STATUSES:
+                    raise ThrottledError(response.status)
+                body = await response.read() if binary else await response.text()
+                return response.status, body
 
-    async def fetch_pmc_conclusions(self, pmcid, session):
-        base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-        efetch_url = f"{base_url}efetch.fcgi?db=pmc&id={pmcid}&retmode=xml&api_key={self.api_key}"
+        return await acall_with_retry("ncbi", fetch, timeout=deadline.timeout(60.0) if deadline is not None else 60.0)
+
+    async def esearch(self, query, session, retstart=0, retmax=None, deadline=None):
+        """
+        Async search_ids over the shared session. Returns the ids and the total hit count.
+        """
+        params = self.eutils_params(db='pubmed', term=query, sort='relevance', retstart=retstart,
+                                    retmax=retmax or self.page_size)
+        status, content = await self.get_text(f"{self.base_url}esearch.fcgi", session, params=params, binary=True,
+                                              deadline=deadline)
+        if status != 200:
+            raise EutilsError("esearch", status)
+        record = Entrez.read(io.BytesIO(content))
+        return list(record['IdList']), int(record.get('Count', 0))
+
+    async def efetch_medline_records(self, pmids, session, deadline=None):
+        """
+        Async fetch_medline_records over the shared session.
+        """
+        if not pmids:
+            return []
+        params = self.eutils_params(db='pubmed', id=','.join(pmids), retmode='xml')
+        status, content = await self.get_text(f"{self.base_url}efetch.fcgi", session, params=params, binary=True,
+                                              deadline=deadline)
+        if status != 200:
+            raise EutilsError("efetch", status)
+        records = Entrez.read(io.BytesIO(content))
+        return [self.parse_pubmed_record(record) for record in records['PubmedArticle']]
+
+    async def fetch_pmc_conclusions(self, pmcid, session, deadline=None):
+        params = self.eutils_params(db='pmc', id=pmcid, retmode='xml')
 
         try:
-            async with session.get(efetch_url) as response:
-                if response.status != 200:
-                    print(f"Error fetching PMC article: HTTP {response.status}")
-                    return f"Failed to fetch PMC content for {pmcid}: HTTP {response.status}"
-                content = await response.text()
-                #print(f"Received XML content for {pmcid}: {content[:200]}...")
-
-                root = ET.fromstring(content)
-
-                conclusions = ""
-                for section in root.findall(".//sec"):
-                    section_title = section.find("title")
-                    if section_title is not None and section_title.text and "conclusion" in section_title.text.lower():
-                        for p in section.findall(".//p"):
-                            conclusions += ET.tostring(p, encoding='unicode', method='text') + "\n"
-                        break
+            status, content = await self.get_text(f"{self.base_url}efetch.fcgi", session, params=params,
+                                                  deadline=deadline)
+            if status != 200:
+                logging.info(f"Error fetching PMC article: HTTP {status}")
+                return f"Failed to fetch PMC content for {pmcid}: HTTP {status}"
+            #print(f"Received XML content for {pmcid}: {content[:200]}...")
+
+            root = ET.fromstring(content)
 
-                if not conclusions:
-                    logging.info(f"Conclusions section not found for {pmcid}")
-                    return f"Conclusions section not found in the article for {pmcid}."
+            conclusions = ""
+            for section in root.findall(".//sec"):
+                section_title = section.find("title")
+                if section_title is not None and section_title.text and "conclusion" in section_title.text.lower():
+                    for p in section.findall(".//p"):
+                        conclusions += ET.tostring(p, encoding='unicode', method='text') + "\n"
+                    break
 
-                return conclusions.strip()
-     
+            if not conclusions:
+                logging.info(f"Conclusions section not found for {pmcid}")
+                return f"Conclusions section not found in the article for {pmcid}."
+
+            return conclusions.strip()
+
+        except (asyncio.TimeoutError, RateLimitTimeout):
+            raise
         except Exception as e:
             logging.info(f"Error fetching PMC article {pmcid}: {e}")
             return f"Failed to fetch PMC content for {pmcid}: {str(e)}"
 
-    async def fetch_pmcid_and_conclusions(self, pmid, session):
+    async def fetch_pmcid_and_conclusions(self, pmid, session, deadline=None):
         try:
-            base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-            elink_url = f"{base_url}elink.fcgi?dbfrom=pubmed&db=pmc&id={pmid}&retmode=xml&api_key={self.api_key}"
-            
-            async with session.get(elink_url) as response:
-                if response.status != 200:
-                    return None, "No PMC article available"
-                
-                content = await response.text()
-                root = ET.fromstring(content)
-                pmcid_element = root.find(".//LinkSetDb/Link/Id")
-                if pmcid_element is not None:
-                    pmcid = f"PMC{pmcid_element.text}"
-                    conclusions = await self.fetch_pmc_conclusions(pmcid, session)
-                    return pmcid, conclusions
-                else:
-                    return None, "No PMC article available"
+            params = self.eutils_params(dbfrom='pubmed', db='pmc', id=pmid, retmode='xml')
+
+            status, content = await self.get_text(f"{self.base_url}elink.fcgi", session, params=params,
+                                                  deadline=deadline)
+            if status != 200:
+                return None, "No PMC article available"
+
+            root = ET.fromstring(content)
+            pmcid_element = root.find(".//LinkSetDb/Link/Id")
+            if pmcid_element is not None:
+                pmcid = f"PMC{pmcid_element.text}"
+                conclusions = await self.fetch_pmc_conclusions(pmcid, session, deadline=deadline)
+                return pmcid, conclusions
+            else:
+                return None, "No PMC article available"
+        except (asyncio.TimeoutError, RateLimitTimeout):
+            raise
         except Exception as e:
             logging.info(f"Error fetching PMC article: {e}")
             return None, "Failed to fetch PMC article"
 
-    async def fetch_pubmed_record(self, pmid, session):
-        handle = Entrez.efetch(db='pubmed', id=pmid, retmode='xml')
-        records = Entrez.read(handle)
-        
-        for record in records['PubmedArticle']:
-            title = record['MedlineCitation']['Article']['ArticleTitle']
-            abstract = ' '.join(record['MedlineCitation']['Article']['Abstract']['AbstractText']) if 'Abstract' in record['MedlineCitation']['Article'] and 'AbstractText' in record['MedlineCitation']['Article']['Abstract'] else ''
-            journal = record['MedlineCitation']['Article']['Journal']['Title']
-            url = f"https://www.ncbi.nlm.nih.gov/pubmed/{pmid}"
-            
-            pmcid, conclusions = await self.fetch_pmcid_and_conclusions(pmid, session)
-            
-            return {
-                'PMID': pmid,
-                'Title': title,
-                'Abstract': abstract,
-                'Journal': journal,
-                'URL': url,
-                'PMCID': pmcid,
-                'Conclusions': conclusions
-            }
-
-    async def scrape(self, full_query):
-        async with ClientSession() as session:
-            handle = Entrez.esearch(db='pubmed', retmax=7, term=full_query)
-            record = Entrez.read(handle)
-            id_list = record['IdList']
-
-            results = []
-            for pmid in id_list:
-                result = await self.fetch_pubmed_record(pmid, session)
-                if result is not None:  # Only add non-None results
-                    results.append(result)
-                await asyncio.sleep(0.1)  # Add a 1-second delay between requests
-                print(f"Processed PMID: {pmid}")
-            
-            if not results:  # Check if results list is empty
-                print("No valid results found.")
-                return pd.DataFrame()  # Return an empty DataFrame
-            
-            return pd.DataFrame(results)
-
-    def run(self, topics, date_range):
-        full_query = self.build_query(topics, date_range)
-        df = asyncio.run(self.scrape(full_query))
+    def parse_pubmed_record(self, record):
+        article = record['MedlineCitation']['Article']
+        pmid = str(record['MedlineCitation']['PMID'])
+        title = article['ArticleTitle']
+        abstract = ' '.join(article['Abstract']['AbstractText']) if 'Abstract' in article and 'AbstractText' in article['Abstract'] else ''
+        journal = article['Journal']['Title']
+        # Journal identifiers for an exact join with the ranking table (the title alone needs fuzzy matching)
+        journal_info = record['MedlineCitation'].get('MedlineJournalInfo', {})
+        return ArticleRecord(pmid=pmid, title=title, abstract=abstract, journal=journal,
+                             issn=str(article['Journal'].get('ISSN', '')),
+                             issn_linking=str(journal_info.get('ISSNLinking', '')),
+                             nlm_id=str(journal_info.get('NlmUniqueID', '')),
+                             url=f"https://www.ncbi.nlm.nih.gov/pubmed/{pmid}")
+
+    async def add_pmc_conclusions(self, parsed, session, deadline=None):
+        """
+        Looks up the PMCID and conclusions of each parsed record concurrently.
+        A record whose lookup times out (or does not fit in the deadline) keeps only its abstract.
+        """
+        if deadline is not None and deadline.remaining() < PMC_RESERVE:
+            deadline.degrade(PMC_SKIPPED)
+            return parsed
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def lookup(pmid):
+            async with semaphore:
+                return await self.fetch_pmcid_and_conclusions(pmid, session, deadline=deadline)
+
+        async def add_conclusions(result):
+            try:
+                timeout = deadline.timeout() if deadline is not None else None
+                pmcid, conclusions = await asyncio.wait_for(lookup(result.pmid), timeout)
+            except (asyncio.TimeoutError, RateLimitTimeout) as e:
+                logging.info(f"Error fetching PMC article of {result.pmid}, using the abstract only: {e!r}")
+                if deadline is not None:
+                    deadline.degrade(PMC_SKIPPED)
+                return result
+            result.pmcid = pmcid
+            result.conclusions = conclusions
+            return result
+
+        return list(await asyncio.gather(*(add_conclusions(result) for result in parsed)))
+
+    def search_local(self, topics):
+        """
+        Usable records for the topics from the local index: all keywords first, any keyword if that finds too few.
+        """
+        records = []
+        for require_all in (True, False):
+            hits = self.local_index.search(topics, k=self.retmax * 2, require_all=require_all)
+            records = [ArticleRecord.from_dict(row) for row in (self.local_index.get(pmid) for pmid, _ in hits) if row]
+            records = [record for record in records if self.is_usable(record)]
+            if len(records) >= self.min_results:
+                break
+        return records[:self.retmax]
+
+    @asynccontextmanager
+    async def session_scope(self, session=None):
+        """
+        The given session, or a temporary one closed on exit.
+        """
+        if session is not None:
+            yield session
+        else:
+            async with ClientSession() as own_session:
+                yield own_session
+
+    async def iter_batches(self, topics, date_range=None, session=None, deadline=None, mesh_terms=False):
+        """
+        Yields lists of usable ArticleRecords as they are fetched.
+        session: shared ClientSession (e.g. ScraperService.session); a temporary one is used if not given
+        deadline: optional Deadline; when it runs out the search stops with the papers found so far
+        mesh_terms: the topics are MeSH descriptor names (see build_query)
+
+        Pages through the relevance-sorted results of the strictest query first and stops as soon as retmax usable
+        papers are found. The next, more relaxed query is only tried if fewer than min_results were found.
+        """
+        if not [topic for topic in (topics or []) if topic]:
+            # No keywords (e.g. the keyword extraction failed): unrelated papers are worse than none, the claim
+            # falls back to the LLM-only answer
+            logging.info("No search topics, skipping the paper search")
+            return
+        deadline = deadline if deadline is not None else Deadline()
+        seen = set()
+        found = 0
+        async with self.session_scope(session) as session:
+            if self.local_index is not None:
+                local_records = self.search_local(topics)
+                logging.info(f"Local index returned {len(local_records)} usable papers for {topics}")
+                if len(local_records) >= self.min_results:
+                    yield await self.add_pmc_conclusions(local_records, session, deadline=deadline)
+                    return
+
+            for query in self.build_queries(topics, date_range, mesh_terms=mesh_terms):
+                for page in range(self.max_pages):
+                    retstart = page * self.page_size
+                    try:
+                        if deadline.expired():
+                            raise asyncio.TimeoutError("deadline expired")
+                        id_list, count = await self.esearch(query, session, retstart=retstart, deadline=deadline)
+                        new_ids = [pmid for pmid in id_list if pmid not in seen]
+                        seen.update(new_ids)
+
+                        # Filter on the Medline record first so PMC lookups are only spent on papers we keep
+                        batch = [record for record in await self.efetch_medline_records(new_ids, session,
+                                                                                        deadline=deadline)
+                                 if self.is_usable(record)]
+                    except (asyncio.TimeoutError, RateLimitTimeout) as e:
+                        logging.info(f"Search stopped after {found} usable papers: {e!r}")
+                        deadline.degrade(FEWER_PAPERS if found else SEARCH_TIMEOUT)
+                        return
+                    except (EutilsError, ThrottledError, aiohttp.ClientError, ConnectionError) as e:
+                        # NCBI still failing after the retries: go on with the papers found so far
+                        logging.info(f"Search failed after {found} usable papers: {e!r}")
+                        deadline.degrade(FEWER_PAPERS if found else SEARCH_FAILED)
+                        return
+                    batch = await self.add_pmc_conclusions(batch[:self.retmax - found], session, deadline=deadline)
+                    found += len(batch)
+                    logging.info(f"Query page {page} returned {len(id_list)} ids, {len(batch)} usable: {query}")
+                    if batch:
+                        yield batch
+
+                    if found >= self.retmax:
+                        return
+                    if retstart + self.page_size >= count:
+                        break
+
+                if found >= self.min_results:
+                    return
+
+    async def scrape_records(self, topics, date_range=None, session=None, deadline=None, mesh_terms=False):
+        results = []
+        async for batch in self.iter_batches(topics, date_range, session=session, deadline=deadline,
+                                             mesh_terms=mesh_terms):
+            results.extend(batch)
+            logging.info(f"Processed PMIDs: {[result.pmid for result in batch]}")
+
+        if not results:  # Check if results list is empty
+            logging.info("No valid results found.")
+        return results
+
+    async def scrape(self, topics, date_range=None, session=None):
+        results = await self.scrape_records(topics, date_range, session=session)
+        return pd.DataFrame([result.to_dict() for result in results])
+
+    def run_records(self, topics, date_range=None, deadline=None, mesh_terms=False):
+        """
+        Synchronous search returning a list of ArticleRecords (empty if nothing usable was found).
+        Thread safe; runs on the shared scraper service loop.
+        deadline: optional Deadline; the search is cancelled if it overruns it by more than DEADLINE_GRACE
+        mesh_terms: the topics are MeSH descriptor names (see build_query)
+        """
+        timeout = deadline.timeout() if deadline is not None else None
+        return get_scraper_service().call(
+            lambda session: self.scrape_records(topics, date_range, session=session, deadline=deadline,
+                                                mesh_terms=mesh_terms),
+            timeout=None if timeout is None else timeout + DEADLINE_GRACE)
+
+    def run(self, topics, date_range=None):
+        df = get_scraper_service().call(lambda session: self.scrape(topics, date_range, session=session))
         if df.empty:
-            print("No results were found for the given query.")
-        return df
\ No newline at end of file
+            logging.info("No results were found for the given query.")
+        return df
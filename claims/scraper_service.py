@@ -0,0 +1,111 @@
+import asyncio
+import atexit
+import threading
+from functools import lru_cache
+import aiohttp
+from claims import logging
+
+"""
+One long-lived event loop and HTTP connection pool for all PubMed scraping in the process.
+
+Running asyncio.run() per claim created and tore down an event loop, a ClientSession, its connector and the TLS
+connections to eutils.ncbi.nlm.nih.gov for every claim. The ScraperService owns a background thread running a
+single event loop and one ClientSession with a keep-alive TCPConnector and DNS cache, shared by every claim and
+every Streamlit session of the process. Synchronous callers hand it coroutines through the thread-safe
+submit()/call() API.
+
+Connection reuse is counted with aiohttp trace hooks, see metrics().
+"""
+
+CONNECTION_LIMIT = 20
+CONNECTION_LIMIT_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 600
+REQUEST_TIMEOUT = 60
+
+
+class ScraperService:
+    """
+    A background event loop thread with a pooled aiohttp ClientSession.
+    """
+    def __init__(self, limit=CONNECTION_LIMIT, limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.counters = {"requests": 0, "connections_created": 0, "connections_reused": 0, "dns_cache_hits": 0}
+        self.counters_lock = threading.Lock()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="scraper-loop", daemon=True)
+        self.thread.start()
+        self.session = self.submit(self._create_session()).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _count(self, name):
+        async def hook(session, context, params):
+            with self.counters_lock:
+                self.counters[name] += 1
+        return hook
+
+    async def _create_session(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._count("requests"))
+        trace_config.on_connection_create_end.append(self._count("connections_created"))
+        trace_config.on_connection_reuseconn.append(self._count("connections_reused"))
+        trace_config.on_dns_cache_hit.append(self._count("dns_cache_hits"))
+
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                         keepalive_timeout=self.keepalive_timeout, ttl_dns_cache=self.ttl_dns_cache)
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config],
+                                     timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+
+    def submit(self, coroutine):
+        """
+        Schedules a coroutine on the service loop from any thread. Returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, coroutine_fn, timeout=None):
+        """
+        Runs coroutine_fn(session) on the service loop and blocks until it is done.
+        If the wait times out (or is interrupted) the coroutine is cancelled, so late work does not keep running.
+        """
+        future = self.submit(coroutine_fn(self.session))
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def metrics(self):
+        with self.counters_lock:
+            counters = dict(self.counters)
+        opened = counters["connections_created"]
+        counters["reuse_ratio"] = counters["connections_reused"] / counters["requests"] if counters["requests"] else 0.0
+        counters["requests_per_connection"] = counters["requests"] / opened if opened else 0.0
+        return counters
+
+    def close(self):
+        if not self.loop.is_running():
+            return
+        try:
+            self.submit(self.session.close()).result(timeout=5)
+        except Exception as e:
+            logging.info(f"Error closing scraper session: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+@lru_cache(maxsize=None)
+def get_scraper_service():
+    """
+    The process-wide scraper service, started on first use.
+    """
+    service = ScraperService()
+    atexit.register(service.close)
+    return service
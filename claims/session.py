@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+
+"""
+Rerun-safe state of the claim view, per browser session.
+
+Streamlit re-executes the whole script on every interaction (the sidebar, the Home button, ...) and stops a running
+script when the user interacts with the page. The claim view keeps everything it has finished for a video in a
+VideoRun in st.session_state: the checks, the summary, the generated claims and the verdict of every claim. A rerun
+renders those from memory and only resumes the claims that were not answered yet, and the LLM and PubMed calls of
+finished work are not repeated.
+
+Only outcomes that would come out the same again are kept: a rejected video is remembered, a failed transcript
+download or claim chain is retried on the next run as before.
+"""
+
+RUNS_KEY = "video_runs"
+MAX_RUNS = 3
+
+# How a claim was answered (the verdict store source, for the answered ones)
+CACHED = "cache"
+LLM = "llm"
+PUBMED = "pubmed"
+DUPLICATE = "duplicate"
+
+
+@dataclass(slots=True)
+class ClaimOutcome:
+    kind: str
+    verdict: object = None           # LLM verdict dict, PubMed answer text or cached verdict
+    cached_claim: str = None         # the previously verified claim (CACHED)
+    duplicate_of: int = None         # index of the claim with the same meaning (DUPLICATE)
+    degraded: list = None
+
+
+@dataclass(slots=True)
+class VideoRun:
+    video_id: str
+    metadata: dict = None
+    prefilter: str = None            # pre-filter verdict (prefilter.ACCEPT / AMBIGUOUS)
+    subtitle_text: str = None
+    summary: str = None
+    claims: list = None              # set once the claim generation has finished
+    claim_spans: list = None
+    health_ok: bool = None           # None until the LLM health check has answered (if it is needed)
+    error: str = None                # final error message, e.g. the video was rejected
+    recorded: bool = False           # the video is in the verdict store
+    outcomes: dict = field(default_factory=dict)    # claim index -> ClaimOutcome
+
+    def pending(self):
+        """
+        Indices of the claims without a verdict yet.
+        """
+        return [index for index in range(len(self.claims or [])) if index not in self.outcomes]
+
+    @property
+    def complete(self):
+        return self.error is not None or (self.claims is not None and self.health_ok is not None
+                                          and not self.pending())
+
+
+def get_video_run(state, video_id, max_runs=MAX_RUNS):
+    """
+    The VideoRun of a video in the session state, created if needed. The session keeps the runs of its max_runs
+    most recent videos.
+    state: st.session_state (or any mutable mapping)
+    """
+    runs = state.setdefault(RUNS_KEY, {})
+    run = runs.pop(video_id, None) or VideoRun(video_id)
+    runs[video_id] = run
+    while len(runs) > max_runs:
+        del runs[next(iter(runs))]
+    return run
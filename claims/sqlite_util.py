@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import threading
+
+"""
+Shared SQLite connection handling for the on-disk stores (verdict_store.py, pubmed_index.py).
+
+A sqlite3 connection must not be shared between threads, nor survive a fork: ThreadConnections opens one connection
+per thread, and again in a forked worker. Every connection runs in WAL mode, so readers never block the writer, and
+waits up to BUSY_TIMEOUT_MS for a lock held by another process instead of failing at once.
+"""
+
+BUSY_TIMEOUT_MS = 10000
+
+
+class ThreadConnections:
+    """
+    Per-thread, fork-aware connections to one SQLite database.
+    """
+    def __init__(self, path, pragmas=(), row_factory=None):
+        """
+        path: database file
+        pragmas: extra PRAGMA statements run on every new connection, e.g. "synchronous=NORMAL"
+        row_factory: optional sqlite3 row factory, e.g. sqlite3.Row
+        """
+        self.path = path
+        self.pragmas = ["journal_mode=WAL", *pragmas, f"busy_timeout={BUSY_TIMEOUT_MS}"]
+        self.row_factory = row_factory
+        self.local = threading.local()
+
+    def get(self):
+        """
+        The connection of the calling thread, opened on first use (and again after a fork).
+        """
+        if getattr(self.local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            if self.row_factory is not None:
+                connection.row_factory = self.row_factory
+            for pragma in self.pragmas:
+                connection.execute(f"PRAGMA {pragma}")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return self.local.connection
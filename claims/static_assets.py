@@ -0,0 +1,204 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import requests
+from claims import logging
+from claims.filelock import FileLock
+
+"""
+Local copies of the remote UI assets (background images, Lottie animation, video thumbnails), served by Streamlit's
+static file serving (.streamlit/config.toml: server.enableStaticServing) from the static/ directory next to app.py.
+
+Page rendering never waits on the network: asset_url / thumbnail / lottie_json only look at the local copy and, if
+it is missing or due for revalidation, queue a background fetch. Until the first fetch has finished the page falls
+back to the remote URL (fetched by the browser, not by the app) or, for the Lottie animation, renders without it.
+Revalidation is a conditional GET (If-None-Match / If-Modified-Since) with the validators kept in
+static/.assets.json, so an unchanged asset costs a 304. Several worker processes share the directory: files are
+replaced atomically and the validators are written under a file lock.
+
+To vendor the assets at deploy time (e.g. in an image build), run:
+
+    python -m claims.static_assets
+"""
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+STATIC_URL = "app/static"
+# The pexels originals are several MB; the compressed 1920 px renditions look the same as a page background
+REMOTE_ASSETS = {
+    "home_background.jpeg":
+        "https://images.pexels.com/photos/7470820/pexels-photo-7470820.jpeg?auto=compress&cs=tinysrgb&w=1920",
+    "page_background.jpeg":
+        "https://images.pexels.com/photos/924824/pexels-photo-924824.jpeg?auto=compress&cs=tinysrgb&w=1920",
+    "social_lottie.json": "https://lottie.host/dd61585c-8bad-4ded-9184-fd344d8a8ed0/Maz6fBVacS.json",
+}
+THUMBNAIL_URL = "https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+THUMBNAIL_LIMIT = 1000
+REVALIDATE_AFTER = 24 * 3600
+RETRY_AFTER = 300
+FETCH_TIMEOUT = (3.05, 30)
+FETCH_WORKERS = 2
+
+
+class StaticAssets:
+    """
+    Local asset directory with background fetching and revalidation.
+    """
+    def __init__(self, static_dir=STATIC_DIR, remote_assets=REMOTE_ASSETS, revalidate_after=REVALIDATE_AFTER):
+        self.static_dir = static_dir
+        self.remote_assets = remote_assets
+        self.revalidate_after = revalidate_after
+        self.state_path = os.path.join(static_dir, ".assets.json")
+        self.lock_path = os.path.join(static_dir, ".assets.lock")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._checked = {}
+        self._executor = None
+
+    def path(self, name):
+        return os.path.join(self.static_dir, name)
+
+    def url(self, name):
+        """
+        URL of a REMOTE_ASSETS entry for the page HTML: the static file if present, the remote URL otherwise.
+        """
+        self.refresh_async(name, self.remote_assets[name])
+        if os.path.exists(self.path(name)):
+            return f"{STATIC_URL}/{name}"
+        return self.remote_assets[name]
+
+    def thumbnail(self, video_id):
+        """
+        st.image source of a video thumbnail: the local file if present, the remote URL otherwise.
+        video_id: a validated 11 character YouTube video id
+        """
+        name = f"thumbnails/{video_id}.jpg"
+        remote_url = THUMBNAIL_URL.format(video_id=video_id)
+        self.refresh_async(name, remote_url)
+        return self.path(name) if os.path.exists(self.path(name)) else remote_url
+
+    def read_json(self, name):
+        """
+        Parsed local copy of a JSON asset, or None while it has not been fetched yet.
+        """
+        self.refresh_async(name, self.remote_assets[name])
+        try:
+            with open(self.path(name), encoding="utf-8") as asset_file:
+                return json.load(asset_file)
+        except (OSError, ValueError):
+            return None
+
+    def refresh_async(self, name, remote_url):
+        """
+        Queues a fetch of the asset unless this process checked it recently or a fetch is already queued.
+        """
+        now = time.time()
+        with self._lock:
+            if name in self._pending or now - self._checked.get(name, 0) < self.revalidate_after:
+                return
+            self._pending.add(name)
+            self._checked[name] = now
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(FETCH_WORKERS, thread_name_prefix="static-assets")
+        self._executor.submit(self._refresh_in_background, name, remote_url)
+
+    def _refresh_in_background(self, name, remote_url):
+        try:
+            self.refresh(name, remote_url)
+        except Exception as e:
+            logging.info(f"Error fetching static asset {name}: {e}")
+            with self._lock:
+                # Try again after RETRY_AFTER instead of REVALIDATE_AFTER
+                self._checked[name] = time.time() - self.revalidate_after + RETRY_AFTER
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def refresh(self, name, remote_url):
+        """
+        Fetches the asset, or revalidates the local copy with a conditional GET. Returns True if the file changed.
+        """
+        path = self.path(name)
+        with FileLock(self.lock_path, shared=True):
+            entry = self._read_state().get(name, {})
+        exists = os.path.exists(path)
+        if exists and time.time() - entry.get("checked", 0) < self.revalidate_after:
+            # Revalidated by another worker
+            return False
+
+        headers = {}
+        if exists and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if exists and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = requests.get(remote_url, headers=headers, timeout=FETCH_TIMEOUT)
+        changed = response.status_code != 304
+        if changed:
+            response.raise_for_status()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as asset_file:
+                asset_file.write(response.content)
+            os.replace(temp_path, path)
+            entry = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            logging.info(f"Fetched static asset {name} ({len(response.content)} bytes)")
+        entry = {**entry, "checked": time.time()}
+
+        with FileLock(self.lock_path):
+            state = self._read_state()
+            state[name] = entry
+            if changed and name.startswith("thumbnails/"):
+                self._prune_thumbnails(state)
+            temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as state_file:
+                json.dump(state, state_file)
+            os.replace(temp_path, self.state_path)
+        return changed
+
+    def _read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _prune_thumbnails(self, state):
+        # Keeps the THUMBNAIL_LIMIT most recently fetched thumbnails
+        thumbnails = sorted((name for name in state if name.startswith("thumbnails/")),
+                            key=lambda name: state[name]["checked"])
+        for name in thumbnails[:max(0, len(thumbnails) - THUMBNAIL_LIMIT)]:
+            del state[name]
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                pass
+
+
+@lru_cache(maxsize=None)
+def get_static_assets():
+    return StaticAssets(STATIC_DIR)
+
+
+def asset_url(name):
+    return get_static_assets().url(name)
+
+
+def thumbnail(video_id):
+    return get_static_assets().thumbnail(video_id)
+
+
+def lottie_json(name):
+    return get_static_assets().read_json(name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print("Usage: python -m claims.static_assets")
+        sys.exit(1)
+    assets = get_static_assets()
+    for asset_name, asset_remote_url in REMOTE_ASSETS.items():
+        status = "fetched" if assets.refresh(asset_name, asset_remote_url) else "up to date"
+        print(f"{asset_name}: {status}")
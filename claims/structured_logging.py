@@ -0,0 +1,189 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import pandas as pd
+
+"""
+Structured, non-blocking logging for the claims package.
+
+Log records are written as one JSON object per line. Request threads only push records onto an in-memory queue
+(QueueHandler); a single background QueueListener thread does the disk I/O into a size-rotated file.
+Very large messages (e.g. whole transcripts) are truncated before they are queued, and can optionally be sampled.
+
+The logs can be loaded back into a DataFrame in chunks, so large log directories never have to fit in memory at once.
+"""
+
+LOG_DIR = os.environ.get("CLAIMS_LOG_DIR", "logs")
+LOG_FILE_NAME = "claims.log"
+LOG_MAX_BYTES = int(os.environ.get("CLAIMS_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get("CLAIMS_LOG_BACKUP_COUNT", 5))
+MAX_MESSAGE_CHARS = int(os.environ.get("CLAIMS_LOG_MAX_MESSAGE_CHARS", 2000))
+LARGE_MESSAGE_SAMPLE_RATE = float(os.environ.get("CLAIMS_LOG_LARGE_SAMPLE_RATE", 1.0))
+
+LOG_COLUMNS = ["time", "level", "line", "file", "function", "thread", "message"]
+
+_listener = None
+_backup_count = LOG_BACKUP_COUNT
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a log record as a single line of JSON.
+    """
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "line": record.lineno,
+            "file": record.filename,
+            "function": record.funcName,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "truncated_chars", 0):
+            entry["truncated_chars"] = record.truncated_chars
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class PayloadFilter(logging.Filter):
+    """
+    Keeps large payloads off the log queue.
+
+    Messages longer than max_chars are truncated, and only a sample_rate fraction of them is kept at all.
+    Runs in the calling thread, before the record is queued.
+    """
+    def __init__(self, max_chars=MAX_MESSAGE_CHARS, sample_rate=LARGE_MESSAGE_SAMPLE_RATE):
+        super().__init__()
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        message = record.getMessage()
+        if len(message) <= self.max_chars:
+            return True
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        record.msg = message[:self.max_chars]
+        record.args = None
+        record.truncated_chars = len(message) - self.max_chars
+        return True
+
+
+def setup_logging(log_dir=LOG_DIR, level=logging.INFO, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                  max_chars=MAX_MESSAGE_CHARS, sample_rate=LARGE_MESSAGE_SAMPLE_RATE, file_name=LOG_FILE_NAME):
+    """
+    Routes the root logger through a queue to a size-rotated JSON lines file.
+    Safe to call more than once (e.g. in a forked worker, which needs its own listener thread and log file);
+    the previous listener is stopped and replaced.
+
+    Returns the path of the active log file.
+    """
+    global _listener, _backup_count
+
+    os.makedirs(log_dir, exist_ok=True)
+    log_file_path = os.path.join(log_dir, file_name)
+
+    file_handler = RotatingFileHandler(log_file_path, maxBytes=max_bytes, backupCount=backup_count,
+                                       encoding="utf-8", delay=True)
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(PayloadFilter(max_chars=max_chars, sample_rate=sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    _backup_count = backup_count
+    return log_file_path
+
+
+def shutdown_logging():
+    """
+    Flushes queued records to disk and stops the background listener.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_log_files(log_dir=LOG_DIR, file_name=LOG_FILE_NAME, backup_count=None):
+    """
+    Returns the current log file and its rotated backups, oldest first.
+    backup_count: number of backups to look for, the backup_count of the last setup_logging call if None
+    """
+    base = os.path.join(log_dir, file_name)
+    backup_count = _backup_count if backup_count is None else backup_count
+    backups = [f"{base}.{i}" for i in range(backup_count, 0, -1)]
+    return [path for path in backups + [base] if os.path.exists(path)]
+
+
+def iter_log_records(file_path):
+    """
+    Streams the JSON log records of a file one at a time. Lines that are not valid JSON are skipped.
+    """
+    with open(file_path, encoding="utf-8") as log_file:
+        for line in log_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_log_chunks(file_paths, chunksize=10000):
+    """
+    Loads one or more log files into DataFrames of at most chunksize rows.
+
+    file_paths: a single path or a list of paths (e.g. from get_log_files)
+    """
+    if isinstance(file_paths, (str, os.PathLike)):
+        file_paths = [file_paths]
+
+    chunk = []
+    for file_path in file_paths:
+        for record in iter_log_records(file_path):
+            chunk.append(record)
+            if len(chunk) >= chunksize:
+                yield pd.DataFrame(chunk, columns=LOG_COLUMNS)
+                chunk = []
+    if chunk:
+        yield pd.DataFrame(chunk, columns=LOG_COLUMNS)
+
+
+def get_log_dataframe(file_path, chunksize=10000):
+    """
+    Returns a DataFrame with a single log_message column ("<time>:$<message>") for the given log file(s).
+    """
+    frames = []
+    for chunk in read_log_chunks(file_path, chunksize=chunksize):
+        chunk["log_message"] = chunk["time"].astype(str) + ":$" + chunk["message"].astype(str)
+        frames.append(chunk[["log_message"]])
+
+    if not frames:
+        return pd.DataFrame(columns=["log_message"])
+    return pd.concat(frames, ignore_index=True)
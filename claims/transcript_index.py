@@ -0,0 +1,143 @@
+import re
+from dataclasses import dataclass
+from claims.bm25 import BM25
+
+"""
+Cue-level transcript index: which text was said when.
+
+clean_subtitles() flattens the captions into one block of text for the LLM and drops all timing. This index keeps
+the cues (start/end time -> text span) so every generated claim can be anchored back to the part of the video it
+came from. The UI uses the anchor to deep-link to the timestamp and to show the claim in context, and re-checking
+a single claim only needs the text of its span instead of the full transcript.
+
+Claims are paraphrases, so they are anchored with BM25 over overlapping windows of cues rather than by exact match.
+"""
+
+TIMESTAMP_PATTERN = re.compile(
+    r"(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s*-->\s*(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})")
+TAG_PATTERN = re.compile(r"<[^>]*>")
+
+WINDOW_CUES = 8
+WINDOW_STRIDE = 2
+
+
+@dataclass(slots=True)
+class Cue:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass(slots=True)
+class ClaimSpan:
+    start: float
+    end: float
+    text: str
+    score: float = 0.0
+
+
+def _seconds(hours, minutes, seconds, millis):
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(millis) / 1000
+
+
+def parse_timed_cues(subtitle_text):
+    """
+    Parses a VTT or SRT subtitle file into cues, in order.
+
+    YouTube auto captions repeat the previous line at the top of every cue (roll-up captions); only new lines are
+    kept, so every piece of text belongs to the cue where it first appeared.
+    """
+    cues = []
+    last_line = None
+    current = None
+    lines = subtitle_text.replace("\r\n", "\n").split("\n")
+    for i, line in enumerate(lines):
+        match = TIMESTAMP_PATTERN.search(line)
+        if match:
+            groups = match.groups()
+            current = Cue(_seconds(*groups[:4]), _seconds(*groups[4:]), "")
+            cues.append(current)
+            continue
+        line = TAG_PATTERN.sub("", line).strip()
+        # Skip the header, SRT cue numbers and the repeated roll-up lines
+        if current is None or not line or line == last_line:
+            continue
+        if line.isdigit() and i + 1 < len(lines) and TIMESTAMP_PATTERN.search(lines[i + 1]):
+            continue
+        current.text = f"{current.text} {line}" if current.text else line
+        last_line = line
+    cues = [cue for cue in cues if cue.text]
+    return cues
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def deep_link(video_id, seconds):
+    """
+    Link that opens the video at the given time.
+    """
+    return f"https://youtu.be/{video_id}?t={int(seconds)}"
+
+
+class TranscriptIndex:
+    """
+    The timed cues of one video, searchable by time and by text.
+    """
+    def __init__(self, cues, window=WINDOW_CUES, stride=WINDOW_STRIDE):
+        self.cues = cues
+        self.window = window
+        self.stride = stride
+        self._windows = None
+        self._bm25 = None
+
+    @classmethod
+    def from_subtitles(cls, subtitle_text, **kwargs):
+        return cls(parse_timed_cues(subtitle_text or ""), **kwargs)
+
+    def __len__(self):
+        return len(self.cues)
+
+    def text_between(self, start, end):
+        """
+        Text of the cues overlapping the time range (seconds).
+        """
+        return " ".join(cue.text for cue in self.cues if cue.end > start and cue.start < end)
+
+    def span(self, start, end, padding=0.0):
+        """
+        The ClaimSpan covering a time range, optionally widened by padding seconds on both sides (for context).
+        """
+        start, end = max(0.0, start - padding), end + padding
+        return ClaimSpan(start, end, self.text_between(start, end))
+
+    def _build(self):
+        starts = range(0, max(len(self.cues) - self.window, 0) + 1, self.stride)
+        self._windows = [(i, min(i + self.window, len(self.cues))) for i in starts]
+        if self._windows[-1][1] < len(self.cues):
+            self._windows.append((len(self.cues) - self.window, len(self.cues)))
+        self._bm25 = BM25([" ".join(cue.text for cue in self.cues[i:j]) for i, j in self._windows])
+
+    def locate(self, claim):
+        """
+        Anchors a claim to the window of cues that matches it best. Returns a ClaimSpan, or None if no cue shares
+        any term with the claim.
+        """
+        if not self.cues:
+            return None
+        if self._bm25 is None:
+            self._build()
+        scores = self._bm25.scores(claim)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        if scores[best] <= 0:
+            return None
+        i, j = self._windows[best]
+        cues = self.cues[i:j]
+        return ClaimSpan(cues[0].start, cues[-1].end, " ".join(cue.text for cue in cues), scores[best])
+
+    def locate_all(self, claims):
+        return [self.locate(claim) for claim in claims]
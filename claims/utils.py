@@ -1,6 +1,9 @@
 from fuzzywuzzy import process
 from fuzzywuzzy import fuzz
+import csv
+from functools import lru_cache
 import pandas as pd
+from claims.scimago import normalize_issn, split_issns
 
 """
 Not all articles fetched from pubmed maybe high quality. 
@@ -41,3 +44,81 @@ def ranked_df(df, df1):
     merged_df.drop(columns= ['Rank'], inplace= True)
 
     return merged_df
+
+
+class JournalRankings:
+    """
+    The SCImago ranking table as an ISSN -> rank and name -> rank lookup.
+    ISSNs and exact (case-insensitive) names are O(1) dict hits; the fuzzy match is only run for journals that
+    match neither, and cached.
+    """
+    def __init__(self, rows):
+        """
+        rows: iterable of (rank, journal name) or (rank, journal name, ISSN list)
+        """
+        self.rank_by_name = {}
+        self.rank_by_issn = {}
+        for rank, name, *issns in rows:
+            self.rank_by_name.setdefault(name, int(rank))
+            for issn in split_issns(issns[0] if issns else ""):
+                self.rank_by_issn.setdefault(issn, int(rank))
+        self.rank_by_lower = {name.lower(): rank for name, rank in self.rank_by_name.items()}
+        self.choices = list(self.rank_by_name)
+        self.fuzzy_cache = {}
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as rankings_file:
+            reader = csv.DictReader(rankings_file)
+            return cls((row['Rank'], row['Journal'], row.get('Issn') or '') for row in reader)
+
+    def rank(self, journal, issns=(), nlm_id=None):
+        """
+        journal: journal title of the article
+        issns: ISSNs of the journal (ISSN and ISSNLinking of the PubMed record), tried first
+        nlm_id: NLM catalog ID of the journal, used as the fuzzy cache key when given
+        """
+        for issn in issns:
+            rank = self.rank_by_issn.get(normalize_issn(issn))
+            if rank is not None:
+                return rank
+        if not journal:
+            return None
+        rank = self.rank_by_lower.get(journal.lower())
+        if rank is not None:
+            return rank
+        key = nlm_id or journal
+        if key not in self.fuzzy_cache:
+            best_match, _ = process.extractOne(journal, self.choices, scorer=fuzz.ratio)
+            self.fuzzy_cache[key] = self.rank_by_name[best_match]
+        return self.fuzzy_cache[key]
+
+
+@lru_cache(maxsize=None)
+def get_journal_rankings(path='journal_rankings.csv'):
+    """
+    Loads the ranking table once per process.
+    """
+    return JournalRankings.from_csv(path)
+
+
+def rank_records(records, rankings):
+    """
+    Sets normalized_rank on each ArticleRecord from the reputation of its journal, in place.
+    records: ArticleRecords fetched from pubmed
+    rankings: a JournalRankings table
+    """
+    ranks = [rankings.rank(record.journal, (record.issn, record.issn_linking), record.nlm_id) for record in records]
+    known = [rank for rank in ranks if rank is not None]
+    if not known:
+        return records
+
+    # Apply min-max normalization, best journal -> 1
+    min_rank, max_rank = min(known), max(known)
+    spread = max_rank - min_rank
+    for record, rank in zip(records, ranks):
+        if rank is None:
+            record.normalized_rank = 0.0
+        else:
+            record.normalized_rank = 1 - (rank - min_rank) / spread if spread else 1.0
+    return records
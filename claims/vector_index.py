@@ -0,0 +1,402 @@
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+import numpy as np
+from claims import logging
+from claims.filelock import FileLock
+
+"""
+A persistent approximate nearest neighbour index for the embeddings of previously retrieved papers.
+
+The same nutrition and fitness papers keep coming back across videos, so instead of throwing their embeddings away
+after every claim we accumulate them here and search this local corpus before going to PubMed.
+
+Layout of the index directory:
+1. vectors.f32 - float32 vectors (L2 normalized, so dot product = cosine similarity), memory-mapped, append only.
+2. state.pkl - snapshot of the keys, payloads, tombstones and the IVF (inverted file) coarse quantizer.
+3. journal.pkl - the inserts and deletes since the snapshot, as appended pickled records.
+
+An insert writes its rows into the memory-mapped vector file and appends one journal record with their keys,
+payloads and centroid assignments, so it costs O(rows inserted) instead of re-pickling the whole state. The journal
+is folded into a new snapshot once it has grown larger than the snapshot, and whenever the centroids change
+(training, compaction). Every snapshot starts a new journal generation; a journal of another generation (left over
+by a crash between writing the snapshot and the new journal) is ignored, and a torn last record is cut off.
+
+Small indexes are searched exactly. Once there are enough vectors, k-means centroids are trained and each vector is
+assigned to its nearest centroid; a search then only scans the vectors of the nprobe closest centroids.
+Deletes are tombstones; compact() rewrites the vector file without them and retrains the centroids.
+
+Several worker processes can share one index directory: every change happens under an exclusive file lock, after
+catching up with the snapshot and journal records another process saved, and is saved before the lock is released.
+"""
+
+VECTORS_FILE = "vectors.f32"
+STATE_FILE = "state.pkl"
+JOURNAL_FILE = "journal.pkl"
+LOCK_FILE = ".lock"
+STATE_FIELDS = ("dim", "model", "count", "keys", "payloads", "deleted", "centroids", "assignments", "generation")
+# The journal is folded into the snapshot once it is larger than the snapshot and than this
+JOURNAL_MIN_BYTES = 1024 * 1024
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def kmeans(vectors, n_clusters, n_iter=10, seed=0):
+    """
+    Spherical k-means on normalized vectors. Returns the (normalized) centroids.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = vectors[assignments == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class VectorIndex:
+    """
+    IVF index over memory-mapped float32 vectors with incremental inserts, deletes and compaction.
+    Thread safe, so it can be shared by all sessions of the app process, and process safe through a file lock.
+    """
+    def __init__(self, index_dir, dim=None, model=None, train_threshold=2000, nprobe=8):
+        """
+        index_dir: directory holding the index files (created if missing)
+        dim: vector dimension; taken from the first insert if not given
+        model: name of the embedding model, checked on load so vectors of different models never mix
+        train_threshold: number of live vectors from which the IVF quantizer is used instead of exact search
+        nprobe: number of centroid lists scanned per search
+        """
+        self.index_dir = index_dir
+        self.vectors_path = os.path.join(index_dir, VECTORS_FILE)
+        self.state_path = os.path.join(index_dir, STATE_FILE)
+        self.journal_path = os.path.join(index_dir, JOURNAL_FILE)
+        self.lock_path = os.path.join(index_dir, LOCK_FILE)
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        self.lock = threading.RLock()
+
+        self.dim = dim
+        self.model = model
+        self.count = 0            # rows written to vectors.f32
+        self.keys = []            # row -> key
+        self.row_by_key = {}      # key -> live row
+        self.payloads = {}        # key -> payload
+        self.deleted = set()      # rows that are tombstoned
+        self.centroids = None     # IVF centroids, None until trained
+        self.assignments = np.zeros(0, dtype=np.int32)  # row -> centroid
+        self.vectors = None
+        self.generation = 0       # journal generation of the snapshot
+        self.state_stamp = None   # identity of the state file this instance last loaded or saved
+        self.journal_inode = None  # journal file the records up to journal_offset were read from or written to
+        self.journal_offset = 0
+        self.pending = []         # journal records of the changes not saved yet
+        self.snapshot_needed = False
+
+        os.makedirs(index_dir, exist_ok=True)
+        if os.path.exists(self.state_path):
+            self.load(model)
+
+    def __len__(self):
+        return len(self.row_by_key)
+
+    def __contains__(self, key):
+        return key in self.row_by_key
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.state_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load(self, model=None):
+        with self.lock:
+            stamp = self._stamp()
+            with open(self.state_path, "rb") as state_file:
+                state = pickle.load(state_file)
+            if model and state["model"] and model != state["model"]:
+                raise ValueError(f"Index at {self.index_dir} was built with {state['model']}, not {model}")
+            for name in STATE_FIELDS:
+                setattr(self, name, state.get(name, 0))
+            self.row_by_key = {key: row for row, key in enumerate(self.keys) if row not in self.deleted}
+            self.vectors = None  # the file may have been replaced by compaction in another process
+            self.state_stamp = stamp
+            self.journal_inode = None
+            self.journal_offset = 0
+            self._replay()
+            if self.dim is not None:
+                self._open_vectors(self.count)
+
+    def refresh(self):
+        """
+        Reloads the snapshot if another process saved a newer one, and applies the journal records added since.
+        """
+        with self.lock:
+            stamp = self._stamp()
+            if stamp is not None and stamp != self.state_stamp:
+                self.load()
+                return
+            try:
+                stat = os.stat(self.journal_path)
+            except FileNotFoundError:
+                return
+            if stat.st_ino != self.journal_inode or stat.st_size > self.journal_offset:
+                self._replay()
+                if self.dim is not None:
+                    self._open_vectors(self.count)
+
+    def _replay(self):
+        """
+        Applies the complete journal records after journal_offset.
+        """
+        try:
+            journal_file = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            return
+        with journal_file:
+            inode = os.fstat(journal_file.fileno()).st_ino
+            if inode != self.journal_inode:
+                try:
+                    header = pickle.load(journal_file)
+                except Exception:
+                    return
+                if header != ("generation", self.generation):
+                    return
+                self.journal_inode = inode
+                self.journal_offset = journal_file.tell()
+            journal_file.seek(self.journal_offset)
+            while True:
+                try:
+                    record = pickle.load(journal_file)
+                except Exception:
+                    # The end of the journal, or a record still being written (or torn by a crash)
+                    break
+                if record[0] == "add":
+                    _, start, keys, payloads, assignments = record
+                    self._append_rows(start, keys, payloads, assignments)
+                else:
+                    self._delete(record[1])
+                self.journal_offset = journal_file.tell()
+
+    def _save(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+        journal_size = self.journal_offset if self.journal_inode is not None else 0
+        if (self.snapshot_needed or self.state_stamp is None or self.journal_inode is None
+                or journal_size > max(JOURNAL_MIN_BYTES, self.state_stamp[2])):
+            self._save_snapshot()
+        elif self.pending:
+            with open(self.journal_path, "r+b") as journal_file:
+                # Cut off a torn record left by a crashed writer before appending
+                journal_file.seek(self.journal_offset)
+                journal_file.truncate()
+                for record in self.pending:
+                    pickle.dump(record, journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+                self.journal_offset = journal_file.tell()
+        self.pending = []
+
+    def _save_snapshot(self):
+        self.generation += 1
+        state = {name: getattr(self, name) for name in STATE_FIELDS}
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "wb") as state_file:
+            pickle.dump(state, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.state_path)
+        self.state_stamp = self._stamp()
+
+        # A fresh journal for the new generation
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "wb") as journal_file:
+            pickle.dump(("generation", self.generation), journal_file, protocol=pickle.HIGHEST_PROTOCOL)
+            self.journal_offset = journal_file.tell()
+        os.replace(tmp_path, self.journal_path)
+        self.journal_inode = os.stat(self.journal_path).st_ino
+        self.snapshot_needed = False
+
+    def save(self):
+        """
+        Writes a full snapshot of the state and starts a new journal.
+        """
+        with self._exclusive(refresh=False):
+            self.snapshot_needed = True
+            self._save()
+
+    @contextmanager
+    def _exclusive(self, refresh=True):
+        """
+        Thread lock + inter-process file lock, with the state brought up to date first.
+        """
+        with self.lock, FileLock(self.lock_path):
+            if refresh:
+                self.refresh()
+            yield
+
+    def _open_vectors(self, min_rows):
+        """
+        (Re)maps vectors.f32, growing the file geometrically so appends are amortized O(1).
+        """
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        capacity = size // row_bytes
+        if capacity < max(min_rows, 1):
+            capacity = max(min_rows, 2 * capacity, 1024)
+            if self.vectors is not None:
+                self.vectors.flush()
+                self.vectors = None
+            with open(self.vectors_path, "ab") as vectors_file:
+                vectors_file.truncate(capacity * row_bytes)
+        if self.vectors is None or len(self.vectors) != capacity:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def add(self, keys, vectors, payloads=None):
+        """
+        Inserts (or replaces) vectors under the given keys, with an optional payload per key, and saves.
+        """
+        vectors = _normalize(vectors)
+        if vectors.ndim != 2 or len(vectors) != len(keys):
+            raise ValueError("Expected one vector per key")
+        payloads = payloads if payloads is not None else [None] * len(keys)
+
+        with self._exclusive():
+            self._add(keys, vectors, payloads)
+            self._save()
+
+    def _add(self, keys, vectors, payloads):
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self.snapshot_needed = True
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+
+        start = self.count
+        self._open_vectors(start + len(keys))
+        self.vectors[start:start + len(keys)] = vectors
+
+        new_assignments = np.full(len(keys), -1, dtype=np.int32)
+        if self.centroids is not None:
+            new_assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        keys, payloads = list(keys), list(payloads)
+        self._append_rows(start, keys, payloads, new_assignments)
+        self.pending.append(("add", start, keys, payloads, new_assignments))
+
+        if self.centroids is None and len(self) >= self.train_threshold:
+            self._train()
+
+    def _append_rows(self, start, keys, payloads, assignments):
+        """
+        Registers rows start.. of the vector file (already written) under the keys, replacing older rows of a key.
+        A key repeated within the batch keeps its last row.
+        """
+        for row, (key, payload) in enumerate(zip(keys, payloads), start):
+            self._delete(key)
+            self.keys.append(key)
+            self.row_by_key[key] = row
+            self.payloads[key] = payload
+        self.count = start + len(keys)
+        self.assignments = np.concatenate([self.assignments, assignments])
+
+    def delete(self, key):
+        with self._exclusive():
+            if self._delete(key):
+                self.pending.append(("delete", key))
+                self._save()
+
+    def _delete(self, key):
+        row = self.row_by_key.pop(key, None)
+        if row is None:
+            return False
+        self.deleted.add(row)
+        self.payloads.pop(key, None)
+        return True
+
+    def get_vector(self, key):
+        with self.lock:
+            row = self.row_by_key.get(key)
+            return None if row is None else np.array(self.vectors[row])
+
+    def _live_rows(self):
+        rows = np.arange(self.count)
+        if self.deleted:
+            rows = rows[~np.isin(rows, list(self.deleted))]
+        return rows
+
+    def train(self, n_clusters=None):
+        """
+        Trains the IVF centroids on the live vectors and reassigns every row.
+        """
+        with self._exclusive():
+            self._train(n_clusters)
+            self._save()
+
+    def _train(self, n_clusters=None):
+        rows = self._live_rows()
+        if not len(rows):
+            return
+        n_clusters = n_clusters or max(1, int(np.sqrt(len(rows))))
+        self.centroids = kmeans(np.asarray(self.vectors[rows]), min(n_clusters, len(rows)))
+        self.assignments = np.argmax(np.asarray(self.vectors[:self.count]) @ self.centroids.T, axis=1).astype(np.int32)
+        self.snapshot_needed = True
+        logging.info(f"Trained {len(self.centroids)} IVF centroids on {len(rows)} vectors")
+
+    def compact(self):
+        """
+        Rewrites the vector file without tombstoned rows and retrains the centroids.
+        """
+        with self._exclusive():
+            if self.dim is None:
+                return
+            rows = self._live_rows()
+            live_vectors = np.array(self.vectors[rows]) if len(rows) else np.zeros((0, self.dim), dtype=np.float32)
+            live_keys = [self.keys[row] for row in rows]
+
+            # Write the live rows to a new file and swap it in, so a crash never leaves a half-written index
+            tmp_path = self.vectors_path + ".tmp"
+            live_vectors.tofile(tmp_path)
+            self.vectors = None
+            os.replace(tmp_path, self.vectors_path)
+
+            self.count = len(live_keys)
+            self.keys = live_keys
+            self.row_by_key = {key: row for row, key in enumerate(live_keys)}
+            self.payloads = {key: self.payloads.get(key) for key in live_keys}
+            self.deleted = set()
+            self.centroids = None
+            self.assignments = np.full(self.count, -1, dtype=np.int32)
+            self._open_vectors(self.count)
+            if len(self) >= self.train_threshold:
+                self._train()
+            self.snapshot_needed = True
+            self._save()
+
+    def search(self, query_vector, k=5):
+        """
+        Returns up to k (key, cosine similarity, payload) tuples, most similar first.
+        """
+        with self.lock:
+            self.refresh()
+            if not len(self):
+                return []
+            query = _normalize(query_vector).reshape(-1)
+
+            if self.centroids is None:
+                rows = self._live_rows()
+            else:
+                probes = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+                rows = np.flatnonzero(np.isin(self.assignments[:self.count], probes))
+                if self.deleted:
+                    rows = rows[~np.isin(rows, list(self.deleted))]
+            if not len(rows):
+                return []
+
+            scores = np.asarray(self.vectors[rows]) @ query
+            top = np.argsort(scores)[::-1][:k]
+            return [(self.keys[rows[i]], float(scores[i]), self.payloads.get(self.keys[rows[i]])) for i in top]
@@ -0,0 +1,312 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from claims import logging
+from claims.claim_cache import claim_key
+from claims.sqlite_util import ThreadConnections
+
+"""
+Persistent store of every claim verdict, for history and analytics across videos.
+
+Verdicts used to be rendered and thrown away; the log files were the only history and had to be re-parsed in full
+for every question. The VerdictStore keeps videos (with their channel), claims, classifications, verdicts and the
+ranked evidence PMIDs in SQLite:
+
+    videos(video_id, channel_id, channel, title, first_seen)
+    verdicts(id, video_id, claim_index, claim, claim_hash, classification, source, degraded, verdict, created)
+    evidence(verdict_id, pmid, rank, score)
+
+The database runs in WAL mode, so the dashboards read while the app workers write. Every column the queries filter
+or group on is indexed (video, claim hash, classification, time, PMID). The pipeline writes through a VerdictWriter,
+which buffers the verdicts of a video and writes them in one transaction. Reads are streamed with keyset pagination
+(WHERE id < cursor ORDER BY id DESC LIMIT n), so no query holds a read transaction or an OFFSET scan over hundreds of
+thousands of rows.
+
+Usage:
+    python -m claims.verdict_store verdicts.db summary
+    python -m claims.verdict_store verdicts.db top-channels [classification]
+"""
+
+# The classes of prompts.classification_task
+SCIENTIFIC = "Scientific"
+PSEUDO_SCIENCE = "Pseudo-science/Inconclusive"
+PARTIALLY_CORRECT = "Partially correct"
+CLASSIFICATION_PATTERN = re.compile(r'"?classification"?\s*:\s*"?([^"\n,}]+)', re.I)
+PAGE_SIZE = 500
+WRITE_BATCH_SIZE = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    channel_id TEXT,
+    channel TEXT,
+    title TEXT,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS verdicts (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    claim_index INTEGER,
+    claim TEXT NOT NULL,
+    claim_hash TEXT NOT NULL,
+    classification TEXT,
+    source TEXT,
+    degraded TEXT,
+    verdict TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evidence (
+    verdict_id INTEGER NOT NULL,
+    pmid TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    score REAL,
+    PRIMARY KEY (verdict_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_videos_channel ON videos (channel_id);
+CREATE INDEX IF NOT EXISTS idx_verdicts_video ON verdicts (video_id, claim_index);
+CREATE INDEX IF NOT EXISTS idx_verdicts_claim_hash ON verdicts (claim_hash);
+CREATE INDEX IF NOT EXISTS idx_verdicts_classification ON verdicts (classification);
+CREATE INDEX IF NOT EXISTS idx_verdicts_created ON verdicts (created);
+CREATE INDEX IF NOT EXISTS idx_evidence_pmid ON evidence (pmid);
+"""
+
+
+def normalize_classification(value):
+    """
+    Maps the free-form classification of a model answer ("**Pseudo-science**", "partially correct") to its class.
+    """
+    if not value:
+        return None
+    lowered = value.lower()
+    if "pseudo" in lowered or "inconclusive" in lowered:
+        return PSEUDO_SCIENCE
+    if "partial" in lowered:
+        return PARTIALLY_CORRECT
+    if "scientific" in lowered:
+        return SCIENTIFIC
+    return value.strip(" *")
+
+
+def verdict_classification(verdict):
+    """
+    The class of a verdict: a dict (generate_chain_results1) or the JSON text streamed by the RAG chain.
+    """
+    if isinstance(verdict, dict):
+        value = verdict.get("classification") or verdict.get("Classification")
+    else:
+        match = CLASSIFICATION_PATTERN.search(str(verdict or ""))
+        value = match.group(1) if match else None
+    return normalize_classification(str(value) if value else None)
+
+
+class VerdictStore:
+    """
+    SQLite store of videos, verdicts and evidence. Thread and process safe (see sqlite_util.ThreadConnections).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.connections = ThreadConnections(path, pragmas=["synchronous=NORMAL"], row_factory=sqlite3.Row)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+
+    def connection(self):
+        return self.connections.get()
+
+    def record_video(self, video_id, metadata=None):
+        """
+        Adds a video with its channel (from the yt-dlp metadata), or updates the channel of a known one.
+        """
+        metadata = metadata or {}
+        with self.connection() as connection:
+            connection.execute(
+                "INSERT INTO videos (video_id, channel_id, channel, title, first_seen) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (video_id) DO UPDATE SET channel_id = coalesce(excluded.channel_id, channel_id), "
+                "channel = coalesce(excluded.channel, channel), title = coalesce(excluded.title, title)",
+                (video_id, metadata.get("channel_id"), metadata.get("channel") or metadata.get("uploader"),
+                 metadata.get("title"), time.time()))
+
+    def write(self, entries):
+        """
+        Writes verdict entries (see VerdictWriter.add) in a single transaction. Returns their ids.
+        """
+        ids = []
+        with self.connection() as connection:
+            for entry in entries:
+                cursor = connection.execute(
+                    "INSERT INTO verdicts (video_id, claim_index, claim, claim_hash, classification, source, degraded, "
+                    "verdict, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry["video_id"], entry["claim_index"], entry["claim"], claim_key(entry["claim"]),
+                     entry["classification"], entry["source"], ",".join(entry["degraded"]) or None,
+                     json.dumps(entry["verdict"], default=str), entry["created"]))
+                ids.append(cursor.lastrowid)
+                connection.executemany(
+                    "INSERT INTO evidence (verdict_id, pmid, rank, score) VALUES (?, ?, ?, ?)",
+                    [(cursor.lastrowid, str(pmid), rank, score) for rank, (pmid, score) in enumerate(entry["evidence"])])
+        return ids
+
+    def _row(self, row):
+        entry = dict(row)
+        if entry.get("verdict"):
+            entry["verdict"] = json.loads(entry["verdict"])
+        entry["degraded"] = entry["degraded"].split(",") if entry.get("degraded") else []
+        return entry
+
+    def _filters(self, video_id=None, channel_id=None, classification=None, since=None, until=None):
+        clauses, params = [], []
+        if video_id is not None:
+            clauses.append("v.video_id = ?")
+            params.append(video_id)
+        if channel_id is not None:
+            clauses.append("v.video_id IN (SELECT video_id FROM videos WHERE channel_id = ?)")
+            params.append(channel_id)
+        if classification is not None:
+            clauses.append("v.classification = ?")
+            params.append(classification)
+        if since is not None:
+            clauses.append("v.created >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("v.created < ?")
+            params.append(until)
+        return clauses, params
+
+    def page(self, cursor=None, limit=50, **filters):
+        """
+        One page of verdicts, newest first, with their video and channel.
+        cursor: the next_cursor of the previous page (None for the first page)
+        filters: video_id, channel_id, classification, since, until (unix times)
+        Returns (rows, next_cursor); next_cursor is None after the last page.
+        """
+        clauses, params = self._filters(**filters)
+        if cursor is not None:
+            clauses.append("v.id < ?")
+            params.append(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT v.*, videos.channel_id, videos.channel, videos.title FROM verdicts v "
+            f"LEFT JOIN videos ON videos.video_id = v.video_id {where} ORDER BY v.id DESC LIMIT ?",
+            params + [limit]).fetchall()
+        next_cursor = rows[-1]["id"] if len(rows) == limit else None
+        return [self._row(row) for row in rows], next_cursor
+
+    def iter_verdicts(self, page_size=PAGE_SIZE, **filters):
+        """
+        Streams every verdict matching the filters (see page), newest first, one page at a time.
+        """
+        cursor = None
+        while True:
+            rows, cursor = self.page(cursor, limit=page_size, **filters)
+            yield from rows
+            if cursor is None:
+                return
+
+    def evidence(self, verdict_id):
+        """
+        The evidence PMIDs of a verdict with their scores, in rank order.
+        """
+        rows = self.connection().execute(
+            "SELECT pmid, score FROM evidence WHERE verdict_id = ? ORDER BY rank", (verdict_id,)).fetchall()
+        return [(row["pmid"], row["score"]) for row in rows]
+
+    def claim_history(self, claim, limit=20):
+        """
+        Earlier verdicts of the same (normalized) claim text, newest first.
+        """
+        rows = self.connection().execute(
+            "SELECT * FROM verdicts WHERE claim_hash = ? ORDER BY id DESC LIMIT ?", (claim_key(claim), limit)).fetchall()
+        return [self._row(row) for row in rows]
+
+    def classification_counts(self, since=None):
+        """
+        Number of verdicts per classification.
+        """
+        clauses, params = self._filters(since=since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT v.classification, count(*) AS claims FROM verdicts v {where} GROUP BY v.classification "
+            f"ORDER BY claims DESC", params).fetchall()
+        return {row["classification"]: row["claims"] for row in rows}
+
+    def top_channels(self, classification=PSEUDO_SCIENCE, since=None, limit=20):
+        """
+        The channels with the most claims of a classification, e.g. the most pseudo-scientific claims.
+        Returns dicts with channel_id, channel, claims and videos.
+        """
+        clauses, params = self._filters(classification=classification, since=since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection().execute(
+            f"SELECT videos.channel_id, max(videos.channel) AS channel, count(*) AS claims, "
+            f"count(DISTINCT v.video_id) AS videos FROM verdicts v JOIN videos ON videos.video_id = v.video_id "
+            f"{where} GROUP BY videos.channel_id ORDER BY claims DESC LIMIT ?",
+            params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def top_papers(self, since=None, limit=20):
+        """
+        The PMIDs cited as evidence most often.
+        """
+        if since is None:
+            query, params = "SELECT pmid, count(*) AS citations FROM evidence GROUP BY pmid", []
+        else:
+            query, params = ("SELECT e.pmid, count(*) AS citations FROM evidence e JOIN verdicts v ON v.id = e.verdict_id "
+                             "WHERE v.created >= ? GROUP BY e.pmid", [since])
+        rows = self.connection().execute(f"{query} ORDER BY citations DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+
+class VerdictWriter:
+    """
+    Buffers the verdicts of a run and writes them to the store in batches.
+    """
+    def __init__(self, store, batch_size=WRITE_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def add(self, video_id, claim_index, claim, verdict, evidence=(), source="pubmed", degraded=()):
+        """
+        Queues a verdict.
+        evidence: (pmid, score) pairs in rank order
+        source: "pubmed", "llm" (no-evidence fallback) or "cache" (reused verdict)
+        """
+        self.buffer.append({
+            "video_id": video_id,
+            "claim_index": claim_index,
+            "claim": claim,
+            "classification": verdict_classification(verdict),
+            "source": source,
+            "degraded": list(degraded),
+            "verdict": verdict,
+            "evidence": list(evidence),
+            "created": time.time(),
+        })
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        entries, self.buffer = self.buffer, []
+        if not entries:
+            return
+        try:
+            self.store.write(entries)
+        except Exception as e:
+            logging.info(f"Error writing {len(entries)} verdicts: {e}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[2] not in ("summary", "top-channels"):
+        print("Usage: python -m claims.verdict_store <verdicts.db> summary | top-channels [classification]")
+        sys.exit(1)
+    store = VerdictStore(sys.argv[1])
+    if sys.argv[2] == "summary":
+        for classification, claims in store.classification_counts().items():
+            print(f"{claims:>9}  {classification}")
+    else:
+        classification = sys.argv[3] if len(sys.argv) > 3 else PSEUDO_SCIENCE
+        for row in store.top_channels(classification):
+            print(f"{row['claims']:>9} claims in {row['videos']:>6} videos  {row['channel']} ({row['channel_id']})")
@@ -2,10 +2,14 @@ import logging
 import os
 import subprocess
 import re
-from deepmultilingualpunctuation import PunctuationModel
+from claims.assets import get_punctuation_model
+from claims.fakes import fake_subtitles, fake_backends_enabled
 
 
-def clean_subtitles(subtitle_text):
+def parse_cues(subtitle_text):
+    """
+    Splits a subtitle file into its caption lines, in order, without timestamps, tags or repeated lines.
+    """
     subtitle_text = re.sub(r'(WEBVTT|Kind: captions|Language: \w{2}).*\n?', '', subtitle_text)
     # Step 1: Remove all timestamp lines (like "00:00:00.000 --> 00:00:03.139")
     cleaned_text = re.sub(r'\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}.*\n', '', subtitle_text)
@@ -25,17 +29,23 @@ def clean_subtitles(subtitle_text):
             unique_lines.append(line)
             last_line = line
 
-    # Step 4: Join the lines into a single block of text
-    joined_text = ' '.join(unique_lines)
+    return unique_lines
+
+
+def clean_subtitles(subtitle_text):
+    # Join the caption lines into a single block of text
+    joined_text = ' '.join(parse_cues(subtitle_text))
 
     # Return the processed text with correct sentence boundaries and full stops
     return joined_text
 
 
 class YouTubeTranscriptDownloader:
-    def __init__(self, video_url, language='en'):
+    def __init__(self, video_url, language='en', metadata=None):
         self.video_url = video_url
         self.language = language
+        # yt-dlp -J output of the video, if already fetched (saves the --list-subs call)
+        self.metadata = metadata
 
     def download_transcript(self, output_dir='./'):
 
@@ -83,6 +93,11 @@ class YouTubeTranscriptDownloader:
 
     def get_available_subtitles(self):
         """Check if manual or auto-generated subtitles are available for the video."""
+        if self.metadata:
+            return {
+                "manual": self.language in (self.metadata.get("subtitles") or {}),
+                "auto": self.language in (self.metadata.get("automatic_captions") or {})
+            }
         try:
             # Run the yt-dlp command to get the subtitles
             command = [
@@ -176,20 +191,36 @@ class YouTubeTranscriptDownloader:
             return file.read()
 
 
-def get_transcript(video_url, language='en'):
-    # Create an instance of the downloader with the video URL and language
-    transcript_downloader = YouTubeTranscriptDownloader(video_url, language=language)
+def download_subtitles(video_url, language='en', metadata=None):
+    """
+    Downloads the raw subtitle file content of the video, or returns None.
+    """
+    if fake_backends_enabled():
+        return fake_subtitles()
+    try:
+        return YouTubeTranscriptDownloader(video_url, language=language, metadata=metadata).download_transcript()
+    except Exception as e:
+        logging.error(f"Error: {e}")
+
 
+def get_transcript(video_url, language='en', subtitle_text=None, metadata=None):
+    """
+    Returns the punctuated transcript of the video.
+    subtitle_text: raw subtitles already downloaded with download_subtitles (skips the download)
+    """
     try:
         # Step 1: Download the transcript
-        transcript_text = transcript_downloader.download_transcript()
-        logging.info(transcript_text)
+        if subtitle_text is None:
+            subtitle_text = YouTubeTranscriptDownloader(video_url, language=language, metadata=metadata).download_transcript()
+        transcript_text = subtitle_text
+        logging.info(f"Downloaded transcript ({len(transcript_text or '')} chars)")
+        logging.debug(transcript_text)
 
         # Step 2: Clean the downloaded subtitles
         clean_text = clean_subtitles(transcript_text)
 
-        # Step 3: Restore punctuation using the PunctuationModel
-        model = PunctuationModel()
+        # Step 3: Restore punctuation using the PunctuationModel (loaded once per process)
+        model = get_punctuation_model()
         punctuated_text = model.restore_punctuation(clean_text)
 
         # Step 4: Return the result
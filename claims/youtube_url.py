@@ -0,0 +1,132 @@
+import re
+from urllib.parse import urlsplit, parse_qs, unquote
+
+"""
+YouTube URL parsing and normalization.
+
+Video IDs are validated strictly: 11 characters of the URL-safe base64 alphabet, where the last character only
+carries 2 bits of the 64-bit ID and can therefore only be one of 16 characters. Query parameters are read with
+urllib.parse, and each host has one precompiled pattern for the ID in the path. Anything else (channel pages,
+playlists without a video, other sites, random 11-character words) is rejected here instead of failing later in
+yt-dlp.
+
+The batch functions are meant for bulk ingestion (playlists, CSV exports). They parse every distinct input string
+once and take a single-regex fast path for the common URL shapes.
+"""
+
+VIDEO_ID_PATTERN = re.compile(r"[0-9A-Za-z_-]{10}[AEIMQUYcgkosw048]")
+# Fast path for the common shapes; anything it does not fully match goes through urllib.parse
+FAST_PATTERN = re.compile(r"(?:https?://)?(?:www\.|m\.)?(?:youtube\.com/(?:watch\?v=|shorts/|embed/|live/)|youtu\.be/)"
+                          r"([0-9A-Za-z_-]{10}[AEIMQUYcgkosw048])(?:[?&#][^\s]*)?")
+
+WATCH_URL = "https://www.youtube.com/watch?v={}"
+
+YOUTUBE_PATH_PATTERN = re.compile(r"/(?:embed|v|e|shorts|live)/([^/?#&]+)")
+HOST_PATTERNS = {
+    "youtube.com": YOUTUBE_PATH_PATTERN,
+    "m.youtube.com": YOUTUBE_PATH_PATTERN,
+    "music.youtube.com": YOUTUBE_PATH_PATTERN,
+    "youtube-nocookie.com": re.compile(r"/embed/([^/?#&]+)"),
+    "youtu.be": re.compile(r"/([^/?#&]+)"),
+}
+
+# Paths of youtube.com that carry the video ID in the query string
+WATCH_PATHS = ("/watch", "/watch/", "/attribution_link")
+
+
+def is_video_id(value):
+    return bool(value) and VIDEO_ID_PATTERN.fullmatch(value) is not None
+
+
+def _host(netloc):
+    host = netloc.rsplit("@", 1)[-1].split(":", 1)[0].lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def extract_video_id(url):
+    """
+    Returns the video ID of a YouTube video URL (or of a bare video ID), or None if it is not one.
+    """
+    if not url:
+        return None
+    url = url.strip()
+
+    match = FAST_PATTERN.fullmatch(url)
+    if match:
+        return match.group(1)
+    if is_video_id(url):
+        return url
+
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    host = _host(parts.netloc)
+    path_pattern = HOST_PATTERNS.get(host)
+    if path_pattern is None:
+        return None
+
+    if host != "youtu.be" and host != "youtube-nocookie.com" and parts.path in WATCH_PATHS:
+        query = parse_qs(parts.query)
+        if "v" in query:
+            video_id = query["v"][0]
+            return video_id if is_video_id(video_id) else None
+        if "u" in query:
+            # attribution_link?u=/watch%3Fv%3D<id>%26feature...
+            return extract_video_id("https://www.youtube.com" + unquote(query["u"][0]))
+        return None
+
+    match = path_pattern.match(parts.path)
+    if match and is_video_id(match.group(1)):
+        return match.group(1)
+    return None
+
+
+def normalize_url(url):
+    """
+    Returns the canonical watch URL of a YouTube video URL, or None.
+    """
+    video_id = extract_video_id(url)
+    return WATCH_URL.format(video_id) if video_id else None
+
+
+def extract_video_ids(urls):
+    """
+    Extracts the video ID of every URL, in input order (None for invalid URLs).
+    Each distinct string is parsed only once.
+    """
+    parsed = {}
+    ids = []
+    for url in urls:
+        video_id = parsed.get(url, parsed)
+        if video_id is parsed:
+            video_id = parsed[url] = extract_video_id(url)
+        ids.append(video_id)
+    return ids
+
+
+def normalize_urls(urls, canonical=True):
+    """
+    Normalizes and dedupes a batch of URLs.
+
+    canonical: return canonical watch URLs if True, bare video IDs otherwise
+    Returns (unique videos in first-seen order, invalid inputs).
+    """
+    urls = list(urls)
+    seen = set()
+    unique = []
+    invalid = []
+    for url, video_id in zip(urls, extract_video_ids(urls)):
+        if video_id is None:
+            invalid.append(url)
+        elif video_id not in seen:
+            seen.add(video_id)
+            unique.append(video_id)
+    if canonical:
+        unique = [WATCH_URL.format(video_id) for video_id in unique]
+    return unique, invalid
@@ -0,0 +1,63 @@
+"""
+Documents/sec of the embedding backends (see claims/embeddings.py) on a recorded workload.
+
+A workload is a JSON lines file with one vector store build per line, {"texts": [...]}, i.e. the papers of one claim.
+It is recorded from a paper index (PAPER_INDEX_DIR), which holds the text of every paper the app has embedded,
+grouped into builds of BUILD_SIZE papers like the scraper returns them.
+
+Every build is embedded with one embed_documents call, as InMemoryVectorStore.create_embeddings does. The openai
+backend needs OPENAI_API_KEY; the local one CLAIMS_LOCAL_EMBEDDING_MODEL.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/benchmark_embeddings.py record <paper_index_dir> workload.jsonl
+    PYTHONPATH=. python experiments/benchmark_embeddings.py run workload.jsonl openai local
+"""
+import json
+import statistics
+import sys
+import time
+from claims.embeddings import get_embedding_model
+from claims.vector_index import VectorIndex
+
+BUILD_SIZE = 7
+
+
+def record_workload(index_dir, workload_path):
+    texts = [payload["page_content"] for payload in VectorIndex(index_dir).payloads.values() if payload]
+    with open(workload_path, "w", encoding="utf-8") as workload_file:
+        for start in range(0, len(texts), BUILD_SIZE):
+            workload_file.write(json.dumps({"texts": texts[start:start + BUILD_SIZE]}) + "\n")
+    return len(texts)
+
+
+def read_workload(workload_path):
+    with open(workload_path, encoding="utf-8") as workload_file:
+        return [json.loads(line)["texts"] for line in workload_file if line.strip()]
+
+
+def benchmark(backend, builds):
+    model = get_embedding_model(backend)
+    model.embed_documents(builds[0])  # warm up (model load, connection)
+    latencies = []
+    start = time.perf_counter()
+    for texts in builds:
+        build_start = time.perf_counter()
+        model.embed_documents(texts)
+        latencies.append(time.perf_counter() - build_start)
+    elapsed = time.perf_counter() - start
+    documents = sum(len(texts) for texts in builds)
+    print(f"{backend:<8} {documents / elapsed:8.1f} docs/s, median {statistics.median(latencies) * 1000:7.1f} ms "
+          f"per build of {BUILD_SIZE}, max {max(latencies) * 1000:7.1f} ms ({len(builds)} builds)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "record":
+        print(f"Recorded {record_workload(sys.argv[2], sys.argv[3])} papers to {sys.argv[3]}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "run":
+        workload = read_workload(sys.argv[2])
+        for backend in sys.argv[3:] or ["openai", "local"]:
+            benchmark(backend, workload)
+    else:
+        print("Usage: python experiments/benchmark_embeddings.py record <paper_index_dir> <workload.jsonl>\n"
+              "       python experiments/benchmark_embeddings.py run <workload.jsonl> [openai] [local]")
+        sys.exit(1)
@@ -0,0 +1,38 @@
+"""
+Latency and coverage of the local MeSH keyword extractor (claims/mesh_keywords.py) on a list of claims.
+
+Prints the MeSH terms of every claim, the share of claims the extractor is confident about (the others would still
+go to Gemini) and the extraction time per claim.
+
+Run from the repository root, with a vocabulary built by `python -m claims.mesh_keywords`:
+    PYTHONPATH=. python experiments/benchmark_mesh_keywords.py mesh_vocabulary.tsv.gz claims.txt
+"""
+import statistics
+import sys
+import time
+from claims.mesh_keywords import MeshKeywordExtractor
+
+REPEATS = 200
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python experiments/benchmark_mesh_keywords.py <mesh_vocabulary.tsv.gz> <claims.txt>")
+        sys.exit(1)
+    extractor = MeshKeywordExtractor.load(sys.argv[1])
+    with open(sys.argv[2], encoding="utf-8") as claims_file:
+        claims = [line.strip().lstrip("* ") for line in claims_file if line.strip()]
+
+    confident = 0
+    for claim in claims:
+        match = extractor.extract(claim)
+        confident += match.confident
+        print(f"{'local ' if match.confident else 'gemini'} {match.coverage:4.2f} {match.terms}  <- {claim}")
+
+    timings = []
+    for claim in claims:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            extractor.extract(claim)
+        timings.append((time.perf_counter() - start) / REPEATS)
+    print(f"\n{confident}/{len(claims)} claims answered locally, "
+          f"{statistics.mean(timings) * 1e6:.0f} us mean, {max(timings) * 1e6:.0f} us max per claim")
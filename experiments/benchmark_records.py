@@ -0,0 +1,69 @@
+"""
+Benchmark: DataFrame path (ranked_df + load_documents on a DataFrame) vs ArticleRecord path
+(rank_records + load_documents on records) for 7, 100 and 1,000 articles.
+
+Only the plumbing is compared: every article carries the exact name of a journal in the ranking table, both paths
+use the same table (the first TABLE_SIZE journals of journal_rankings.csv) and every repeat gets a fresh
+JournalRankings, so no fuzzy match is cached across repeats. ranked_df still runs a fuzzy match per row, as it
+always did; the sizes in SINGLE_RUN_SIZES time it once instead of best of REPEATS.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/benchmark_records.py
+"""
+import random
+import time
+import pandas as pd
+from claims.records import ArticleRecord
+from claims.utils import ranked_df, rank_records, JournalRankings
+from claims.doc_loader import load_documents
+
+SIZES = [7, 100, 1000]
+SINGLE_RUN_SIZES = {1000}
+REPEATS = 5
+TABLE_SIZE = 300
+
+
+def make_articles(n, journal_names, seed=0):
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n):
+        articles.append({
+            'PMID': str(30000000 + i),
+            'Title': f"Effect of creatine on muscle strength, study {i}",
+            'Abstract': "Creatine supplementation increased strength in a randomized controlled trial. " * 5,
+            'Journal': rng.choice(journal_names),
+            'URL': f"https://www.ncbi.nlm.nih.gov/pubmed/{30000000 + i}",
+            'PMCID': None,
+            'Conclusions': "No PMC article available",
+        })
+    return articles
+
+
+def time_it(fn, setup, repeats=REPEATS):
+    """
+    Best time of fn(setup()) over the repeats; setup runs outside the timing.
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        argument = setup()
+        start = time.perf_counter()
+        fn(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    rankings_df = pd.read_csv('journal_rankings.csv').head(TABLE_SIZE)
+    rows = list(zip(rankings_df['Rank'], rankings_df['Journal']))
+    journal_names = rankings_df['Journal'].tolist()
+
+    print(f"{'articles':>8} {'dataframe (s)':>14} {'records (s)':>12} {'speedup':>8}")
+    for n in SIZES:
+        articles = make_articles(n, journal_names)
+        repeats = 1 if n in SINGLE_RUN_SIZES else REPEATS
+        dataframe_time = time_it(lambda _: load_documents(ranked_df(pd.DataFrame(articles), rankings_df)),
+                                 lambda: None, repeats)
+        records_time = time_it(lambda rankings: load_documents(
+            rank_records([ArticleRecord.from_dict(a) for a in articles], rankings)),
+            lambda: JournalRankings(rows))
+        print(f"{n:>8} {dataframe_time:>14.4f} {records_time:>12.4f} {dataframe_time / records_time:>7.1f}x")
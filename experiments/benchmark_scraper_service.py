@@ -0,0 +1,121 @@
+"""
+Compares per-claim asyncio.run (new event loop and ClientSession per claim) with the shared ScraperService,
+against a local stub of the E-utilities endpoints.
+
+The stub answers esearch, efetch (pubmed and pmc) and elink with canned XML after a fixed service time, and sleeps
+HANDSHAKE_DELAY on the first request of every new connection to stand in for the TCP + TLS round trips to
+eutils.ncbi.nlm.nih.gov. It counts the connections it accepted.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/benchmark_scraper_service.py
+"""
+import asyncio
+import statistics
+import threading
+import time
+from aiohttp import web
+from claims import ratelimit
+from claims.scraper import PubMedScraper
+from claims.scraper_service import get_scraper_service
+
+N_CLAIMS = 20
+SERVICE_TIME = 0.005
+HANDSHAKE_DELAY = 0.06
+PORT = 8765
+
+ESEARCH = """<?xml version="1.0" encoding="UTF-8" ?>
+<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" "https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">
+<eSearchResult><Count>3</Count><RetMax>3</RetMax><RetStart>0</RetStart><IdList>
+<Id>1001</Id><Id>1002</Id><Id>1003</Id></IdList><TranslationSet/><QueryTranslation/></eSearchResult>"""
+
+ARTICLE = """<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM"><PMID Version="1">{pmid}</PMID>
+<Article PubModel="Print"><Journal><ISSN IssnType="Print">0140-6736</ISSN><JournalIssue CitedMedium="Print">
+<PubDate><Year>2020</Year></PubDate></JournalIssue><Title>The Lancet</Title></Journal>
+<ArticleTitle>Creatine and muscle strength {pmid}</ArticleTitle><Abstract><AbstractText>Creatine supplementation
+increased strength in a randomized trial.</AbstractText></Abstract><Language>eng</Language>
+<PublicationTypeList><PublicationType UI="D016449">Randomized Controlled Trial</PublicationType></PublicationTypeList>
+</Article><MedlineJournalInfo><Country>England</Country><MedlineTA>Lancet</MedlineTA><NlmUniqueID>2985213R</NlmUniqueID>
+<ISSNLinking>0140-6736</ISSNLinking></MedlineJournalInfo></MedlineCitation></PubmedArticle>"""
+
+EFETCH_PUBMED = """<?xml version="1.0" ?>
+<!DOCTYPE PubmedArticleSet PUBLIC "-//NLM//DTD PubMedArticle, 1st January 2024//EN" "https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd">
+<PubmedArticleSet>{articles}</PubmedArticleSet>"""
+
+ELINK = """<?xml version="1.0" encoding="UTF-8" ?>
+<eLinkResult><LinkSet><DbFrom>pubmed</DbFrom><LinkSetDb><DbTo>pmc</DbTo><LinkName>pubmed_pmc</LinkName>
+<Link><Id>7000</Id></Link></LinkSetDb></LinkSet></eLinkResult>"""
+
+EFETCH_PMC = """<?xml version="1.0" ?><pmc-articleset><article><body><sec><title>Conclusions</title>
+<p>Creatine improves strength.</p></sec></body></article></pmc-articleset>"""
+
+
+class StubEutils:
+    def __init__(self):
+        self.peers = set()
+        self.requests = 0
+
+    async def handle(self, request):
+        self.requests += 1
+        peer = request.transport.get_extra_info("peername")
+        if peer not in self.peers:
+            self.peers.add(peer)
+            await asyncio.sleep(HANDSHAKE_DELAY)
+        await asyncio.sleep(SERVICE_TIME)
+
+        endpoint = request.match_info["endpoint"]
+        if endpoint == "esearch.fcgi":
+            body = ESEARCH
+        elif endpoint == "elink.fcgi":
+            body = ELINK
+        elif request.query.get("db") == "pmc":
+            body = EFETCH_PMC
+        else:
+            pmids = request.query.get("id", "").split(",")
+            body = EFETCH_PUBMED.format(articles="".join(ARTICLE.format(pmid=pmid) for pmid in pmids))
+        return web.Response(text=body, content_type="text/xml")
+
+
+def start_stub(stub):
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/{endpoint}", stub.handle)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", PORT).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+
+def time_claims(run_claim):
+    latencies = []
+    for i in range(N_CLAIMS):
+        start = time.perf_counter()
+        records = run_claim(["creatine", "strength", f"claim{i}"])
+        latencies.append(time.perf_counter() - start)
+        assert records, "stub returned no records"
+    return latencies
+
+
+def report(name, latencies, stub, connections_before, requests_before):
+    connections = len(stub.peers) - connections_before
+    requests = stub.requests - requests_before
+    print(f"{name:<24} median {statistics.median(latencies) * 1000:7.1f} ms/claim, "
+          f"p95 {sorted(latencies)[int(0.95 * len(latencies)) - 1] * 1000:7.1f} ms, "
+          f"{connections} connections for {requests} requests")
+
+
+if __name__ == "__main__":
+    # The stub is local; don't let the NCBI rate limit dominate the timings
+    ratelimit.PROVIDER_LIMITS["ncbi"] = {"rate": 10000.0, "capacity": 1000}
+
+    stub = StubEutils()
+    start_stub(stub)
+    scraper = PubMedScraper("bench@example.com", None, base_url=f"http://127.0.0.1:{PORT}/")
+
+    before = len(stub.peers), stub.requests
+    latencies = time_claims(lambda topics: asyncio.run(scraper.scrape_records(topics)))
+    report("asyncio.run per claim", latencies, stub, *before)
+
+    before = len(stub.peers), stub.requests
+    latencies = time_claims(scraper.run_records)
+    report("shared ScraperService", latencies, stub, *before)
+    print("client side:", get_scraper_service().metrics())
@@ -0,0 +1,75 @@
+"""
+Write throughput and query latency of the verdict store (claims/verdict_store.py) at the scale of a few hundred
+thousand claims.
+
+Fills a fresh database with synthetic verdicts (N_CHANNELS channels, VIDEOS_PER_CHANNEL videos each, CLAIMS_PER_VIDEO
+claims per video with 5 evidence PMIDs), written per video through a VerdictWriter as the app does, then times the
+dashboard queries.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/benchmark_verdict_store.py [verdicts.db]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from claims.verdict_store import VerdictStore, VerdictWriter, SCIENTIFIC, PSEUDO_SCIENCE, PARTIALLY_CORRECT
+
+N_CHANNELS = 1000
+VIDEOS_PER_CHANNEL = 30
+CLAIMS_PER_VIDEO = 10
+SEED = 0
+
+
+def fill(store, rng):
+    claims = [f"Claim number {i} about supplement {i % 97} and outcome {i % 13}." for i in range(5000)]
+    start = time.perf_counter()
+    for channel in range(N_CHANNELS):
+        # Some channels lean towards pseudo-science
+        weights = [1, 3, 1] if channel % 10 == 0 else [3, 1, 1]
+        for video in range(VIDEOS_PER_CHANNEL):
+            video_id = f"v{channel:04d}{video:03d}xxx"[:11]
+            store.record_video(video_id, {"channel_id": f"UC{channel:06d}", "channel": f"Channel {channel}",
+                                          "title": f"Video {video}"})
+            writer = VerdictWriter(store)
+            for index in range(CLAIMS_PER_VIDEO):
+                classification = rng.choices([SCIENTIFIC, PSEUDO_SCIENCE, PARTIALLY_CORRECT], weights)[0]
+                verdict = {"classification": classification, "research_summary": "Synthetic verdict."}
+                evidence = [(str(rng.randint(1, 200000)), rng.random()) for _ in range(5)]
+                writer.add(video_id, index, rng.choice(claims), verdict, evidence)
+            writer.flush()
+    return time.perf_counter() - start
+
+
+def timed(name, fn, repeats=5):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    print(f"{name:<42} {(time.perf_counter() - start) / repeats * 1000:8.2f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.mkdtemp(), "verdicts.db")
+    store = VerdictStore(path)
+    elapsed = fill(store, random.Random(SEED))
+    total = N_CHANNELS * VIDEOS_PER_CHANNEL * CLAIMS_PER_VIDEO
+    print(f"wrote {total} verdicts in {elapsed:.1f}s ({total / elapsed:.0f} verdicts/s, one transaction per video)")
+    print(f"database size {os.path.getsize(path) / 1e6:.0f} MB\n")
+
+    top = timed("top channels by pseudo-science claims", lambda: store.top_channels(PSEUDO_SCIENCE, limit=10))
+    print("   ", [(row["channel"], row["claims"]) for row in top[:3]])
+    timed("classification counts", store.classification_counts)
+    timed("classification counts, last hour", lambda: store.classification_counts(since=time.time() - 3600))
+    timed("claim history", lambda: store.claim_history("Claim number 42 about supplement 42 and outcome 3."))
+    timed("verdicts of one video", lambda: store.page(video_id="v0500010xxx"[:11], limit=50))
+    timed("first dashboard page", lambda: store.page(limit=50))
+    _, cursor = store.page(limit=50)
+    for _ in range(1000):
+        _, cursor = store.page(cursor, limit=50)
+    timed("page 1000 (keyset cursor)", lambda: store.page(cursor, limit=50))
+    timed("stream one channel (300 verdicts)", lambda: sum(1 for _ in store.iter_verdicts(channel_id="UC000500")))
+    timed("stream all pseudo-science verdicts", lambda: sum(1 for _ in store.iter_verdicts(classification=PSEUDO_SCIENCE)),
+          repeats=1)
+    timed("most cited papers", lambda: store.top_papers(limit=10), repeats=1)
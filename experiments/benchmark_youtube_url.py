@@ -0,0 +1,73 @@
+"""
+Checks claims.youtube_url against the URL corpus and compares its batch throughput with the old regex chain.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/benchmark_youtube_url.py
+"""
+import csv
+import os
+import random
+import re
+import time
+from claims.youtube_url import extract_video_id, normalize_urls
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "youtube_url_corpus.csv")
+N_URLS = 1_000_000
+N_DISTINCT_VIDEOS = 50_000
+
+OLD_PATTERNS = [
+    r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
+    r'(?:embed\/|v\/|youtu.be\/)([0-9A-Za-z_-]{11})',
+    r'(?:watch\?)?(?:feature=player_embedded&)?(?:v=)?(?:video_ids=)?([0-9A-Za-z_-]{11})',
+    r'(?:shorts\/)([0-9A-Za-z_-]{11})',
+]
+
+
+def old_extract_youtube_id(url):
+    # Tokenizer.extract_youtube_id before claims.youtube_url
+    for pattern in OLD_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def load_corpus():
+    with open(CORPUS_PATH, newline="", encoding="utf-8") as corpus_file:
+        return [(row["url"], row["expected_id"] or None) for row in csv.DictReader(corpus_file)]
+
+
+def random_id(rng):
+    alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_-"
+    return "".join(rng.choice(alphabet) for _ in range(10)) + rng.choice("AEIMQUYcgkosw048")
+
+
+def synthetic_urls(n, n_videos, seed=0):
+    rng = random.Random(seed)
+    ids = [random_id(rng) for _ in range(n_videos)]
+    shapes = ["https://www.youtube.com/watch?v={}", "https://youtu.be/{}?si=share", "https://www.youtube.com/shorts/{}",
+              "https://m.youtube.com/watch?v={}&t=30s", "https://www.youtube.com/embed/{}", "youtube.com/watch?v={}"]
+    return [rng.choice(shapes).format(rng.choice(ids)) for _ in range(n)]
+
+
+if __name__ == "__main__":
+    corpus = load_corpus()
+    new_errors = [(url, expected, extract_video_id(url)) for url, expected in corpus if extract_video_id(url) != expected]
+    old_errors = [url for url, expected in corpus if old_extract_youtube_id(url) != expected]
+    print(f"Corpus: {len(corpus)} URLs, {len(new_errors)} wrong with youtube_url, {len(old_errors)} with the old regexes")
+    for url, expected, got in new_errors:
+        print(f"  {url!r}: expected {expected}, got {got}")
+
+    urls = synthetic_urls(N_URLS, N_DISTINCT_VIDEOS)
+
+    start = time.perf_counter()
+    old_ids = {old_extract_youtube_id(url) for url in urls}
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    unique, invalid = normalize_urls(urls)
+    new_seconds = time.perf_counter() - start
+
+    print(f"{N_URLS:,} URLs ({N_DISTINCT_VIDEOS:,} videos):")
+    print(f"  old regex chain + set: {old_seconds:.2f} s ({len(old_ids):,} ids)")
+    print(f"  normalize_urls:        {new_seconds:.2f} s ({len(unique):,} videos, {len(invalid):,} invalid)")
@@ -0,0 +1,49 @@
+"""
+Checks the local PubMed index (claims/pubmed_index.py) against the sample baseline/update files in fixtures/.
+
+The baseline holds three articles: a structured abstract with inline markup, a plain one and one without abstract.
+The update file revises the first, adds a fourth and deletes the second (plus a PMID that was never indexed) with a
+DeleteCitation. The script ingests both in order into a temporary index and checks the parsed records, the
+replacement and deletion, and the keyword search.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/check_pubmed_index.py
+"""
+import os
+import tempfile
+from claims.pubmed_index import PubMedIndex, build_index, iter_pubmed_xml
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASELINE = os.path.join(FIXTURES, "pubmed_sample_baseline.xml")
+UPDATE = os.path.join(FIXTURES, "pubmed_sample_update.xml")
+
+if __name__ == "__main__":
+    events = list(iter_pubmed_xml(BASELINE))
+    assert [(event, record["PMID"]) for event, record in events] == [("article", "1001"), ("article", "1002"),
+                                                                     ("article", "1003")], events
+    first = events[0][1]
+    assert first["Abstract"] == ("Low vitamin D status has been linked to poor sleep. "
+                                 "Supplementation improved sleep quality scores over 8 weeks."), first["Abstract"]
+    assert (first["Journal"], first["ISSN"], first["ISSNLinking"], first["NlmUniqueID"]) == (
+        "The American journal of clinical nutrition", "0002-9165", "0002-9165", "0376027"), first
+    assert first["URL"] == "https://www.ncbi.nlm.nih.gov/pubmed/1001"
+    assert events[2][1]["Abstract"] == ""
+    assert [(event, payload) for event, payload in iter_pubmed_xml(UPDATE) if event == "delete"] == [
+        ("delete", "1002"), ("delete", "9999")]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_index(index_dir, [BASELINE, UPDATE])
+        # Reopened, as the app does
+        index = PubMedIndex(index_dir)
+        assert len(index) == 3 and "1002" not in index and "1004" in index
+        assert index.get("1002") is None
+        assert "in adults" in index.get("1001")["Title"]
+        assert not index.search(["creatine"])
+        hits = index.search(["sleep quality", "vitamin D"], require_all=True)
+        assert [pmid for pmid, _ in hits] == ["1001"], hits
+        hits = index.search(["sleep"], k=5)
+        assert sorted(pmid for pmid, _ in hits) == ["1001", "1004"], hits
+        assert all(score > 0 for _, score in hits)
+        assert [pmid for pmid, _ in index.search(["omega-3"])] == ["1004"]
+        assert [pmid for pmid, _ in index.search(["melatonin", "creatine"])] == ["1003"]
+        print(f"ok: {len(index)} articles, search ['sleep'] -> {hits}")
@@ -0,0 +1,102 @@
+"""
+Tail latency of the claim evidence chain with and without a claim budget, under injected heavy-tailed delays.
+
+The E-utilities endpoints are served by the local stub of benchmark_scraper_service.py, with a log-normal service
+time per request and a small chance that a request stalls (STALL_PROBABILITY, longer for the PMC endpoints, which
+are the slowest in practice). Gemini is the fake backend with the same kind of latency, and the embeddings are
+deterministic fakes. Every claim runs on its own pipeline worker, so the latencies are not distorted by queueing.
+
+Without a budget a stalled request is only bounded by the request timeouts and retries. With a budget the chain
+returns what it has when its evidence deadline passes, and the result is labelled as degraded.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/deadline_tail_latency.py
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+os.environ["CLAIMS_FAKE_BACKENDS"] = "1"
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from benchmark_scraper_service import StubEutils, start_stub
+import benchmark_scraper_service
+from claims import fakes, ratelimit
+from claims.pipeline import ClaimPipeline
+from claims.prompts import Max_three_words_extraction
+from claims.scraper import PubMedScraper
+from claims.utils import get_journal_rankings
+
+N_CLAIMS = 40
+CLAIM_BUDGET = 8.0
+ANSWER_RESERVE = 2.0
+STALL_PROBABILITY = 0.02
+STALL_SECONDS = 20.0
+PMC_STALL_SECONDS = 40.0
+PORT = 8766
+SEED = 7
+
+
+def service_time(rng, median, stall):
+    if rng.random() < STALL_PROBABILITY:
+        return stall
+    return rng.lognormvariate(0, 0.6) * median
+
+
+class SlowStubEutils(StubEutils):
+    def __init__(self, seed):
+        super().__init__()
+        self.rng = random.Random(seed)
+
+    async def handle(self, request):
+        pmc = request.match_info["endpoint"] == "elink.fcgi" or request.query.get("db") == "pmc"
+        await asyncio.sleep(service_time(self.rng, 0.15 if pmc else 0.05, PMC_STALL_SECONDS if pmc else STALL_SECONDS))
+        return await super().handle(request)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(name, claim_budget, seed):
+    rng = random.Random(seed)
+    fakes.FAKE_LATENCY = lambda: service_time(rng, 0.3, STALL_SECONDS * 2)
+    scraper = PubMedScraper("bench@example.com", None, base_url=f"http://127.0.0.1:{PORT}/")
+    pipeline = ClaimPipeline(DeterministicFakeEmbedding(size=64), lambda: scraper,
+                             get_journal_rankings("journal_rankings.csv"), Max_three_words_extraction,
+                             dedupe_threshold=1.01, max_workers=N_CLAIMS,
+                             claim_budget=claim_budget, answer_reserve=ANSWER_RESERVE)
+    latencies, results = [], []
+    start = time.perf_counter()
+    try:
+        for i in range(N_CLAIMS):
+            future = pipeline.submit(f"Creatine supplementation increases muscle strength, variant {i}.")
+            future.add_done_callback(lambda f, t=time.perf_counter(): latencies.append(time.perf_counter() - t))
+        for future in pipeline.results():
+            results.append(future.result())
+    finally:
+        pipeline.close()
+    wall = time.perf_counter() - start
+
+    degraded = Counter(label for result in results for label in result.degraded)
+    papers = statistics.mean(len(result.documents) for result in results)
+    print(f"{name:<22} p50 {percentile(latencies, 0.5):6.2f}s  p95 {percentile(latencies, 0.95):6.2f}s  "
+          f"p99 {percentile(latencies, 0.99):6.2f}s  max {max(latencies):6.2f}s  wall {wall:6.2f}s  "
+          f"papers/claim {papers:.1f}  degraded claims {sum(1 for r in results if r.degraded)}/{len(results)} "
+          f"{dict(degraded)}")
+
+
+if __name__ == "__main__":
+    # The stub is local; don't let the NCBI rate limit dominate the timings
+    ratelimit.PROVIDER_LIMITS["ncbi"] = {"rate": 10000.0, "capacity": 1000}
+    ratelimit.PROVIDER_LIMITS["gemini"] = {"rate": 10000.0, "capacity": 1000}
+    benchmark_scraper_service.HANDSHAKE_DELAY = 0.0
+    benchmark_scraper_service.PORT = PORT
+    start_stub(SlowStubEutils(SEED))
+
+    run("no claim budget", None, SEED)
+    run(f"{CLAIM_BUDGET:.0f}s claim budget", CLAIM_BUDGET, SEED)
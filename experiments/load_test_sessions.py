@@ -0,0 +1,267 @@
+"""
+Concurrent-session load test of app.py: how many simultaneous visitors one Streamlit process can serve.
+
+Starts `streamlit run app.py` and drives it with headless clients that speak Streamlit's websocket protocol (the
+BackMsg / ForwardMsg protobufs the browser exchanges with the server), so every simulated visitor is a real
+server session with its own script thread. Each session goes through the home -> claims flow: open the home page,
+enter a video link and show its thumbnail, ask for the detailed claims, wait until the claims page has finished
+validating and rerun it once more (as any widget interaction does). The sessions run at increasing concurrency
+levels, closed loop: every session slot starts its next session when the previous one is done.
+
+All external services are fakes: CLAIMS_FAKE_BACKENDS replaces Gemini, OpenAI, the embeddings and the YouTube side,
+with CLAIMS_FAKE_LATENCY / CLAIMS_FAKE_CHUNK_DELAY standing in for the LLM response times, and the E-utilities are
+served by the local stub of benchmark_scraper_service.py. The provider rate limits of claims/ratelimit.py stay in
+force unless --no-rate-limits is given; they are a real capacity limit of a single process.
+
+Reported per concurrency level:
+- throughput (completed sessions per minute) and failed sessions: exceptions or error messages on the page, no
+  verdict on the claims page, or the claims page of another session's video
+- latency percentiles of the claims page (first element and finished run) and of the other interactions
+- saturation of the server process (Linux): peak thread count, CPU use in cores and the response time of its
+  health endpoint, which is served by the same event loop as the websockets
+- memory: RSS growth of the server process over the level, per session
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/load_test_sessions.py [--no-rate-limits] [concurrency levels, default 1 2 4 8]
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+import aiohttp
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from benchmark_scraper_service import StubEutils, start_stub, PORT as STUB_PORT
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PORT = 8599
+SESSIONS_PER_SLOT = 2
+SESSION_TIMEOUT = 600
+SAMPLE_INTERVAL = 0.1
+LINK_LABEL = "🎥 Enter YouTube Video Link:"
+SEARCH_LABEL = "🔍"
+CLAIMS_LABEL = "Get Detailed Claims and Validate"
+VIDEO_LINK_PATTERN = re.compile(r"youtu\.be/([\w-]{11})")
+
+# Runs the app like `streamlit run`, optionally without the provider rate limits
+SERVER_CODE = """
+import sys
+from claims import ratelimit
+from streamlit.web import cli as stcli
+if sys.argv[1] == "unlimited":
+    for provider in ratelimit.PROVIDER_LIMITS:
+        ratelimit.PROVIDER_LIMITS[provider] = {"rate": 10000.0, "capacity": 1000}
+sys.argv = ["streamlit", "run", "app.py", "--server.port", sys.argv[2], "--server.headless", "true"]
+stcli.main()
+"""
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def process_stats(pid):
+    """
+    (threads, RSS in MB, CPU seconds) of a process, from /proc.
+    """
+    with open(f"/proc/{pid}/status") as status_file:
+        status = dict(line.split(":", 1) for line in status_file if ":" in line)
+    with open(f"/proc/{pid}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return int(status["Threads"]), int(status["VmRSS"].split()[0]) / 1e3, cpu_seconds
+
+
+class StreamlitClient:
+    """
+    A browser stand-in for one session: reruns the script with widget values and collects the elements it renders.
+    """
+    def __init__(self, http):
+        self.http = http
+        self.websocket = None
+        self.widgets = {}
+
+    async def connect(self):
+        self.websocket = await self.http.ws_connect(f"ws://127.0.0.1:{APP_PORT}/_stcore/stream",
+                                                    protocols=["streamlit"], max_msg_size=0)
+
+    async def close(self):
+        await self.websocket.close()
+
+    async def rerun(self, values=None, click=None):
+        """
+        Reruns the script with the given widget values (by label) and button click. Returns (seconds to the first
+        element, seconds to the end of the run, rendered elements).
+        """
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        for label, value in (values or {}).items():
+            widget = message.rerun_script.widget_states.widgets.add(id=self.widgets[label])
+            widget.string_value = value
+        if click is not None:
+            message.rerun_script.widget_states.widgets.add(id=self.widgets[click], trigger_value=True)
+        start = time.perf_counter()
+        await self.websocket.send_bytes(message.SerializeToString())
+
+        elements, first_element = [], None
+        while True:
+            received = await self.websocket.receive(timeout=SESSION_TIMEOUT)
+            if received.type != aiohttp.WSMsgType.BINARY:
+                raise ConnectionError(f"websocket closed ({received.type.name})")
+            forward = ForwardMsg()
+            forward.ParseFromString(received.data)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                first_element = first_element or time.perf_counter() - start
+                element = forward.delta.new_element
+                elements.append(element)
+                widget_kind = element.WhichOneof("type")
+                if widget_kind in ("text_input", "button"):
+                    widget = getattr(element, widget_kind)
+                    self.widgets[widget.label] = widget.id
+            elif kind == "script_finished":
+                return first_element or 0.0, time.perf_counter() - start, elements
+
+
+def page_errors(elements):
+    errors = [element.exception.message for element in elements if element.WhichOneof("type") == "exception"]
+    errors += [element.alert.body for element in elements
+               if element.WhichOneof("type") == "alert" and element.alert.format == Alert.Format.ERROR]
+    return errors
+
+
+async def run_session(http, number):
+    """
+    One visitor going through the home -> claims flow.
+    Returns (claims page first element seconds, claims page seconds, interaction seconds, error).
+    """
+    video_id = f"loadtest{number % 100:02d}A"
+    link = f"https://www.youtube.com/watch?v={video_id}"
+    client = StreamlitClient(http)
+    interactions = []
+    try:
+        await client.connect()
+        for values, click in [(None, None), ({LINK_LABEL: link}, SEARCH_LABEL), ({LINK_LABEL: link}, CLAIMS_LABEL)]:
+            _, seconds, elements = await client.rerun(values, click)
+            interactions.append(seconds)
+            if page_errors(elements):
+                return None, None, interactions, page_errors(elements)[0]
+
+        first_element, seconds, elements = await client.rerun()
+        markdown = [element.markdown.body for element in elements if element.WhichOneof("type") == "markdown"]
+        errors = page_errors(elements)
+        if not errors and not any("Validation Result" in body for body in markdown):
+            errors.append("no verdict on the claims page")
+        shown = {match for body in markdown for match in VIDEO_LINK_PATTERN.findall(body)}
+        if shown - {video_id}:
+            errors.append("claims page of another session's video")
+
+        # Any widget interaction reruns the claims page
+        _, rerun_seconds, elements = await client.rerun()
+        interactions.append(rerun_seconds)
+        if not errors and not any("Validation Result" in element.markdown.body for element in elements
+                                  if element.WhichOneof("type") == "markdown"):
+            errors.append("no verdict on the rerun claims page")
+        return first_element, seconds, interactions, errors[0] if errors else None
+    except Exception as e:
+        return None, None, interactions, f"{type(e).__name__}: {e}"
+    finally:
+        if client.websocket is not None:
+            await client.close()
+
+
+async def sample_server(http, pid, samples, stopped):
+    while not stopped.is_set():
+        start = time.perf_counter()
+        async with http.get(f"http://127.0.0.1:{APP_PORT}/_stcore/health") as response:
+            await response.read()
+        samples["health"].append(time.perf_counter() - start)
+        samples["threads"].append(process_stats(pid)[0])
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def run_level(http, pid, concurrency, first_session):
+    n_sessions = concurrency * SESSIONS_PER_SLOT
+    _, rss_before, cpu_before = process_stats(pid)
+    samples, stopped = {"health": [], "threads": []}, asyncio.Event()
+    sampler = asyncio.create_task(sample_server(http, pid, samples, stopped))
+
+    async def slot(index):
+        return [await run_session(http, first_session + index * SESSIONS_PER_SLOT + i)
+                for i in range(SESSIONS_PER_SLOT)]
+
+    start = time.perf_counter()
+    results = [result for slot_results in await asyncio.gather(*(slot(i) for i in range(concurrency)))
+               for result in slot_results]
+    elapsed = time.perf_counter() - start
+    stopped.set()
+    await sampler
+    # Let the server drop the closed sessions before measuring
+    await asyncio.sleep(2)
+    _, rss_after, cpu_after = process_stats(pid)
+
+    completed = [(first, seconds) for first, seconds, _, error in results if error is None]
+    interactions = [seconds for _, _, steps, _ in results for seconds in steps]
+    errors = [error for _, _, _, error in results if error is not None]
+    first_elements = [first for first, _ in completed]
+    claims_pages = [seconds for _, seconds in completed]
+    print(f"concurrency {concurrency:>3}: {n_sessions} sessions in {elapsed:6.1f}s, "
+          f"{len(completed) / elapsed * 60:5.1f} sessions/min, {len(errors)} failed")
+    print(f"    claims page   p50 {percentile(claims_pages, 0.5):6.2f}s  p95 {percentile(claims_pages, 0.95):6.2f}s  "
+          f"p99 {percentile(claims_pages, 0.99):6.2f}s  (first element p95 {percentile(first_elements, 0.95):5.2f}s)")
+    print(f"    interactions  p50 {percentile(interactions, 0.5):6.2f}s  p95 {percentile(interactions, 0.95):6.2f}s  "
+          f"max {max(interactions, default=float('nan')):6.2f}s")
+    print(f"    saturation    {max(samples['threads'], default=0)} threads peak, "
+          f"{(cpu_after - cpu_before) / elapsed:.2f} cores, health check p50 "
+          f"{percentile(samples['health'], 0.5) * 1000:.1f} ms p99 {percentile(samples['health'], 0.99) * 1000:.1f} ms")
+    print(f"    memory        RSS {rss_before:.0f} -> {rss_after:.0f} MB "
+          f"({(rss_after - rss_before) / n_sessions:+.2f} MB/session)")
+    for error in sorted(set(errors)):
+        print(f"    failure x{errors.count(error)}: {error}")
+    return n_sessions
+
+
+async def main(levels, pid):
+    async with aiohttp.ClientSession() as http:
+        for _ in range(300):
+            try:
+                async with http.get(f"http://127.0.0.1:{APP_PORT}/_stcore/health") as response:
+                    if response.status == 200:
+                        break
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+
+        # Imports the app modules and loads the shared assets outside of the measurements
+        *_, error = await run_session(http, 0)
+        if error is not None:
+            print(f"warm-up session failed: {error}")
+        session = 1
+        for level in levels:
+            session += await run_level(http, pid, level, session)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of app.py")
+    parser.add_argument("levels", nargs="*", type=int, default=[1, 2, 4, 8], help="concurrency levels")
+    parser.add_argument("--no-rate-limits", action="store_true", help="lift the provider rate limits")
+    args = parser.parse_args()
+
+    start_stub(StubEutils())
+    env = dict(os.environ, CLAIMS_FAKE_BACKENDS="1", CLAIMS_EUTILS_URL=f"http://127.0.0.1:{STUB_PORT}/",
+               PYTHONPATH=os.pathsep.join(filter(None, [APP_DIR, os.environ.get("PYTHONPATH")])))
+    env.setdefault("CLAIMS_FAKE_LATENCY", "0.5")
+    env.setdefault("CLAIMS_FAKE_CHUNK_DELAY", "0.02")
+    server = subprocess.Popen([sys.executable, "-c", SERVER_CODE, "unlimited" if args.no_rate_limits else "limited",
+                               str(APP_PORT)], cwd=APP_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(main(args.levels, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
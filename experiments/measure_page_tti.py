@@ -0,0 +1,110 @@
+"""
+Server-side time to interactive of the app pages with the network disabled.
+
+Runs app.py with Streamlit's AppTest and times full script runs (what a visitor waits for on every page load and
+widget interaction) of the home page, the home page with a video thumbnail and the About Us page, with the static
+asset cache (claims/static_assets.py) cold and warm. Two ways of losing the network are simulated by patching the
+socket module:
+- offline: name resolution fails at once (no route, no DNS)
+- blackhole: connections hang until their timeout (a firewall dropping packets), capped at BLACKHOLE_SECONDS for
+  connections without a timeout; the kernel would give up only after ~2 minutes of SYN retries
+
+For comparison it also times the former Lottie download (requests.get without a timeout, on every About Us run).
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/measure_page_tti.py [offline|blackhole]
+"""
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import requests
+from streamlit.testing.v1 import AppTest
+from claims import static_assets
+
+RUNS = 5
+BLACKHOLE_SECONDS = 20
+LOTTIE_URL = static_assets.REMOTE_ASSETS["social_lottie.json"]
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+VIDEO_LINK = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+def disable_network(mode):
+    def offline_getaddrinfo(*args, **kwargs):
+        raise socket.gaierror(socket.EAI_NONAME, "network disabled")
+
+    def blackhole_getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("192.0.2.1", port or 443))]
+
+    def blackhole_connect(sock, address):
+        time.sleep(min(sock.gettimeout() or BLACKHOLE_SECONDS, BLACKHOLE_SECONDS))
+        raise TimeoutError("network disabled")
+
+    if mode == "offline":
+        socket.getaddrinfo = offline_getaddrinfo
+    else:
+        socket.getaddrinfo = blackhole_getaddrinfo
+        socket.socket.connect = blackhole_connect
+
+
+def use_static_dir(static_dir):
+    static_assets.STATIC_DIR = static_dir
+    static_assets.get_static_assets.cache_clear()
+
+
+def vendor_placeholders(static_dir):
+    # Stand-ins for the vendored assets: the page only checks that they exist
+    for name in static_assets.REMOTE_ASSETS:
+        with open(f"{static_dir}/{name}", "w", encoding="utf-8") as asset_file:
+            json.dump({"v": "5.7.4", "fr": 30, "ip": 0, "op": 1, "w": 10, "h": 10, "layers": []}, asset_file)
+
+
+def timed_runs(name, run):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<44} median {statistics.median(timings) * 1000:8.1f} ms, max {max(timings) * 1000:8.1f} ms")
+
+
+def measure_pages(label):
+    app = AppTest.from_file(APP_PATH, default_timeout=3 * BLACKHOLE_SECONDS)
+    app.run()  # imports and first run
+    assert not app.exception, [exception.value for exception in app.exception]
+    timed_runs(f"{label}: home", app.run)
+
+    def home_with_thumbnail():
+        app.text_input[0].input(VIDEO_LINK)
+        app.button[0].click().run()
+    timed_runs(f"{label}: home with thumbnail", home_with_thumbnail)
+
+    app.sidebar.radio[0].set_value("About Us").run()
+    timed_runs(f"{label}: about us", app.run)
+    assert not app.exception, [exception.value for exception in app.exception]
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "blackhole"
+    if mode not in ("offline", "blackhole"):
+        print("Usage: python experiments/measure_page_tti.py [offline|blackhole]")
+        sys.exit(1)
+    disable_network(mode)
+    print(f"network: {mode}\n")
+
+    use_static_dir(tempfile.mkdtemp())
+    measure_pages("cold cache")
+    static_dir = tempfile.mkdtemp()
+    vendor_placeholders(static_dir)
+    use_static_dir(static_dir)
+    measure_pages("vendored")
+
+    start = time.perf_counter()
+    try:
+        requests.get(LOTTIE_URL)
+    except requests.RequestException:
+        pass
+    print(f"\nformer Lottie fetch on every About Us run     {(time.perf_counter() - start) * 1000:8.1f} ms")
@@ -0,0 +1,53 @@
+"""
+Measures the memory cost of each extra pre-forked worker (Linux only).
+
+Starts claims.prefork with 1, 2 and 4 workers, waits for them to warm up, then reads /proc/<pid>/smaps_rollup of
+every worker. Pss splits shared pages between the processes that map them and Private is memory only that worker
+uses, so with copy-on-write sharing the Private memory per worker stays flat as workers are added while the shared
+assets are only paid for once.
+
+Run from the repository root:
+    PYTHONPATH=. python experiments/measure_prefork_memory.py
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+
+WORKER_COUNTS = [1, 2, 4]
+WARMUP_SECONDS = 60
+
+
+def children_of(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as children_file:
+        return [int(child) for child in children_file.read().split()]
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[parts[0].rstrip(":")] = int(parts[1])
+    values["Private"] = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return values
+
+
+if __name__ == "__main__":
+    print(f"{'workers':>7} {'total Pss (MB)':>15} {'Private/worker (MB)':>20} {'Rss/worker (MB)':>16}")
+    for workers in WORKER_COUNTS:
+        launcher = subprocess.Popen([sys.executable, "-m", "claims.prefork", "--workers", str(workers),
+                                     "--base-port", "8601", "app.py"], env=dict(os.environ, PYTHONPATH="."))
+        try:
+            time.sleep(WARMUP_SECONDS)
+            pids = children_of(launcher.pid)
+            stats = [memory_kb(pid) for pid in pids]
+            total_pss = sum(s["Pss"] for s in stats) + memory_kb(launcher.pid)["Pss"]
+            private = sum(s["Private"] for s in stats) / len(stats)
+            rss = sum(s["Rss"] for s in stats) / len(stats)
+            print(f"{workers:>7} {total_pss / 1024:>15.1f} {private / 1024:>20.1f} {rss / 1024:>16.1f}")
+        finally:
+            launcher.send_signal(signal.SIGTERM)
+            launcher.wait(timeout=30)